@@ -0,0 +1,80 @@
+"""
+Compare the single-encode offset chunker with the per-sentence chunker.
+
+Usage:
+    python benchmarks/bench_chunker.py [--tokenizer NAME] [--repeat N]
+
+Without --tokenizer the whitespace fallback tokenizer is used (with offsets
+from whitespace_offsets, although _chunk_text itself keeps the per-sentence
+path for it). Passing a Hugging Face model name (requires ``transformers``
+and the tokenizer files) measures a real fast tokenizer. With a real
+tokenizer "same" may be False: merges across sentence boundaries make
+per-document and per-sentence token counts differ slightly.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from news_insight_app import services  # noqa: E402
+from news_insight_app.tokenizer_utils import (  # noqa: E402
+    create_fallback_tokenizer,
+    encode_with_offsets,
+    whitespace_offsets,
+)
+
+SIZES = (10_000, 30_000, 100_000)
+
+
+def build_corpus(size):
+    seed = " ".join(article["content"] for article in services.MOCK_NEWS)
+    text = seed
+    while len(text) < size:
+        text += " " + seed
+    return text[:size]
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokenizer", help="Hugging Face tokenizer name")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-tokens", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.tokenizer:
+        from transformers import AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(args.tokenizer)
+    else:
+        tokenizer = create_fallback_tokenizer()
+    max_chunk_tokens = services._get_max_chunk_tokens(tokenizer, args.max_tokens)
+
+    def offsets_for(text):
+        offsets = encode_with_offsets(tokenizer, text)
+        return offsets if offsets is not None else whitespace_offsets(text)
+
+    print(f"{'chars':>8} {'per-sentence ms':>16} {'offsets ms':>11} {'speedup':>8} {'same':>5}")
+    for size in SIZES:
+        text = build_corpus(size)
+        legacy = best_of(args.repeat, lambda: services._chunk_text_by_sentence(
+            text, tokenizer, max_chunk_tokens))
+        single = best_of(args.repeat, lambda: services._chunk_text_by_offsets(
+            text, offsets_for(text), max_chunk_tokens))
+        same = services._chunk_text_by_sentence(text, tokenizer, max_chunk_tokens) == \
+            services._chunk_text_by_offsets(text, offsets_for(text), max_chunk_tokens)
+        print(f"{size:>8} {legacy * 1000:>16.2f} {single * 1000:>11.2f} {legacy / single:>7.1f}x {str(same):>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+CPU microbenchmarks for the pure-Python text and parsing hot paths.
+
+Usage:
+    python benchmarks/bench_hotpaths.py                      # print results
+    python benchmarks/bench_hotpaths.py --save baseline.json # record a baseline
+    python benchmarks/bench_hotpaths.py --compare baseline.json [--threshold 0.25]
+    python benchmarks/bench_hotpaths.py --only extract_first_json
+
+Each case runs repeatedly for at least --min-time seconds, split into
+--rounds timing rounds, and reports the best round's operations per
+second, plus the peak memory allocated by one call (via tracemalloc).
+--compare exits with status 1 when any case is slower, or allocates more,
+than the baseline by more than --threshold. Baselines are
+machine-specific; record one on the machine you compare on.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from news_insight_app import analysis_service, services  # noqa: E402
+from news_insight_app.sentiment_service import _extract_first_json  # noqa: E402
+from news_insight_app.text_profile import get_text_profile  # noqa: E402
+from news_insight_app.tokenizer_utils import create_fallback_tokenizer  # noqa: E402
+
+ARTICLE_SIZES = {"1KB": 1_000, "10KB": 10_000, "100KB": 100_000, "1MB": 1_000_000}
+# Model outputs are short in practice; the adversarial shapes are quadratic
+# for a naive extractor, so they stop at 100KB to keep a run bounded.
+OUTPUT_SIZES = {"1KB": 1_000, "10KB": 10_000, "100KB": 100_000}
+
+
+def build_article(size, seed=0):
+    """Deterministic article text of ``size`` characters built from MOCK_NEWS."""
+    rng = random.Random(seed)
+    sentences = [
+        sentence.strip()
+        for article in services.MOCK_NEWS
+        for sentence in article["content"].split(".")
+        if sentence.strip()
+    ]
+    parts = []
+    length = 0
+    while length < size:
+        sentence = rng.choice(sentences) + ". "
+        parts.append(sentence)
+        length += len(sentence)
+    return "".join(parts)[:size]
+
+
+def build_model_outputs(size):
+    """JSON-ish completions, including shapes that defeat a naive scanner."""
+    answer = '{"sentiment": "negative", "evidence": "quoted text"}'
+    prose = build_article(size)
+    return {
+        "answer-after-prose": prose[:max(0, size - len(answer))] + answer,
+        "fenced-nested": "```json\n" + json.dumps({
+            "sentiment": "positive",
+            # roughly 56 characters per evidence entry
+            "evidence": [{"quote": prose[i:i + 40]} for i in range(0, 40 * (size // 56), 40)],
+        }) + "\n```",
+        "open-braces": "{" * size,
+        "unclosed-objects": ('{"a": 1, ' * (size // 9 + 1))[:size],
+        "unterminated-string": ('{"evidence": "' + "x" * size)[:size],
+        "nested-invalid": "{x" * (size // 3) + "}" * (size // 3),
+        "many-invalid": ("{x} " * (size // 4 + 1))[:size],
+    }
+
+
+def make_cases():
+    tokenizer = create_fallback_tokenizer()
+    max_chunk_tokens = services._get_max_chunk_tokens(tokenizer, 510)
+    cases = {}
+
+    for label, size in ARTICLE_SIZES.items():
+        text = build_article(size)
+        long_sentence = " ".join(text.replace(".", " ").split())
+
+        def profile_cold(fn, text=text):
+            # Clear the profile memo so every call does the real work
+            def run():
+                get_text_profile.cache_clear()
+                fn(text)
+            return run
+
+        cases[f"chunk_text[{label}]"] = lambda text=text: services._chunk_text(text)
+        cases[f"split_long_sentence[{label}]"] = lambda s=long_sentence: services._split_long_sentence(
+            s, tokenizer, max_chunk_tokens)
+        cases[f"extract_keywords[{label}]"] = profile_cold(services.extract_keywords)
+        cases[f"get_article_insights[{label}]"] = profile_cold(services.get_article_insights)
+        cases[f"generate_summary[{label}]"] = profile_cold(services.generate_summary)
+        cases[f"truncate_text[{label}]"] = lambda text=text: analysis_service._truncate_text(text)
+        tokens = text.split()
+        cases[f"normalize_token_ids[{label}]"] = lambda tokens=tokens: analysis_service._normalize_token_ids(
+            tokens, analysis_service.TOKEN_CLIP_SIZE)
+
+    for label, size in OUTPUT_SIZES.items():
+        for shape, output in build_model_outputs(size).items():
+            cases[f"extract_first_json[{shape},{label}]"] = lambda output=output: _extract_first_json(output)
+    return cases
+
+
+def measure(fn, min_time, rounds):
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Best round wins: scheduler noise only ever makes a round slower
+    best = 0.0
+    for _ in range(rounds):
+        calls = 0
+        start = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < min_time / rounds or calls == 0:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - start
+        best = max(best, calls / elapsed)
+    return {"ops_per_sec": round(best, 3), "peak_kb": round(peak / 1024, 1)}
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"{'case':<52} {'ops/s':>12} {'base ops/s':>12} {'change':>8} {'peak KB':>9} {'base KB':>9}")
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<52} {current['ops_per_sec']:>12.1f} {'-':>12} {'new':>8} {current['peak_kb']:>9.1f} {'-':>9}")
+            continue
+        change = current["ops_per_sec"] / base["ops_per_sec"] - 1
+        slower = change < -threshold
+        # Ignore tiny allocations where a few objects swing the ratio
+        heavier = current["peak_kb"] > base["peak_kb"] * (1 + threshold) and current["peak_kb"] - base["peak_kb"] > 16
+        flag = "  REGRESSION" if slower or heavier else ""
+        print(f"{name:<52} {current['ops_per_sec']:>12.1f} {base['ops_per_sec']:>12.1f} {change:>+7.0%} "
+              f"{current['peak_kb']:>9.1f} {base['peak_kb']:>9.1f}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", help="write results to this baseline JSON file")
+    parser.add_argument("--compare", help="compare against this baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown fraction (default 0.25)")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to run each case (default 0.5)")
+    parser.add_argument("--rounds", type=int, default=5, help="timing rounds per case; the best is kept (default 5)")
+    parser.add_argument("--only", default="", help="run only cases whose name contains this string")
+    args = parser.parse_args()
+
+    cases = {name: fn for name, fn in make_cases().items() if args.only in name}
+    results = {}
+    for name, fn in cases.items():
+        results[name] = measure(fn, args.min_time, args.rounds)
+        if not args.compare:
+            print(f"{name:<52} {results[name]['ops_per_sec']:>12.1f} ops/s {results[name]['peak_kb']:>10.1f} KB")
+
+    if args.save:
+        with open(args.save, "w") as handle:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, handle, indent=2, sort_keys=True)
+            handle.write("\n")
+
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
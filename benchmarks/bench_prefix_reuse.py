@@ -0,0 +1,131 @@
+"""
+Measure how much of each prompt a prefix-caching model server can reuse.
+
+Usage:
+    python benchmarks/bench_prefix_reuse.py [--articles 50] [--prefill-ms-per-1k 20]
+
+Renders the rhetoric, comparison and sentiment prompts for --articles
+distinct articles, once with the current templates from prompts.py and
+once with the previous (v1) layouts that placed the article before the
+instructions. Each layout is sent to its own model stub from
+stub_servers.py, which simulates vLLM-style block prefix caching. The
+report shows the share of prompt tokens served from the cache, the
+uncached (prefilled) tokens per request, and the prefill time per request
+at --prefill-ms-per-1k. The stub counts whitespace-separated words as
+tokens, so absolute numbers are approximate, but the two layouts are
+measured the same way.
+"""
+import argparse
+import os
+import sys
+
+import requests
+
+import stub_servers
+from bench_hotpaths import build_article
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from news_insight_app.prompts import COMPARISON_PROMPT, RHETORIC_PROMPT, SENTIMENT_PROMPT  # noqa: E402
+
+
+def legacy_rhetoric(article):
+    return f"""Analyze this news article for tone and rhetorical devices.
+
+Article:
+{article}
+
+Provide analysis in this format:
+1. Overall Tone: (e.g., neutral, persuasive, alarmist, celebratory)
+2. Sentiment: (positive, negative, or neutral with confidence score)
+3. Rhetorical Devices Found:
+   - List specific devices used (metaphors, appeals to emotion, repetition, loaded language, etc.)
+   - Quote examples from the text
+4. Bias Indicators: Any signs of bias or framing
+
+Analysis:"""
+
+
+def legacy_comparison(primary, reference):
+    return f"""Compare these two news articles covering similar topics.
+
+Article 1:
+{primary}
+
+Article 2:
+{reference}
+
+Provide comparison in this format:
+1. Framing Differences: How does each article frame the story?
+2. Tone Comparison: Compare the tone and emotional appeal
+3. Source Selection: Note any differences in sources cited or perspectives included
+4. Key Differences: What facts or angles does one include that the other doesn't?
+5. Bias Assessment: Which article appears more balanced?
+
+Comparison:"""
+
+
+def legacy_sentiment(article):
+    return (
+        "You are a sentiment and tone classifier. Return JSON only with no other text.\n"
+        "Article:\n"
+        f"{article}\n\n"
+        "Classify:\n"
+        "- sentiment: positive, negative, or neutral\n"
+        "- tone: calm | emotional | inflammatory | persuasive | neutral | sarcastic | urgent\n"
+        "- evidence: list of phrases that influenced your classification\n"
+    )
+
+
+LAYOUTS = {
+    "v1 (article first)": (legacy_rhetoric, legacy_comparison, legacy_sentiment),
+    "current (prefix first)": (
+        lambda article: RHETORIC_PROMPT.render(article=article),
+        lambda primary, reference: COMPARISON_PROMPT.render(primary=primary, reference=reference),
+        lambda article: SENTIMENT_PROMPT.render(article=article),
+    ),
+}
+
+
+def run_layout(layout, articles, config, prefill_ms_per_1k):
+    rhetoric, comparison, sentiment = layout
+    server, base_url = stub_servers.start_server(stub_servers.ModelStubHandler, config)
+    url = f"{base_url}/v1/completions"
+    prompts = []
+    for i, article in enumerate(articles):
+        prompts.append(rhetoric(article))
+        prompts.append(comparison(article, articles[(i + 1) % len(articles)]))
+        prompts.append(sentiment(article))
+    session = requests.Session()
+    for prompt in prompts:
+        session.post(url, json={"prompt": prompt, "max_tokens": 16}, timeout=60).raise_for_status()
+    stats = requests.get(f"{base_url}/stats", timeout=5).json()
+    server.shutdown()
+    prefilled = (stats["prompt_tokens"] - stats["cached_prompt_tokens"]) / len(prompts)
+    return {
+        "requests": len(prompts),
+        "prefix_reuse": stats["prefix_reuse"],
+        "prefilled_per_request": prefilled,
+        "prefill_ms_per_request": prefilled / 1000 * prefill_ms_per_1k,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=50, help="distinct articles to send (default 50)")
+    parser.add_argument("--article-chars", type=int, default=3000, help="characters per article (default 3000)")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=20.0,
+                        help="prefill cost per 1000 uncached prompt tokens (default 20)")
+    args = parser.parse_args()
+
+    articles = [build_article(args.article_chars, seed=i) for i in range(args.articles)]
+    config = stub_servers.StubConfig(latency_ms=0, latency_dist="fixed")
+    print(f"{'layout':<24} {'requests':>8} {'reuse':>7} {'prefilled/req':>14} {'prefill ms/req':>15}")
+    for name, layout in LAYOUTS.items():
+        row = run_layout(layout, articles, config, args.prefill_ms_per_1k)
+        print(f"{name:<24} {row['requests']:>8} {row['prefix_reuse']:>7.1%} "
+              f"{row['prefilled_per_request']:>14.1f} {row['prefill_ms_per_request']:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Replay a request mix against the app at a target rate and report latency.
+
+Usage:
+    python benchmarks/loadtest.py --rps 4 --duration 30 \
+        --mix analysis=3,compare=1,search=1,article=2 [--json-out report.json]
+    python benchmarks/loadtest.py --target http://localhost:8000 ...
+
+Without --target the script starts the model and NewsAPI stubs from
+stub_servers.py, points the app at them through the usual environment
+variables, and serves the app in-process with a threaded server, so no
+GPUs or NewsAPI key are needed. All stub options (latency distribution,
+error rate, streaming token delay, batch cost) are accepted here too.
+--replicas N starts N model stubs and gives each model all of them as a
+replica list, to exercise routing (and hedging, with MODEL_HEDGE_REQUESTS=1).
+With --target, the app must already be configured to reach its backends.
+Model failures are absorbed by the app's fallback results, so they show up
+in the model stub's error count rather than as HTTP errors here.
+
+Requests are sent open-loop: request i is due at start + i / rps whatever
+the state of earlier requests, and latency is measured from that due time,
+so queueing inside the driver shows up in the percentiles instead of
+quietly lowering the offered load. Analysis requests pass refresh=1 unless
+--use-cache is given, so every request reaches the model stubs.
+
+Endpoints in --mix:
+    analysis   GET  /api/news/<id>/analysis
+    stream     GET  /api/news/<id>/analysis/stream
+    compare    POST /api/compare
+    search     GET  /news-search?q=...
+    article    GET  /api/news/<id>
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import stub_servers
+
+SEARCH_TERMS = ("climate", "election", "inflation", "healthcare", "immigration", "energy", "housing")
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(REQUESTS)
+    if unknown:
+        raise SystemExit(f"unknown endpoint(s) in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def _analysis(base, rng, ids, refresh):
+    return "GET", f"{base}/api/news/{rng.choice(ids)}/analysis", {"params": {"refresh": "1"} if refresh else {}}
+
+
+def _stream(base, rng, ids, refresh):
+    return "GET", f"{base}/api/news/{rng.choice(ids)}/analysis/stream", {
+        "params": {"refresh": "1"} if refresh else {}, "stream": True,
+    }
+
+
+def _compare(base, rng, ids, refresh):
+    term = rng.choice(SEARCH_TERMS)
+    article = "Lawmakers debated {term} funding on Monday. {side} said the plan {verdict}. Request {n}."
+    n = rng.randrange(1_000_000)
+    return "POST", f"{base}/api/compare", {"json": {
+        "primary": {"title": "Primary", "source": "Stub", "content": article.format(
+            term=term, side="Supporters", verdict="was overdue", n=n)},
+        "reference": {"title": "Reference", "source": "Stub", "content": article.format(
+            term=term, side="Critics", verdict="would cost too much", n=n)},
+        "refresh": refresh,
+    }}
+
+
+def _search(base, rng, ids, refresh):
+    # A fresh query each time so the NewsAPI cache does not absorb the load
+    return "GET", f"{base}/news-search", {"params": {"q": f"{rng.choice(SEARCH_TERMS)} {rng.randrange(10 ** 6)}"}}
+
+
+def _article(base, rng, ids, refresh):
+    return "GET", f"{base}/api/news/{rng.choice(ids)}", {}
+
+
+REQUESTS = {
+    "analysis": _analysis,
+    "stream": _stream,
+    "compare": _compare,
+    "search": _search,
+    "article": _article,
+}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_load(base_url, mix, rps, duration, concurrency, refresh, seed=0):
+    """Drive the mix for ``duration`` seconds; returns (samples, elapsed seconds including drain)."""
+    article_ids = [article["id"] for article in requests.get(f"{base_url}/api/news", timeout=120).json()]
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    local = threading.local()
+    samples = []
+    samples_lock = threading.Lock()
+
+    def send(endpoint, due, method, url, kwargs):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        ok = False
+        try:
+            response = session.request(method, url, timeout=300, **kwargs)
+            if kwargs.get("stream"):
+                for _ in response.iter_content(chunk_size=None):
+                    pass
+            ok = response.status_code < 400
+        except requests.RequestException:
+            pass
+        sample = {"endpoint": endpoint, "latency": time.perf_counter() - due, "ok": ok}
+        with samples_lock:
+            samples.append(sample)
+
+    total = int(rps * duration)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        for i in range(total):
+            due = start + i / rps
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            endpoint = rng.choices(names, weights)[0]
+            method, url, kwargs = REQUESTS[endpoint](base_url, rng, article_ids, refresh)
+            executor.submit(send, endpoint, due, method, url, kwargs)
+    return samples, time.perf_counter() - start
+
+
+def summarize(samples, elapsed):
+    report = {}
+    groups = {}
+    for sample in samples:
+        groups.setdefault(sample["endpoint"], []).append(sample)
+    groups["ALL"] = samples
+    for endpoint, group in groups.items():
+        latencies = sorted(sample["latency"] * 1000 for sample in group)
+        errors = sum(1 for sample in group if not sample["ok"])
+        report[endpoint] = {
+            "requests": len(group),
+            "errors": errors,
+            "error_rate": round(errors / len(group), 4) if group else 0.0,
+            "throughput_rps": round((len(group) - errors) / elapsed, 3) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 0.50), 1),
+            "p95_ms": round(percentile(latencies, 0.95), 1),
+            "p99_ms": round(percentile(latencies, 0.99), 1),
+        }
+    return report
+
+
+def print_report(report):
+    print(f"{'endpoint':<10} {'requests':>8} {'errors':>7} {'ok rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, row in report.items():
+        print(f"{endpoint:<10} {row['requests']:>8} {row['errors']:>7} {row['throughput_rps']:>8.2f} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+
+
+def start_local_app(args):
+    """Start the stubs, configure the app to use them, and serve it in-process."""
+    model_urls = []
+    for replica in range(args.replicas):
+        config = stub_servers.model_config_from_args(args)
+        config.seed += replica
+        model_urls.append(stub_servers.start_server(stub_servers.ModelStubHandler, config)[1])
+    _, news_url = stub_servers.start_server(
+        stub_servers.NewsApiStubHandler, stub_servers.StubConfig(latency_ms=args.news_latency_ms),
+    )
+    # Module-level settings are read at import, so configure before importing the app
+    completions = ",".join(f"{model_url}/v1/completions" for model_url in model_urls)
+    os.environ.update({
+        "QWEN_ANALYSIS_URL": completions,
+        "MISTRAL_ANALYSIS_URL": completions,
+        "PHI_ANALYSIS_URL": completions,
+        "NEWS_API_BASE_URL": news_url,
+        "NEWS_API_KEY": os.environ.get("NEWS_API_KEY", "stub"),
+    })
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+    from werkzeug.serving import make_server
+
+    from news_insight_app import create_app
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", model_urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", help="base URL of a running app; default starts one against the stubs")
+    parser.add_argument("--rps", type=float, default=2.0, help="offered requests per second (default 2)")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load (default 20)")
+    parser.add_argument("--concurrency", type=int, default=64, help="max in-flight requests (default 64)")
+    parser.add_argument("--mix", default="analysis=3,compare=1,search=1,article=2")
+    parser.add_argument("--use-cache", action="store_true", help="do not send refresh=1 on analysis requests")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json-out", help="also write the report to this file")
+    parser.add_argument("--replicas", type=int, default=1, help="model stub replicas to start (default 1)")
+    stub_servers.add_model_stub_args(parser)
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    model_urls = []
+    base_url = args.target.rstrip("/") if args.target else None
+    if base_url is None:
+        base_url, model_urls = start_local_app(args)
+
+    samples, elapsed = run_load(
+        base_url, mix, args.rps, args.duration, args.concurrency, not args.use_cache, args.seed,
+    )
+    report = summarize(samples, elapsed)
+    print_report(report)
+    if model_urls:
+        print()
+    for model_url in model_urls:
+        stats = requests.get(f"{model_url}/stats", timeout=5).json()
+        print(f"model stub {model_url}: {stats['requests']} requests, {stats['prompts']} prompts, "
+              f"{stats['errors']} errors, max {stats['max_in_flight']} in flight, "
+              f"{stats['prompt_tokens']} prompt tokens ({stats['cached_prompt_tokens']} cached)")
+    if args.json_out:
+        with open(args.json_out, "w") as handle:
+            json.dump({"args": vars(args), "elapsed_s": round(elapsed, 3), "endpoints": report}, handle, indent=2)
+            handle.write("\n")
+
+
+if __name__ == "__main__":
+    main()
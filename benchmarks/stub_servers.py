@@ -0,0 +1,335 @@
+"""
+Local stand-ins for the completion servers and NewsAPI, for load tests.
+
+Usage:
+    python benchmarks/stub_servers.py [--model-port 9000] [--news-port 9100]
+        [--latency-ms 400] [--latency-dist lognormal] [--latency-jitter 0.5]
+        [--error-rate 0.01] [--token-delay-ms 5] [--batch-cost 0.15]
+        [--prefill-ms-per-1k 20]
+
+The model stub answers POST /v1/completions like an OpenAI-style (vLLM)
+server. "prompt" may be a string or a list, in which case one choice per
+prompt is returned with its "index". "stream": true returns SSE chunks
+followed by "data: [DONE]". Each request sleeps for a latency drawn from
+the configured distribution (each extra batched prompt adds --batch-cost of
+it), and --error-rate of requests fail with HTTP 503. Sentiment prompts
+get a JSON answer; other prompts get analysis prose. GET /stats reports
+request counters and GET /health answers 200 like vLLM's health check.
+
+The model stub also simulates automatic prefix caching: prompts are split
+into words ("tokens") and hashed in chained blocks of 16, and each prompt's
+leading blocks already seen are reported as cached, both in
+usage.prompt_tokens_details.cached_tokens and in /stats. With
+--prefill-ms-per-1k, uncached prompt tokens add prefill latency.
+
+The NewsAPI stub serves /v2/everything and /v2/sources with canned,
+query-dependent articles. Point the app at it with NEWS_API_BASE_URL.
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+ANALYSIS_TEXT = (
+    "1. Overall Tone: measured and informative. "
+    "2. Sentiment: neutral (confidence 0.7). "
+    "3. Rhetorical Devices Found: appeal to authority, quoted statistics. "
+    "4. Bias Indicators: limited; both sides are quoted."
+)
+SENTIMENTS = ("positive", "negative", "neutral")
+SOURCES = [
+    {"id": source_id, "name": name, "category": "general", "language": "en", "country": "us"}
+    for source_id, name in (
+        ("cnn", "CNN"), ("msnbc", "MSNBC"), ("npr", "NPR"), ("fox-news", "Fox News"),
+        ("newsmax", "Newsmax"), ("reuters", "Reuters"), ("associated-press", "Associated Press"),
+    )
+]
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 400.0
+    latency_dist: str = "lognormal"
+    latency_jitter: float = 0.5
+    error_rate: float = 0.0
+    token_delay_ms: float = 5.0
+    batch_cost: float = 0.15
+    prefill_ms_per_1k: float = 0.0
+    seed: int = 0
+
+
+@dataclass
+class StubStats:
+    requests: int = 0
+    prompts: int = 0
+    streamed: int = 0
+    errors: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    prompt_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "prompts": self.prompts,
+                "streamed": self.streamed,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_prompt_tokens": self.cached_prompt_tokens,
+                "prefix_reuse": round(self.cached_prompt_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0,
+            }
+
+
+class PrefixCache:
+    """vLLM-style block prefix cache: a prompt reuses its leading blocks already seen by any prompt."""
+
+    BLOCK = 16
+
+    def __init__(self, max_blocks=100_000):
+        self.max_blocks = max_blocks
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup_and_insert(self, tokens):
+        """Return how many leading tokens were cached, then cache all full blocks of ``tokens``."""
+        cached = 0
+        matching = True
+        block_hash = None
+        with self._lock:
+            for start in range(0, len(tokens) - self.BLOCK + 1, self.BLOCK):
+                block_hash = hash((block_hash, tuple(tokens[start:start + self.BLOCK])))
+                if matching and block_hash in self._blocks:
+                    cached += self.BLOCK
+                    self._blocks.move_to_end(block_hash)
+                    continue
+                matching = False
+                self._blocks[block_hash] = True
+                if len(self._blocks) > self.max_blocks:
+                    self._blocks.popitem(last=False)
+        return cached
+
+
+def sample_latency(config, rng):
+    """Seconds for one request: fixed, uniform (+-jitter) or lognormal (median latency_ms)."""
+    base = config.latency_ms / 1000.0
+    if config.latency_dist == "fixed":
+        return base
+    if config.latency_dist == "uniform":
+        return max(0.0, base * rng.uniform(1 - config.latency_jitter, 1 + config.latency_jitter))
+    return base * math.exp(rng.gauss(0.0, config.latency_jitter))
+
+
+def completion_text(prompt):
+    if "sentiment and tone classifier" in prompt:
+        sentiment = SENTIMENTS[sum(map(ord, prompt[-64:])) % len(SENTIMENTS)]
+        answer = {"sentiment": sentiment, "tone": "calm", "evidence": ["stub evidence"]}
+        if "- analysis:" in prompt:  # combined sentiment + rhetoric prompt
+            answer["analysis"] = ANALYSIS_TEXT
+        return json.dumps(answer)
+    return ANALYSIS_TEXT
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ModelStubHandler(_StubHandler):
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/stats":
+            self._send_json(200, self.server.stats.snapshot())
+        elif path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        prompts = payload.get("prompt", "")
+        prompts = prompts if isinstance(prompts, list) else [prompts]
+        stats, config = self.server.stats, self.server.config
+
+        with stats.lock:
+            stats.requests += 1
+            stats.prompts += len(prompts)
+            stats.in_flight += 1
+            stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+            rng = random.Random(config.seed * 1_000_003 + stats.requests)
+        try:
+            token_lists = [prompt.split() for prompt in prompts]
+            prompt_tokens = sum(len(tokens) for tokens in token_lists)
+            cached_tokens = sum(self.server.prefix_cache.lookup_and_insert(tokens) for tokens in token_lists)
+            with stats.lock:
+                stats.prompt_tokens += prompt_tokens
+                stats.cached_prompt_tokens += cached_tokens
+            latency = sample_latency(config, rng) * (1 + config.batch_cost * (len(prompts) - 1))
+            latency += (prompt_tokens - cached_tokens) / 1000 * config.prefill_ms_per_1k / 1000
+            if rng.random() < config.error_rate:
+                time.sleep(latency)
+                with stats.lock:
+                    stats.errors += 1
+                self._send_json(503, {"error": "stub overloaded"})
+                return
+            texts = [completion_text(prompt) for prompt in prompts]
+            if payload.get("stream"):
+                with stats.lock:
+                    stats.streamed += 1
+                self._stream(texts, latency, config)
+                return
+            time.sleep(latency)
+            completion_tokens = sum(len(text.split()) for text in texts)
+            self._send_json(200, {
+                "object": "text_completion",
+                "choices": [
+                    {"index": i, "text": text, "finish_reason": "stop"} for i, text in enumerate(texts)
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                    "prompt_tokens_details": {"cached_tokens": cached_tokens},
+                },
+            })
+        finally:
+            with stats.lock:
+                stats.in_flight -= 1
+
+    def _stream(self, texts, latency, config):
+        # Time to first token is the sampled latency; then one word per token delay
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        time.sleep(latency)
+        for index, text in enumerate(texts):
+            for word in text.split(" "):
+                chunk = {"choices": [{"index": index, "text": word + " "}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(config.token_delay_ms / 1000.0)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class NewsApiStubHandler(_StubHandler):
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        time.sleep(self.server.config.latency_ms / 1000.0)
+        if parts.path == "/v2/sources":
+            self._send_json(200, {"status": "ok", "sources": SOURCES})
+        elif parts.path == "/v2/everything":
+            self._send_json(200, self._everything(params))
+        else:
+            self._send_json(404, {"status": "error", "message": "not found"})
+
+    @staticmethod
+    def _everything(params):
+        query = params.get("q", "news")
+        page_size = int(params.get("pageSize", 20))
+        source_ids = (params.get("sources") or "reuters").split(",")
+        articles = []
+        for i in range(page_size):
+            source_id = source_ids[i % len(source_ids)]
+            articles.append({
+                "source": {"id": source_id, "name": source_id.replace("-", " ").title()},
+                "title": f"{query.title()} update {i + 1} from {source_id}",
+                "description": f"Coverage of {query} from {source_id}.",
+                "content": (
+                    f"Officials discussed {query} on Tuesday. Supporters called the plan "
+                    f"overdue while critics warned about costs. Report {i + 1} from {source_id} "
+                    f"quotes analysts on both sides of the {query} debate."
+                ),
+                "url": f"https://{source_id}.example.com/{'-'.join(query.split())}/{i + 1}",
+                "publishedAt": "2024-01-01T12:00:00Z",
+            })
+        return {"status": "ok", "totalResults": len(articles), "articles": articles}
+
+
+def start_server(handler, config, port=0, host="127.0.0.1"):
+    """Serve ``handler`` on a daemon thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.config = config
+    server.stats = StubStats()
+    server.prefix_cache = PrefixCache()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def add_model_stub_args(parser):
+    parser.add_argument("--latency-ms", type=float, default=400.0, help="median model latency (default 400)")
+    parser.add_argument("--latency-dist", choices=("fixed", "uniform", "lognormal"), default="lognormal")
+    parser.add_argument("--latency-jitter", type=float, default=0.5,
+                        help="lognormal sigma, or +- fraction for uniform (default 0.5)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 503 responses (default 0)")
+    parser.add_argument("--token-delay-ms", type=float, default=5.0, help="delay between streamed tokens")
+    parser.add_argument("--batch-cost", type=float, default=0.15,
+                        help="extra latency fraction per additional batched prompt (default 0.15)")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=0.0,
+                        help="extra latency per 1000 uncached prompt tokens (default 0)")
+    parser.add_argument("--news-latency-ms", type=float, default=150.0, help="NewsAPI stub latency (default 150)")
+
+
+def model_config_from_args(args):
+    return StubConfig(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        token_delay_ms=args.token_delay_ms,
+        batch_cost=args.batch_cost,
+        prefill_ms_per_1k=args.prefill_ms_per_1k,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--model-port", type=int, default=9000)
+    parser.add_argument("--news-port", type=int, default=9100)
+    add_model_stub_args(parser)
+    args = parser.parse_args()
+
+    _, model_url = start_server(ModelStubHandler, model_config_from_args(args), args.model_port, args.host)
+    _, news_url = start_server(
+        NewsApiStubHandler, StubConfig(latency_ms=args.news_latency_ms), args.news_port, args.host,
+    )
+    print(f"QWEN_ANALYSIS_URL={model_url}/v1/completions")
+    print(f"MISTRAL_ANALYSIS_URL={model_url}/v1/completions")
+    print(f"PHI_ANALYSIS_URL={model_url}/v1/completions")
+    print(f"NEWS_API_BASE_URL={news_url}")
+    print("NEWS_API_KEY=stub")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,9 @@ setup(
         "textblob==0.17.1",
     ],
     extras_require={
+        "tokenizers": [
+            "transformers",
+        ],
         "dev": [
             "pytest==7.4.2",
             "pytest-cov==4.1.0",
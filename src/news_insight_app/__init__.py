@@ -1,6 +1,14 @@
 from flask import Flask
 import os
 
+def warm_tokenizers():
+    """Eagerly load the tokenizers for every model the services call."""
+    from .analysis_service import MISTRAL_TOKENIZER, QWEN_TOKENIZER
+    from .sentiment_service import PHI_MODEL_NAME
+    from .tokenizer_utils import get_tokenizer_provider
+    return get_tokenizer_provider().warmup([QWEN_TOKENIZER, MISTRAL_TOKENIZER, PHI_MODEL_NAME])
+
+
 def create_app():
     app = Flask(__name__)
     
@@ -10,5 +18,10 @@ def create_app():
     # Import and register blueprints
     from .main import main as main_blueprint
     app.register_blueprint(main_blueprint)
+
+    # Load tokenizers before the first request (and, under gunicorn --preload,
+    # before workers fork) instead of on a request thread.
+    if os.environ.get('TOKENIZER_WARMUP', '1').lower() not in ('0', 'false', 'no'):
+        warm_tokenizers()
     
     return app
\ No newline at end of file
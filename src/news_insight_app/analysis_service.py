@@ -1,9 +1,25 @@
+import base64
+import json
 import os
-from typing import Any, Dict, List
+import struct
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import requests
 
+from .http_client import get_http_client
+from .metrics import observe_completion
+from .prompts import COMBINED_PROMPT, COMPARISON_PROMPT, RHETORIC_PROMPT
+from .result_cache import cache_bypassed, get_analysis_cache, make_cache_key
+from .sentiment_service import (
+	SENTIMENT_SCHEMA,
+	check_output_mode,
+	parse_sentiment_answer,
+	sentiment_result,
+	structured_output_fields,
+)
 from .tokenizer_utils import get_tokenizer_provider
+from .tracing import traced
 
 QWEN_URL = os.getenv("QWEN_ANALYSIS_URL", "http://192.168.1.108:8000/v1/completions")
 MISTRAL_URL = os.getenv("MISTRAL_ANALYSIS_URL", "http://192.168.1.108:8001/v1/completions")
@@ -12,6 +28,37 @@ PHI_URL = os.getenv("PHI_ANALYSIS_URL", "http://192.168.1.108:8002/v1/completion
 QWEN_TOKENIZER = "qwen2-7b"
 MISTRAL_TOKENIZER = "mistralai/Mistral-7B-Instruct-v0.2"
 TOKEN_CLIP_SIZE = 2000
+COMPLETION_TIMEOUT = float(os.getenv("ANALYSIS_TIMEOUT_SECONDS", "120"))
+# How token ids travel in completion payloads: "list" (JSON ints),
+# "base64" (packed little-endian int32) or "none" (omitted entirely).
+TOKEN_PAYLOAD_FORMAT = os.getenv("TOKEN_PAYLOAD_FORMAT", "list").lower()
+TOKEN_DTYPE = "<i4"
+
+# Cache keys include the template versions, so bumping one in prompts.py
+# stops results produced by the old wording from being served.
+RHETORIC_PROMPT_VERSION = RHETORIC_PROMPT.version
+COMPARISON_PROMPT_VERSION = COMPARISON_PROMPT.version
+RHETORIC_PARAMS = {"max_tokens": 500, "temperature": 0.3}
+COMPARISON_PARAMS = {"max_tokens": 600, "temperature": 0.3}
+
+# Article detail can take sentiment and rhetoric from one structured
+# completion instead of separate Phi and Qwen calls. Off by default, which
+# keeps the two-model behaviour.
+COMBINED_ANALYSIS = os.getenv("COMBINED_ANALYSIS", "0").lower() in ("1", "true", "yes")
+COMBINED_URL = os.getenv("COMBINED_ANALYSIS_URL", QWEN_URL)
+COMBINED_MODEL = os.getenv("COMBINED_ANALYSIS_MODEL", "Qwen2-7B")
+COMBINED_TOKENIZER = os.getenv("COMBINED_ANALYSIS_TOKENIZER", QWEN_TOKENIZER)
+# Same choices as SENTIMENT_OUTPUT_MODE: text, guided_json or response_format
+COMBINED_OUTPUT_MODE = os.getenv("COMBINED_OUTPUT_MODE", "text").lower()
+COMBINED_PROMPT_VERSION = COMBINED_PROMPT.version
+COMBINED_PARAMS = {"max_tokens": 700, "temperature": 0.3}
+COMBINED_SCHEMA: Dict[str, Any] = dict(
+	SENTIMENT_SCHEMA,
+	properties=dict(SENTIMENT_SCHEMA["properties"], analysis={"type": "string"}),
+	required=SENTIMENT_SCHEMA["required"] + ["analysis"],
+)
+# Keys of the combined answer that make up the sentiment section's "raw"
+SENTIMENT_KEYS = ("sentiment", "tone", "evidence")
 
 
 def _truncate_text(text: str, limit: int = 4000) -> str:
@@ -37,134 +84,378 @@ def _tokenize(text: str, tokenizer_name: str, max_tokens: int) -> List[int]:
 	if not text:
 		return []
 	try:
-		provider = get_tokenizer_provider()
-		tokenizer = provider.get_tokenizer(tokenizer_name)
-		token_ids = tokenizer.encode(text, add_special_tokens=False)
+		token_ids = get_tokenizer_provider().encode(text, tokenizer_name)
 		return _normalize_token_ids(token_ids, max_tokens)
 	except Exception:
 		fallback_tokens = text.split()
 		return _normalize_token_ids(fallback_tokens, max_tokens)
 
 
+def _tokenize_many(texts: List[str], tokenizer_name: str, max_tokens: int) -> List[List[int]]:
+	"""Batch form of _tokenize: one tokenizer call for all ``texts``."""
+	try:
+		encoded = get_tokenizer_provider().encode_batch(texts, tokenizer_name)
+	except Exception:
+		encoded = [text.split() for text in texts]
+	return [_normalize_token_ids(token_ids, max_tokens) for token_ids in encoded]
+
+
+def _pack_token_ids(token_ids: List[int]) -> str:
+	"""Base64 of the ids as a little-endian int32 array (numpy dtype ``<i4``)."""
+	packed = struct.pack(f"<{len(token_ids)}i", *token_ids)
+	return base64.b64encode(packed).decode("ascii")
+
+
+def _token_fields(texts_by_field: Dict[str, str], tokenizer_name: str) -> Dict[str, Any]:
+	"""
+	Payload fields carrying the token ids of each text, in TOKEN_PAYLOAD_FORMAT.
+	The "none" format skips tokenization altogether.
+	"""
+	if TOKEN_PAYLOAD_FORMAT == "none":
+		return {}
+	fields = list(texts_by_field)
+	token_lists = _tokenize_many([texts_by_field[field] for field in fields], tokenizer_name, TOKEN_CLIP_SIZE)
+	if TOKEN_PAYLOAD_FORMAT == "base64":
+		payload: Dict[str, Any] = {
+			field: _pack_token_ids(tokens) for field, tokens in zip(fields, token_lists)
+		}
+		payload["token_format"] = "base64"
+		payload["token_dtype"] = TOKEN_DTYPE
+		return payload
+	return dict(zip(fields, token_lists))
+
+
 def _build_response(model_name: str, default_text: str) -> Dict[str, Any]:
 	return {
 		"model": model_name,
 		"tokens_used": 0,
 		"error": None,
 		"text": default_text,
+		"cached": False,
 	}
 
 
+def _cached_result(cache_key: str, use_cache: bool) -> Optional[Dict[str, Any]]:
+	if not use_cache or cache_bypassed():
+		return None
+	cached = get_analysis_cache().get(cache_key)
+	if cached is None:
+		return None
+	return dict(cached, cached=True)
+
+
 def _call_completion(endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
-	response = requests.post(endpoint, json=payload, timeout=120)
+	response = get_http_client().post(endpoint, json=payload, timeout=COMPLETION_TIMEOUT)
 	response.raise_for_status()
 	return response.json()
 
 
-def analyze_rhetoric(article_text: str) -> Dict[str, Any]:
-	result = _build_response(
-		"Qwen2-7B",
-		"Rhetorical analysis unavailable for this story.",
+def _stream_completion(endpoint: str, payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+	"""Yield parsed ``data:`` chunks from an OpenAI-style streaming completion."""
+	response = get_http_client().post_stream(
+		endpoint, json=dict(payload, stream=True), timeout=COMPLETION_TIMEOUT,
 	)
-	result["analysis"] = result["text"]
-	trimmed_text = _truncate_text(article_text)
-	if not trimmed_text:
-		result["error"] = "No content provided."
-		return result
+	try:
+		response.raise_for_status()
+		for line in response.iter_lines(decode_unicode=True):
+			if not line or not line.startswith("data:"):
+				continue
+			data = line[len("data:"):].strip()
+			if data == "[DONE]":
+				break
+			yield json.loads(data)
+	finally:
+		response.close()
 
-	tokens = _tokenize(trimmed_text, QWEN_TOKENIZER, TOKEN_CLIP_SIZE)
-	prompt = f"""Analyze this news article for tone and rhetorical devices.
 
-Article:
-{trimmed_text}
+def _finish(
+	result: Dict[str, Any],
+	field: str,
+	completion_text: str,
+	usage: Dict[str, Any],
+	cache_key: str,
+) -> Dict[str, Any]:
+	completion_text = completion_text.strip()
+	result.update({
+		field: completion_text or result["text"],
+		"tokens_used": (usage or {}).get("total_tokens", 0) or 0,
+	})
+	result["text"] = result[field]
+	if completion_text:
+		get_analysis_cache().set(cache_key, dict(result))
+	return result
 
-Provide analysis in this format:
-1. Overall Tone: (e.g., neutral, persuasive, alarmist, celebratory)
-2. Sentiment: (positive, negative, or neutral with confidence score)
-3. Rhetorical Devices Found:
-   - List specific devices used (metaphors, appeals to emotion, repetition, loaded language, etc.)
-   - Quote examples from the text
-4. Bias Indicators: Any signs of bias or framing
 
-Analysis:"""
+def _run(
+	endpoint: str,
+	label: str,
+	field: str,
+	result: Dict[str, Any],
+	payload: Dict[str, Any],
+	cache_key: str,
+) -> Dict[str, Any]:
+	start = time.perf_counter()
+	error = None
 	try:
-		payload = {
-			"prompt": prompt,
-			"max_tokens": 500,
-			"temperature": 0.3,
-			"article_tokens": tokens,
-			"tokenizer_model": QWEN_TOKENIZER,
-		}
-		body = _call_completion(QWEN_URL, payload)
+		body = _call_completion(endpoint, payload)
 		choices = body.get("choices") or []
-		analysis_text = choices[0].get("text", "").strip() if choices else ""
-		usage = body.get("usage", {})
-		result.update({
-			"analysis": analysis_text or result["text"],
-			"tokens_used": usage.get("total_tokens", 0) or 0,
-		})
-		result["text"] = result["analysis"]
-		return result
+		completion_text = choices[0].get("text", "") if choices else ""
+		return _finish(result, field, completion_text, body.get("usage", {}), cache_key)
 	except requests.RequestException as exc:
-		result["error"] = f"Qwen request failed: {exc}"
+		error = type(exc).__name__
+		result["error"] = f"{label} request failed: {exc}"
 		return result
 	except (ValueError, KeyError) as exc:
-		result["error"] = f"Qwen response invalid: {exc}"
+		error = type(exc).__name__
+		result["error"] = f"{label} response invalid: {exc}"
 		return result
+	finally:
+		observe_completion(result["model"], time.perf_counter() - start, result["tokens_used"], error)
+
+
+def _stream(
+	endpoint: str,
+	label: str,
+	field: str,
+	result: Dict[str, Any],
+	payload: Optional[Dict[str, Any]],
+	cache_key: str,
+) -> Iterator[Dict[str, Any]]:
+	"""
+	Yield ``{"type": "token", "text": ...}`` events as the model generates,
+	then one ``{"type": "result", "result": ...}`` event shaped exactly like
+	the blocking call's return value.
+	"""
+	if payload is None:
+		if not result["error"]:
+			yield {"type": "token", "text": result[field]}
+		yield {"type": "result", "result": result}
+		return
+	parts: List[str] = []
+	usage: Dict[str, Any] = {}
+	start = time.perf_counter()
+	error = None
+	chunks = _stream_completion(endpoint, payload)
+	try:
+		for chunk in chunks:
+			choices = chunk.get("choices") or []
+			delta = choices[0].get("text", "") if choices else ""
+			if delta:
+				parts.append(delta)
+				yield {"type": "token", "text": delta}
+			usage = chunk.get("usage") or usage
+		_finish(result, field, "".join(parts), usage, cache_key)
+	except requests.RequestException as exc:
+		error = type(exc).__name__
+		result["error"] = f"{label} request failed: {exc}"
+	except (ValueError, KeyError) as exc:
+		error = type(exc).__name__
+		result["error"] = f"{label} response invalid: {exc}"
+	finally:
+		# Also runs when the consumer closes this generator early
+		chunks.close()
+	observe_completion(result["model"], time.perf_counter() - start, result["tokens_used"], error)
+	yield {"type": "result", "result": result}
 
 
-def compare_article_texts(primary_text: str, reference_text: str) -> Dict[str, Any]:
+def _rhetoric_result() -> Dict[str, Any]:
+	result = _build_response(
+		"Qwen2-7B",
+		"Rhetorical analysis unavailable for this story.",
+	)
+	result["analysis"] = result["text"]
+	return result
+
+
+def _comparison_result() -> Dict[str, Any]:
 	result = _build_response(
 		"Mistral-7B",
 		"Comparison unavailable for this pair of stories.",
 	)
 	result["comparison"] = result["text"]
+	return result
+
+
+def rhetoric_fallback(error: str) -> Dict[str, Any]:
+	"""The rhetoric result reported when the analysis could not finish."""
+	return dict(_rhetoric_result(), error=error)
+
+
+def comparison_fallback(error: str) -> Dict[str, Any]:
+	"""The comparison result reported when the comparison could not finish."""
+	return dict(_comparison_result(), error=error)
+
+
+def _prepare_rhetoric(
+	article_text: str,
+	use_cache: bool,
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], str]:
+	"""Return (result, payload, cache_key); payload is None when result is already final."""
+	result = _rhetoric_result()
+	trimmed_text = _truncate_text(article_text)
+	if not trimmed_text:
+		result["error"] = "No content provided."
+		return result, None, ""
+
+	cache_key = make_cache_key(
+		"rhetoric", result["model"], RHETORIC_PROMPT_VERSION, RHETORIC_PARAMS, trimmed_text,
+	)
+	cached = _cached_result(cache_key, use_cache)
+	if cached is not None:
+		return cached, None, cache_key
+
+	payload = {
+		"prompt": RHETORIC_PROMPT.render(article=trimmed_text),
+		**RHETORIC_PARAMS,
+		**RHETORIC_PROMPT.payload_fields(QWEN_TOKENIZER),
+		**_token_fields({"article_tokens": trimmed_text}, QWEN_TOKENIZER),
+		"tokenizer_model": QWEN_TOKENIZER,
+	}
+	return result, payload, cache_key
+
+
+def _prepare_comparison(
+	primary_text: str,
+	reference_text: str,
+	use_cache: bool,
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], str]:
+	"""Return (result, payload, cache_key); payload is None when result is already final."""
+	result = _comparison_result()
 	primary = _truncate_text(primary_text)
 	reference = _truncate_text(reference_text)
 	if not primary or not reference:
 		result["error"] = "One of the articles was empty."
+		return result, None, ""
+
+	cache_key = make_cache_key(
+		"comparison", result["model"], COMPARISON_PROMPT_VERSION, COMPARISON_PARAMS,
+		primary, reference,
+	)
+	cached = _cached_result(cache_key, use_cache)
+	if cached is not None:
+		return cached, None, cache_key
+
+	payload = {
+		"prompt": COMPARISON_PROMPT.render(primary=primary, reference=reference),
+		**COMPARISON_PARAMS,
+		**COMPARISON_PROMPT.payload_fields(MISTRAL_TOKENIZER),
+		**_token_fields(
+			{"primary_tokens": primary, "reference_tokens": reference}, MISTRAL_TOKENIZER,
+		),
+		"tokenizer_model": MISTRAL_TOKENIZER,
+	}
+	return result, payload, cache_key
+
+
+@traced("analyze_rhetoric")
+def analyze_rhetoric(article_text: str, use_cache: bool = True) -> Dict[str, Any]:
+	result, payload, cache_key = _prepare_rhetoric(article_text, use_cache)
+	if payload is None:
+		return result
+	return _run(QWEN_URL, "Qwen", "analysis", result, payload, cache_key)
+
+
+def stream_rhetoric(article_text: str, use_cache: bool = True) -> Iterator[Dict[str, Any]]:
+	"""Streaming variant of analyze_rhetoric; see _stream for the event shapes."""
+	result, payload, cache_key = _prepare_rhetoric(article_text, use_cache)
+	return _stream(QWEN_URL, "Qwen", "analysis", result, payload, cache_key)
+
+
+@traced("compare_article_texts")
+def compare_article_texts(
+	primary_text: str,
+	reference_text: str,
+	use_cache: bool = True,
+) -> Dict[str, Any]:
+	result, payload, cache_key = _prepare_comparison(primary_text, reference_text, use_cache)
+	if payload is None:
 		return result
+	return _run(MISTRAL_URL, "Mistral", "comparison", result, payload, cache_key)
 
-	primary_tokens = _tokenize(primary, MISTRAL_TOKENIZER, TOKEN_CLIP_SIZE)
-	reference_tokens = _tokenize(reference, MISTRAL_TOKENIZER, TOKEN_CLIP_SIZE)
-	prompt = f"""Compare these two news articles covering similar topics.
 
-Article 1:
-{primary}
+def stream_comparison(
+	primary_text: str,
+	reference_text: str,
+	use_cache: bool = True,
+) -> Iterator[Dict[str, Any]]:
+	"""Streaming variant of compare_article_texts; see _stream for the event shapes."""
+	result, payload, cache_key = _prepare_comparison(primary_text, reference_text, use_cache)
+	return _stream(MISTRAL_URL, "Mistral", "comparison", result, payload, cache_key)
 
-Article 2:
-{reference}
 
-Provide comparison in this format:
-1. Framing Differences: How does each article frame the story?
-2. Tone Comparison: Compare the tone and emotional appeal
-3. Source Selection: Note any differences in sources cited or perspectives included
-4. Key Differences: What facts or angles does one include that the other doesn't?
-5. Bias Assessment: Which article appears more balanced?
+@traced("analyze_article_combined")
+def analyze_article_combined(
+	article_text: str,
+	use_cache: bool = True,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+	"""
+	Sentiment and rhetorical analysis of one article from a single completion.
 
-Comparison:"""
+	Returns (sentiment, rhetoric), shaped like the results of
+	services.analyze_sentiment and analyze_rhetoric and both labelled with
+	COMBINED_MODEL. The article is truncated as for rhetoric, so the
+	sentiment covers that text rather than every chunk of a long article.
+	Raises ValueError when COMBINED_OUTPUT_MODE is not a known output mode.
+	"""
+	check_output_mode(COMBINED_OUTPUT_MODE)
+	rhetoric = _build_response(
+		COMBINED_MODEL,
+		"Rhetorical analysis unavailable for this story.",
+	)
+	rhetoric["analysis"] = rhetoric["text"]
+	trimmed_text = _truncate_text(article_text)
+	if not trimmed_text:
+		rhetoric["error"] = "No content provided."
+		return sentiment_result("", "neutral", None, COMBINED_MODEL, 0, COMBINED_TOKENIZER), rhetoric
+
+	cache_key = make_cache_key(
+		"combined", COMBINED_MODEL, COMBINED_PROMPT_VERSION, COMBINED_PARAMS, COMBINED_OUTPUT_MODE,
+		trimmed_text,
+	)
+	cached = _cached_result(cache_key, use_cache)
+	if cached is not None:
+		return dict(cached["sentiment"], cached=True), dict(cached["rhetoric"], cached=True)
+
+	payload = {
+		"prompt": COMBINED_PROMPT.render(article=trimmed_text),
+		**COMBINED_PARAMS,
+		**COMBINED_PROMPT.payload_fields(COMBINED_TOKENIZER),
+		**_token_fields({"article_tokens": trimmed_text}, COMBINED_TOKENIZER),
+		"tokenizer_model": COMBINED_TOKENIZER,
+		**structured_output_fields(COMBINED_OUTPUT_MODE, "article_analysis", COMBINED_SCHEMA),
+	}
+	start = time.perf_counter()
+	error = None
+	completion_text = ""
 	try:
-		payload = {
-			"prompt": prompt,
-			"max_tokens": 600,
-			"temperature": 0.3,
-			"primary_tokens": primary_tokens,
-			"reference_tokens": reference_tokens,
-			"tokenizer_model": MISTRAL_TOKENIZER,
-		}
-		body = _call_completion(MISTRAL_URL, payload)
+		body = _call_completion(COMBINED_URL, payload)
 		choices = body.get("choices") or []
-		comparison_text = choices[0].get("text", "").strip() if choices else ""
-		usage = body.get("usage", {})
-		result.update({
-			"comparison": comparison_text or result["text"],
-			"tokens_used": usage.get("total_tokens", 0) or 0,
-		})
-		result["text"] = result["comparison"]
-		return result
+		completion_text = (choices[0].get("text", "") if choices else "").strip()
+		rhetoric["tokens_used"] = (body.get("usage") or {}).get("total_tokens", 0) or 0
 	except requests.RequestException as exc:
-		result["error"] = f"Mistral request failed: {exc}"
-		return result
+		error = type(exc).__name__
+		rhetoric["error"] = f"Combined request failed: {exc}"
 	except (ValueError, KeyError) as exc:
-		result["error"] = f"Mistral response invalid: {exc}"
-		return result
\ No newline at end of file
+		error = type(exc).__name__
+		rhetoric["error"] = f"Combined response invalid: {exc}"
+	elapsed = time.perf_counter() - start
+	observe_completion(COMBINED_MODEL, elapsed, rhetoric["tokens_used"], error)
+
+	# Split the answer: sentiment fields go to the sentiment section, the
+	# analysis string becomes the rhetoric text
+	# The multi-line analysis often arrives with raw newlines inside its
+	# string, which strict JSON rejects
+	sentiment_raw, answer = parse_sentiment_answer(completion_text, COMBINED_OUTPUT_MODE, strict=False)
+	analysis = None
+	if isinstance(answer, dict):
+		analysis = answer.get("analysis")
+		answer = {key: answer[key] for key in SENTIMENT_KEYS if key in answer}
+	sentiment = sentiment_result(
+		trimmed_text, sentiment_raw, answer, COMBINED_MODEL, int(elapsed * 1000), COMBINED_TOKENIZER,
+	)
+	if isinstance(analysis, str) and analysis.strip():
+		rhetoric["analysis"] = rhetoric["text"] = analysis.strip()
+		get_analysis_cache().set(cache_key, {"sentiment": sentiment, "rhetoric": dict(rhetoric)})
+	elif not rhetoric["error"]:
+		rhetoric["error"] = "Combined response invalid: no analysis in the answer"
+	return sentiment, rhetoric
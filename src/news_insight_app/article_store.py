@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import abc
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from .services import MOCK_NEWS
+from .text_profile import get_text_profile
+
+ARTICLE_STORE_DB = os.getenv("ARTICLE_STORE_DB", "")
+
+Article = Dict[str, Any]
+
+
+def _with_derived_fields(article: Article) -> Article:
+	"""Copy ``article`` and attach the summary and insights computed at insert time."""
+	profile = get_text_profile(article.get("content") or "")
+	stored = dict(article)
+	stored["summary"] = profile.summary()
+	stored["insights"] = profile.insights()
+	return stored
+
+
+class ArticleStore(abc.ABC):
+	"""Interface for article storage with O(1) lookup by id and by URL."""
+
+	@abc.abstractmethod
+	def add(self, article: Article) -> Article:
+		"""Insert or replace an article, returning the stored copy with its id."""
+
+	@abc.abstractmethod
+	def get(self, article_id: int) -> Optional[Article]:
+		...
+
+	@abc.abstractmethod
+	def get_by_url(self, url: str) -> Optional[Article]:
+		...
+
+	@abc.abstractmethod
+	def all(self) -> List[Article]:
+		...
+
+	@abc.abstractmethod
+	def reference_for(self, article_id: int) -> Optional[Article]:
+		"""Return another article to compare ``article_id`` against, if any."""
+
+	def add_many(self, articles: Iterable[Article]) -> None:
+		for article in articles:
+			self.add(article)
+
+
+class InMemoryArticleStore(ArticleStore):
+	"""Dict-backed store, empty unless seeded with ``articles``."""
+
+	def __init__(self, articles: Optional[Iterable[Article]] = None) -> None:
+		self._by_id: Dict[int, Article] = {}
+		self._by_url: Dict[str, int] = {}
+		self._next_id = 1
+		self._lock = threading.Lock()
+		if articles is not None:
+			self.add_many(articles)
+
+	def add(self, article: Article) -> Article:
+		with self._lock:
+			stored = _with_derived_fields(article)
+			if stored.get("id") is None:
+				existing = self._by_url.get(stored.get("url") or "")
+				stored["id"] = existing if existing is not None else self._next_id
+			self._next_id = max(self._next_id, stored["id"] + 1)
+			previous = self._by_id.get(stored["id"])
+			if previous is not None:
+				self._by_url.pop(previous.get("url") or "", None)
+			# Like the SQLite store, replacing drops any other article with this URL
+			owner = self._by_url.get(stored.get("url") or "")
+			if owner is not None and owner != stored["id"]:
+				del self._by_id[owner]
+			self._by_id[stored["id"]] = stored
+			if stored.get("url"):
+				self._by_url[stored["url"]] = stored["id"]
+			return stored
+
+	def get(self, article_id: int) -> Optional[Article]:
+		return self._by_id.get(article_id)
+
+	def get_by_url(self, url: str) -> Optional[Article]:
+		article_id = self._by_url.get(url)
+		return self._by_id.get(article_id) if article_id is not None else None
+
+	def all(self) -> List[Article]:
+		return list(self._by_id.values())
+
+	def reference_for(self, article_id: int) -> Optional[Article]:
+		return next((a for a in self._by_id.values() if a["id"] != article_id), None)
+
+
+class SqliteArticleStore(ArticleStore):
+	"""SQLite-backed store for larger ingested corpora; ids and URLs are indexed."""
+
+	_COLUMNS = ("id", "title", "content", "url", "source", "published_at", "summary", "insights")
+
+	def __init__(self, db_path: str) -> None:
+		self._db = sqlite3.connect(db_path, check_same_thread=False)
+		self._db.row_factory = sqlite3.Row
+		self._lock = threading.Lock()
+		with self._lock:
+			self._db.execute(
+				"CREATE TABLE IF NOT EXISTS articles ("
+				"id INTEGER PRIMARY KEY, title TEXT, content TEXT, url TEXT UNIQUE, "
+				"source TEXT, published_at TEXT, summary TEXT, insights TEXT)"
+			)
+			self._db.commit()
+
+	def _row_to_article(self, row: Optional[sqlite3.Row]) -> Optional[Article]:
+		if row is None:
+			return None
+		article = {column: row[column] for column in self._COLUMNS}
+		article["insights"] = json.loads(article["insights"] or "{}")
+		return article
+
+	def add(self, article: Article) -> Article:
+		stored = _with_derived_fields(article)
+		values = [stored.get(column) for column in self._COLUMNS]
+		values[-1] = json.dumps(stored["insights"])
+		with self._lock:
+			if stored.get("id") is None and stored.get("url"):
+				row = self._db.execute(
+					"SELECT id FROM articles WHERE url = ?", (stored["url"],),
+				).fetchone()
+				if row is not None:
+					values[0] = row["id"]
+			# INSERT OR REPLACE also drops any other row holding the same URL
+			cursor = self._db.execute(
+				"INSERT OR REPLACE INTO articles (id, title, content, url, source, "
+				"published_at, summary, insights) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+				values,
+			)
+			self._db.commit()
+		stored["id"] = cursor.lastrowid if values[0] is None else values[0]
+		return stored
+
+	def _fetch_one(self, sql: str, params: tuple) -> Optional[Article]:
+		with self._lock:
+			row = self._db.execute(sql, params).fetchone()
+		return self._row_to_article(row)
+
+	def get(self, article_id: int) -> Optional[Article]:
+		return self._fetch_one("SELECT * FROM articles WHERE id = ?", (article_id,))
+
+	def get_by_url(self, url: str) -> Optional[Article]:
+		return self._fetch_one("SELECT * FROM articles WHERE url = ?", (url,))
+
+	def all(self) -> List[Article]:
+		with self._lock:
+			rows = self._db.execute("SELECT * FROM articles ORDER BY id").fetchall()
+		return [self._row_to_article(row) for row in rows]
+
+	def reference_for(self, article_id: int) -> Optional[Article]:
+		return self._fetch_one(
+			"SELECT * FROM articles WHERE id != ? ORDER BY id LIMIT 1", (article_id,),
+		)
+
+	def count(self) -> int:
+		with self._lock:
+			return self._db.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+
+# Global article store (lazily initialized under lock)
+_store: ArticleStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_article_store() -> ArticleStore:
+	"""
+	Get the global article store, creating it on first access.
+
+	With ARTICLE_STORE_DB set the store is SQLite-backed and seeded with
+	MOCK_NEWS only when empty; otherwise it is in-memory over MOCK_NEWS.
+	"""
+	global _store
+	with _store_lock:
+		if _store is None:
+			if ARTICLE_STORE_DB:
+				store = SqliteArticleStore(ARTICLE_STORE_DB)
+				if store.count() == 0:
+					store.add_many(MOCK_NEWS)
+				_store = store
+			else:
+				_store = InMemoryArticleStore(MOCK_NEWS)
+	return _store
+
+
+def set_article_store(store: ArticleStore | None) -> None:
+	"""Replace the global article store; None rebuilds the default on next access."""
+	global _store
+	_store = store
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import collections
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, Optional
+
+import requests
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("MODEL_CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("MODEL_CIRCUIT_RESET_SECONDS", "30"))
+ADAPTIVE_TIMEOUT = os.getenv("MODEL_ADAPTIVE_TIMEOUT", "1").lower() not in ("0", "false", "no")
+# Read timeout = clamp(percentile latency * multiplier, floor, configured timeout)
+TIMEOUT_PERCENTILE = float(os.getenv("MODEL_TIMEOUT_PERCENTILE", "0.99"))
+TIMEOUT_MULTIPLIER = float(os.getenv("MODEL_TIMEOUT_MULTIPLIER", "3"))
+TIMEOUT_FLOOR_SECONDS = float(os.getenv("MODEL_TIMEOUT_FLOOR_SECONDS", "5"))
+LATENCY_WINDOW = int(os.getenv("MODEL_LATENCY_WINDOW", "200"))
+LATENCY_MIN_SAMPLES = int(os.getenv("MODEL_LATENCY_MIN_SAMPLES", "20"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(requests.RequestException):
+	"""Raised instead of sending a request to an endpoint whose circuit is open."""
+
+
+class CircuitBreaker:
+	"""
+	Consecutive-failure circuit breaker for one endpoint.
+
+	After ``failure_threshold`` failures in a row the circuit opens and
+	allow() refuses requests for ``reset_seconds``. The first request after
+	that is let through as a probe (half-open); its success closes the
+	circuit and its failure opens it for another period. Other requests are
+	refused while the probe is in flight.
+	"""
+
+	def __init__(
+		self,
+		failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+		reset_seconds: float = CIRCUIT_RESET_SECONDS,
+		clock: Callable[[], float] = time.monotonic,
+	) -> None:
+		self.failure_threshold = max(1, failure_threshold)
+		self.reset_seconds = reset_seconds
+		self._clock = clock
+		self._state = CLOSED
+		self._failures = 0
+		self._opened_at = 0.0
+		self._probe_in_flight = False
+		self._times_opened = 0
+		self._rejected = 0
+		self._lock = threading.Lock()
+
+	@property
+	def state(self) -> str:
+		with self._lock:
+			return self._state
+
+	def allow(self) -> bool:
+		with self._lock:
+			if self._state == CLOSED:
+				return True
+			if self._state == OPEN and self._clock() - self._opened_at >= self.reset_seconds:
+				self._state = HALF_OPEN
+				self._probe_in_flight = False
+			if self._state == HALF_OPEN and not self._probe_in_flight:
+				self._probe_in_flight = True
+				return True
+			self._rejected += 1
+			return False
+
+	def retry_in(self) -> float:
+		"""Seconds until an open circuit lets a probe through (0 when not open)."""
+		with self._lock:
+			if self._state != OPEN:
+				return 0.0
+			return max(0.0, self.reset_seconds - (self._clock() - self._opened_at))
+
+	def record_success(self) -> None:
+		with self._lock:
+			# Late answers from requests sent before the circuit opened don't close it
+			if self._state == OPEN:
+				return
+			self._state = CLOSED
+			self._failures = 0
+			self._probe_in_flight = False
+
+	def release_probe(self) -> None:
+		"""Give up the half-open probe without a verdict, so the next request probes."""
+		with self._lock:
+			self._probe_in_flight = False
+
+	def record_failure(self) -> None:
+		with self._lock:
+			if self._state == OPEN:
+				return
+			self._failures += 1
+			if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+				self._state = OPEN
+				self._opened_at = self._clock()
+				self._probe_in_flight = False
+				self._times_opened += 1
+
+	def stats(self) -> Dict[str, Any]:
+		with self._lock:
+			return {
+				"state": self._state,
+				"consecutive_failures": self._failures,
+				"times_opened": self._times_opened,
+				"rejected": self._rejected,
+			}
+
+
+class LatencyTracker:
+	"""Sliding window of recent successful request latencies for one endpoint."""
+
+	def __init__(self, window: int = LATENCY_WINDOW, min_samples: int = LATENCY_MIN_SAMPLES) -> None:
+		self._samples: Deque[float] = collections.deque(maxlen=max(1, window))
+		self.min_samples = max(1, min_samples)
+		self._lock = threading.Lock()
+
+	def observe(self, seconds: float) -> None:
+		with self._lock:
+			self._samples.append(seconds)
+
+	def percentile(self, fraction: float) -> Optional[float]:
+		"""Nearest-rank percentile, or None until ``min_samples`` latencies are known."""
+		with self._lock:
+			if len(self._samples) < self.min_samples:
+				return None
+			ordered = sorted(self._samples)
+		rank = max(1, math.ceil(fraction * len(ordered)))
+		return ordered[min(rank, len(ordered)) - 1]
+
+	def timeout(
+		self,
+		ceiling: Optional[float],
+		fraction: float = TIMEOUT_PERCENTILE,
+		multiplier: float = TIMEOUT_MULTIPLIER,
+		floor: float = TIMEOUT_FLOOR_SECONDS,
+	) -> Optional[float]:
+		"""
+		Read timeout derived from observed latency, never above ``ceiling``.
+
+		Falls back to ``ceiling`` (the configured fixed timeout) until enough
+		samples have been collected.
+		"""
+		observed = self.percentile(fraction)
+		if observed is None or ceiling is None:
+			return ceiling
+		return min(ceiling, max(floor, observed * multiplier))
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import contextvars
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+MAX_WORKERS = int(os.getenv("ANALYSIS_MAX_WORKERS", "8"))
+SENTIMENT_CHUNK_WORKERS = int(os.getenv("SENTIMENT_CHUNK_WORKERS", "4"))
+HEDGE_WORKERS = int(os.getenv("MODEL_HEDGE_WORKERS", "16"))
+STREAM_WORKERS = int(os.getenv("STREAM_WORKERS", "24"))
+NEWS_REFRESH_WORKERS = int(os.getenv("NEWS_REFRESH_WORKERS", "2"))
+
+# Named pools and their default sizes. Work submitted to one pool may fan
+# out into a different pool, but never back into its own.
+POOL_SIZES: Dict[str, int] = {
+	"analysis": MAX_WORKERS,
+	"sentiment_chunks": SENTIMENT_CHUNK_WORKERS,
+	"model_hedge": HEDGE_WORKERS,
+	"streams": STREAM_WORKERS,
+	"news_refresh": NEWS_REFRESH_WORKERS,
+}
+
+_worker_state = threading.local()
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executor_lock = threading.Lock()
+
+
+def _mark_worker(pool: str) -> None:
+	_worker_state.pool = pool
+
+
+def get_executor(pool: str = "analysis") -> ThreadPoolExecutor:
+	"""Get the shared bounded executor for ``pool``, creating it on first use."""
+	with _executor_lock:
+		executor = _executors.get(pool)
+		if executor is None:
+			executor = ThreadPoolExecutor(
+				max_workers=POOL_SIZES.get(pool, MAX_WORKERS),
+				thread_name_prefix=pool,
+				initializer=_mark_worker,
+				initargs=(pool,),
+			)
+			_executors[pool] = executor
+	return executor
+
+
+def run_parallel(calls: Sequence[Callable[[], Any]], pool: str = "analysis") -> List[Any]:
+	"""
+	Run independent zero-argument callables concurrently and return their
+	results in order.
+
+	Each call runs in a copy of the caller's context, so context variables
+	such as the cache-bypass flag follow the work into the pool. Exceptions
+	propagate exactly as if the calls had been made one after another.
+	Calls issued from inside a worker of the same pool run inline so nested
+	fan-out can never starve a bounded pool.
+	"""
+	if len(calls) <= 1 or getattr(_worker_state, "pool", None) == pool:
+		return [call() for call in calls]
+	executor = get_executor(pool)
+	futures = [
+		executor.submit(contextvars.copy_context().run, call) for call in calls
+	]
+	return [future.result() for future in futures]
+
+
+_STREAM_DONE = object()
+
+
+def merge_streams(
+	streams: Sequence[Callable[[], Iterable[Any]]],
+	pool: str = "streams",
+) -> Iterator[Tuple[int, Any]]:
+	"""
+	Consume several iterators concurrently and yield ``(index, item)`` pairs
+	in arrival order, where ``index`` identifies the producing stream.
+
+	An exception raised by a producer is re-raised in the consumer once the
+	items it produced before failing have been yielded. Producers run on
+	their own pool, since each holds a worker for a whole generation. When
+	the consumer stops early (the client went away, or a producer raised)
+	the remaining producers stop at their next item and their iterators
+	are closed, which releases the upstream responses.
+	"""
+	items: "queue.Queue[Tuple[int, Any, Any]]" = queue.Queue()
+	stop = threading.Event()
+
+	def produce(index: int, make_stream: Callable[[], Iterable[Any]]) -> None:
+		stream = None
+		error = None
+		try:
+			if not stop.is_set():
+				stream = iter(make_stream())
+				for item in stream:
+					if stop.is_set():
+						break
+					items.put((index, item, None))
+		except Exception as exc:
+			error = exc
+		finally:
+			close = getattr(stream, "close", None)
+			if close is not None:
+				close()
+			items.put((index, _STREAM_DONE, error))
+
+	executor = get_executor(pool)
+	futures = [
+		executor.submit(contextvars.copy_context().run, produce, index, make_stream)
+		for index, make_stream in enumerate(streams)
+	]
+	try:
+		remaining = len(streams)
+		while remaining:
+			index, item, error = items.get()
+			if item is _STREAM_DONE:
+				remaining -= 1
+				if error is not None:
+					raise error
+				continue
+			yield index, item
+	finally:
+		stop.set()
+		for future in futures:
+			future.cancel()
@@ -0,0 +1,423 @@
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .circuit_breaker import (
+	ADAPTIVE_TIMEOUT,
+	CIRCUIT_FAILURE_THRESHOLD,
+	CIRCUIT_RESET_SECONDS,
+	HALF_OPEN,
+	OPEN,
+	CircuitBreaker,
+	CircuitOpenError,
+	LatencyTracker,
+)
+from .concurrency import get_executor
+from .replicas import (
+	HEALTH_CHECK_SECONDS,
+	HEALTH_TIMEOUT,
+	HEDGE_PERCENTILE,
+	HEDGE_REQUESTS,
+	ROUTING_POLICY,
+	Replica,
+	ReplicaPool,
+	parse_replicas,
+)
+from .tracing import span, trace_headers
+
+POOL_CONNECTIONS = int(os.getenv("MODEL_HTTP_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.getenv("MODEL_HTTP_POOL_MAXSIZE", "16"))
+CONNECT_TIMEOUT = float(os.getenv("MODEL_HTTP_CONNECT_TIMEOUT", "5"))
+
+
+def _endpoint_key(url: str) -> str:
+	"""Return the scheme://host:port origin that owns a connection pool."""
+	parts = urlsplit(url)
+	return f"{parts.scheme}://{parts.netloc}"
+
+
+def _close_response(future: Future) -> None:
+	if future.exception() is None:
+		future.result().close()
+
+
+class ModelHttpClient:
+	"""Shared keep-alive HTTP client for the model completion endpoints.
+
+	Each endpoint origin gets its own ``requests.Session`` backed by a
+	bounded urllib3 connection pool, so repeated calls to the same model
+	server reuse TCP connections instead of opening a new one per request.
+
+	Each origin also gets a circuit breaker: once it fails repeatedly,
+	requests raise CircuitOpenError immediately instead of waiting out the
+	timeout, until a half-open probe succeeds. With ``adaptive_timeout`` the
+	read timeout shrinks to a multiple of the origin's observed latency
+	percentile, capped by the timeout the caller passes.
+
+	A URL argument may list several comma-separated replicas of one model.
+	Requests then go to the best-ranked replica of a ReplicaPool. If a
+	replica's circuit is open or it refuses the connection, the request
+	moves on to the next one. With ``hedge`` enabled, a blocking request
+	still unanswered after the primary replica's p95 latency is also sent
+	to a second replica. The primary's answer is returned when it
+	succeeds; if it fails, for example by timing out, the hedge's answer
+	is used instead.
+	"""
+
+	def __init__(
+		self,
+		pool_connections: int = POOL_CONNECTIONS,
+		pool_maxsize: int = POOL_MAXSIZE,
+		connect_timeout: float = CONNECT_TIMEOUT,
+		failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+		reset_seconds: float = CIRCUIT_RESET_SECONDS,
+		adaptive_timeout: bool = ADAPTIVE_TIMEOUT,
+		routing_policy: str = ROUTING_POLICY,
+		health_check_seconds: float = HEALTH_CHECK_SECONDS,
+		hedge: bool = HEDGE_REQUESTS,
+		hedge_percentile: float = HEDGE_PERCENTILE,
+	) -> None:
+		self.pool_connections = pool_connections
+		self.pool_maxsize = pool_maxsize
+		self.connect_timeout = connect_timeout
+		self.failure_threshold = failure_threshold
+		self.reset_seconds = reset_seconds
+		self.adaptive_timeout = adaptive_timeout
+		self.routing_policy = routing_policy
+		self.health_check_seconds = health_check_seconds
+		self.hedge = hedge
+		self.hedge_percentile = hedge_percentile
+		self._sessions: Dict[str, requests.Session] = {}
+		self._request_counts: Dict[str, int] = {}
+		self._breakers: Dict[str, CircuitBreaker] = {}
+		self._latencies: Dict[str, LatencyTracker] = {}
+		self._pools: Dict[str, ReplicaPool] = {}
+		self._lock = threading.Lock()
+
+	def _session_for(self, url: str) -> requests.Session:
+		key = _endpoint_key(url)
+		session = self._sessions.get(key)
+		if session is not None:
+			return session
+		with self._lock:
+			session = self._sessions.get(key)
+			if session is None:
+				session = requests.Session()
+				adapter = HTTPAdapter(
+					pool_connections=self.pool_connections,
+					pool_maxsize=self.pool_maxsize,
+				)
+				session.mount("http://", adapter)
+				session.mount("https://", adapter)
+				self._sessions[key] = session
+				self._request_counts[key] = 0
+		return session
+
+	def _endpoint_state(self, key: str) -> Tuple[CircuitBreaker, LatencyTracker]:
+		breaker = self._breakers.get(key)
+		if breaker is None:
+			with self._lock:
+				breaker = self._breakers.get(key)
+				if breaker is None:
+					breaker = self._breakers[key] = CircuitBreaker(self.failure_threshold, self.reset_seconds)
+					self._latencies[key] = LatencyTracker()
+		return breaker, self._latencies[key]
+
+	def read_timeout(self, url: str, timeout: Optional[float]) -> Optional[float]:
+		"""The read timeout a request to ``url`` would get when the caller allows ``timeout``."""
+		if not self.adaptive_timeout:
+			return timeout
+		return self._endpoint_state(_endpoint_key(url))[1].timeout(timeout)
+
+	def _send(self, url: str, json: Any, timeout: Optional[float], stream: bool) -> requests.Response:
+		session = self._session_for(url)
+		key = _endpoint_key(url)
+		breaker, latencies = self._endpoint_state(key)
+		# For streams the span ends when headers arrive, not when the body is consumed
+		with span("model.http", url=url, stream=stream) as current:
+			if not breaker.allow():
+				raise CircuitOpenError(f"circuit open for {key}; next probe in {breaker.retry_in():.0f}s")
+			with self._lock:
+				self._request_counts[key] = self._request_counts.get(key, 0) + 1
+			# The half-open probe waits the full timeout, so an endpoint that got
+			# slower than its learned latency can still close its circuit
+			probing = breaker.state == HALF_OPEN
+			if probing:
+				read_timeout = timeout
+			else:
+				read_timeout = self.read_timeout(url, timeout)
+			if current is not None:
+				current.set_attribute("read_timeout", read_timeout)
+			start = time.perf_counter()
+			try:
+				response = session.post(
+					url, json=json, timeout=(self.connect_timeout, read_timeout), stream=stream,
+					headers=trace_headers(),
+				)
+			except requests.ReadTimeout:
+				breaker.record_failure()
+				# A timed-out call took at least the timeout; recording that lets the
+				# learned timeout grow when the endpoint's real latency rises past it
+				if not stream:
+					latencies.observe(max(time.perf_counter() - start, read_timeout or 0.0))
+				raise
+			except requests.RequestException:
+				breaker.record_failure()
+				raise
+			except BaseException:
+				# A bug on our side says nothing about the endpoint, but a probe
+				# left in flight would keep the circuit half-open for good
+				if probing:
+					breaker.release_probe()
+				raise
+			# 4xx means the request was bad, not that the server is unhealthy
+			if response.status_code >= 500:
+				breaker.record_failure()
+			else:
+				breaker.record_success()
+				# Stream timings stop at the headers, so only full responses feed the window
+				if not stream:
+					latencies.observe(time.perf_counter() - start)
+			if current is not None:
+				current.set_attribute("status", response.status_code)
+			return response
+
+	def _pool_for(self, spec: str) -> Optional[ReplicaPool]:
+		"""The replica pool for a comma-separated URL list, or None for a single URL."""
+		if "," not in spec:
+			return None
+		pool = self._pools.get(spec)
+		if pool is None:
+			with self._lock:
+				pool = self._pools.get(spec)
+				if pool is None:
+					pool = self._pools[spec] = ReplicaPool(parse_replicas(spec), self.routing_policy)
+					pool.start_probing(self._health_check, self.health_check_seconds)
+		return pool
+
+	def _health_check(self, url: str) -> bool:
+		response = self._session_for(url).get(url, timeout=(self.connect_timeout, HEALTH_TIMEOUT))
+		return response.status_code < 400
+
+	def _circuit_open(self, replica: Replica) -> bool:
+		breaker = self._breakers.get(_endpoint_key(replica.url))
+		return breaker is not None and breaker.state == OPEN
+
+	def _send_replica(
+		self, pool: ReplicaPool, replica: Replica, json: Any, timeout: Optional[float], stream: bool,
+	) -> requests.Response:
+		pool.acquire(replica)
+		start = time.perf_counter()
+		try:
+			response = self._send(replica.url, json, timeout, stream)
+		except CircuitOpenError:
+			pool.release(replica)
+			raise
+		except BaseException:
+			pool.release(replica, ok=False)
+			raise
+		ok = response.status_code < 500
+		if not stream:
+			pool.release(replica, time.perf_counter() - start if ok else None, ok)
+			return response
+		# A stream stays outstanding until the caller closes the response
+		close = response.close
+		released = threading.Lock()
+
+		def close_and_release() -> None:
+			if released.acquire(blocking=False):
+				pool.release(replica, ok=ok)
+			close()
+
+		response.close = close_and_release  # type: ignore[method-assign]
+		return response
+
+	def _send_with_failover(
+		self, pool: ReplicaPool, replicas: List[Replica], json: Any, timeout: Optional[float], stream: bool,
+	) -> requests.Response:
+		# Only errors raised before the server saw the request move on to the next replica
+		last_error: Optional[Exception] = None
+		for replica in replicas:
+			try:
+				return self._send_replica(pool, replica, json, timeout, stream)
+			except (CircuitOpenError, requests.ConnectionError) as exc:
+				last_error = exc
+		assert last_error is not None
+		raise last_error
+
+	def _send_hedged(self, pool: ReplicaPool, json: Any, timeout: Optional[float]) -> requests.Response:
+		replicas = pool.ranked(self._circuit_open)
+		hedge_after = self._endpoint_state(_endpoint_key(replicas[0].url))[1].percentile(self.hedge_percentile)
+		if hedge_after is None or not replicas[1].healthy or self._circuit_open(replicas[1]):
+			return self._send_with_failover(pool, replicas, json, timeout, False)
+		# The primary runs on the calling thread and fails over to every replica
+		# but the hedge's. Only a hedge that is actually due goes to the pool.
+		lock = threading.Lock()
+		primary_done = False
+		hedges: List[Future] = []
+		context = contextvars.copy_context()
+
+		def launch_hedge() -> None:
+			with lock:
+				if not primary_done:
+					hedges.append(get_executor("model_hedge").submit(
+						context.run, self._send_replica, pool, replicas[1], json, timeout, False,
+					))
+
+		timer = threading.Timer(hedge_after, launch_hedge)
+		timer.daemon = True
+		timer.start()
+		response: Optional[requests.Response] = None
+		primary_error: Optional[requests.RequestException] = None
+		try:
+			response = self._send_with_failover(pool, [replicas[0]] + replicas[2:], json, timeout, False)
+		except requests.RequestException as exc:
+			primary_error = exc
+		finally:
+			timer.cancel()
+			with lock:
+				primary_done = True
+		hedge = hedges[0] if hedges else None
+
+		if response is not None:
+			if hedge is not None:
+				pool.record_hedge(won=False)
+				hedge.add_done_callback(_close_response)
+			return response
+		assert primary_error is not None
+		if hedge is None:
+			# Failed before the hedge was due; the hedge replica is still untried
+			if isinstance(primary_error, (CircuitOpenError, requests.ConnectionError)):
+				return self._send_replica(pool, replicas[1], json, timeout, False)
+			raise primary_error
+		try:
+			response = hedge.result()
+		except requests.RequestException:
+			raise primary_error
+		pool.record_hedge(won=True)
+		return response
+
+	def _dispatch(self, url: str, json: Any, timeout: Optional[float], stream: bool) -> requests.Response:
+		pool = self._pool_for(url)
+		if pool is None:
+			return self._send(url, json, timeout, stream)
+		if self.hedge and not stream and len(pool) > 1:
+			return self._send_hedged(pool, json, timeout)
+		return self._send_with_failover(pool, pool.ranked(self._circuit_open), json, timeout, stream)
+
+	def post(self, url: str, json: Any = None, timeout: Optional[float] = None) -> requests.Response:
+		"""POST a JSON payload through the pooled session for ``url``.
+
+		``url`` may be a comma-separated list of replicas. ``timeout`` is the
+		read timeout; the connect timeout comes from the client configuration.
+		"""
+		return self._dispatch(url, json, timeout, stream=False)
+
+	def post_stream(self, url: str, json: Any = None, timeout: Optional[float] = None) -> requests.Response:
+		"""Like post(), but returns before the body is read so it can be consumed incrementally.
+
+		The caller must close the response so its connection returns to the pool.
+		"""
+		return self._dispatch(url, json, timeout, stream=True)
+
+	def pool_stats(self) -> Dict[str, Dict[str, Any]]:
+		"""Report request and connection counts per endpoint origin.
+
+		``connections_opened`` counts new TCP connections created by urllib3;
+		a healthy pool shows it staying far below ``requests``.
+		"""
+		stats: Dict[str, Dict[str, Any]] = {}
+		with self._lock:
+			sessions = dict(self._sessions)
+			request_counts = dict(self._request_counts)
+		for key, session in sessions.items():
+			adapter = session.get_adapter(key)
+			pools = adapter.poolmanager.pools
+			opened = 0
+			idle = 0
+			for pool_key in list(pools.keys()):
+				pool = pools.get(pool_key)
+				if pool is None:
+					continue
+				opened += pool.num_connections
+				idle += pool.pool.qsize() if pool.pool is not None else 0
+			requests_sent = request_counts.get(key, 0)
+			stats[key] = {
+				"requests": requests_sent,
+				"connections_opened": opened,
+				"idle_connections": idle,
+				"reuse_ratio": round(1 - opened / requests_sent, 3) if requests_sent else 0.0,
+				"pool_maxsize": self.pool_maxsize,
+			}
+			breaker = self._breakers.get(key)
+			if breaker is not None:
+				stats[key]["circuit"] = breaker.stats()
+				stats[key]["latency_p50_s"] = self._latencies[key].percentile(0.5)
+				stats[key]["latency_p99_s"] = self._latencies[key].percentile(0.99)
+		return stats
+
+	def replica_stats(self) -> List[Dict[str, Any]]:
+		"""Routing, health and hedging counters for each multi-replica endpoint setting."""
+		with self._lock:
+			pools = list(self._pools.values())
+		return [pool.stats() for pool in pools]
+
+	def close(self) -> None:
+		with self._lock:
+			sessions = list(self._sessions.values())
+			self._sessions.clear()
+			self._request_counts.clear()
+			self._breakers.clear()
+			self._latencies.clear()
+			pools = list(self._pools.values())
+			self._pools.clear()
+		for pool in pools:
+			pool.stop_probing(timeout=0)
+		for session in sessions:
+			session.close()
+
+
+# Global client instance (lazily initialized under lock)
+_client: ModelHttpClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> ModelHttpClient:
+	"""
+	Get the process-wide model HTTP client, creating it on first access.
+
+	Creation uses double-checked locking; once the client exists, callers
+	read it without taking the lock.
+	"""
+	global _client
+	client = _client
+	if client is not None:
+		return client
+	with _client_lock:
+		if _client is None:
+			_client = ModelHttpClient()
+		return _client
+
+
+def set_http_client(client: ModelHttpClient | None) -> None:
+	"""
+	Set the global model HTTP client instance.
+
+	The client being replaced is closed, which also stops its replica
+	health probers. Passing None makes the next call to get_http_client()
+	create a fresh client. Useful for tests and dependency injection.
+	"""
+	global _client
+	with _client_lock:
+		previous, _client = _client, client
+	if previous is not None and previous is not client:
+		previous.close()
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from .metrics import reset_route, set_route
+from .tracing import span
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", "32"))
+JOB_TTL = float(os.getenv("JOB_TTL_SECONDS", "600"))
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+JOB_STORE_DB = os.getenv("JOB_STORE_DB", "")
+
+QUEUED, RUNNING, DONE, FAILED, EXPIRED = "queued", "running", "done", "failed", "expired"
+FINISHED_STATES = (DONE, FAILED, EXPIRED)
+
+Job = Dict[str, Any]
+
+
+# Job kind -> handler taking the job params; populated via register_job_handler
+JOB_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+
+
+class QueueFull(Exception):
+	"""Raised when a job is submitted while the queue is at its depth limit."""
+
+
+def register_job_handler(kind: str, handler: Callable[[Dict[str, Any]], Any]) -> None:
+	"""Register the function that runs jobs of ``kind``; it receives the job params."""
+	JOB_HANDLERS[kind] = handler
+
+
+class InMemoryJobStore:
+	"""Process-local job records."""
+
+	def __init__(self) -> None:
+		self._jobs: Dict[str, Job] = {}
+		self._lock = threading.Lock()
+
+	def save(self, job: Job) -> None:
+		with self._lock:
+			self._jobs[job["id"]] = dict(job)
+
+	def get(self, job_id: str) -> Optional[Job]:
+		with self._lock:
+			job = self._jobs.get(job_id)
+			return dict(job) if job is not None else None
+
+	def purge(self, finished_before: float) -> int:
+		with self._lock:
+			stale = [
+				job_id for job_id, job in self._jobs.items()
+				if job["status"] in FINISHED_STATES and (job["finished_at"] or 0) < finished_before
+			]
+			for job_id in stale:
+				del self._jobs[job_id]
+			return len(stale)
+
+
+class SqliteJobStore:
+	"""Job records in a SQLite table so results outlive a worker restart."""
+
+	_FIELDS = ("id", "kind", "status", "params", "result", "error", "created_at", "started_at", "finished_at")
+
+	def __init__(self, db_path: str) -> None:
+		self._db = sqlite3.connect(db_path, check_same_thread=False)
+		self._lock = threading.Lock()
+		with self._lock:
+			self._db.execute(
+				"CREATE TABLE IF NOT EXISTS jobs ("
+				"id TEXT PRIMARY KEY, kind TEXT, status TEXT, params TEXT, result TEXT, "
+				"error TEXT, created_at REAL, started_at REAL, finished_at REAL)"
+			)
+			self._db.commit()
+
+	def save(self, job: Job) -> None:
+		values = [job.get(field) for field in self._FIELDS]
+		values[3] = json.dumps(job.get("params"))
+		values[4] = json.dumps(job.get("result"))
+		with self._lock:
+			self._db.execute(
+				"INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", values,
+			)
+			self._db.commit()
+
+	def get(self, job_id: str) -> Optional[Job]:
+		with self._lock:
+			row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+		if row is None:
+			return None
+		job = dict(zip(self._FIELDS, row))
+		job["params"] = json.loads(job["params"] or "null")
+		job["result"] = json.loads(job["result"] or "null")
+		return job
+
+	def purge(self, finished_before: float) -> int:
+		with self._lock:
+			cursor = self._db.execute(
+				"DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?",
+				(*FINISHED_STATES, finished_before),
+			)
+			self._db.commit()
+			return cursor.rowcount
+
+
+class JobQueue:
+	"""
+	Bounded queue of analysis jobs run by a fixed set of worker threads.
+
+	Web requests submit a job and return its id immediately; clients then
+	poll (optionally long-polling via ``wait``) for the result. Jobs still
+	queued after ``job_ttl`` seconds are marked expired instead of run, and
+	finished jobs are dropped ``result_ttl`` seconds after completion.
+	"""
+
+	def __init__(
+		self,
+		store: Any = None,
+		workers: int = JOB_WORKERS,
+		max_queue: int = JOB_MAX_QUEUE,
+		job_ttl: float = JOB_TTL,
+		result_ttl: float = JOB_RESULT_TTL,
+		handlers: Optional[Dict[str, Callable[[Dict[str, Any]], Any]]] = None,
+	) -> None:
+		self.store = store if store is not None else InMemoryJobStore()
+		self.workers = max(1, workers)
+		self.job_ttl = job_ttl
+		self.result_ttl = result_ttl
+		self._queue: "queue.Queue[str]" = queue.Queue(maxsize=max_queue)
+		self._handlers = handlers if handlers is not None else JOB_HANDLERS
+		self._finished = threading.Condition()
+		self._threads: List[threading.Thread] = []
+		self._start_lock = threading.Lock()
+
+	def _ensure_workers(self) -> None:
+		if self._threads:
+			return
+		with self._start_lock:
+			if self._threads:
+				return
+			for i in range(self.workers):
+				thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+				thread.start()
+				self._threads.append(thread)
+
+	def submit(self, kind: str, params: Dict[str, Any]) -> Job:
+		if kind not in self._handlers:
+			raise ValueError(f"Unknown job kind: {kind}")
+		self._ensure_workers()
+		self.store.purge(time.time() - self.result_ttl)
+		job = {
+			"id": uuid.uuid4().hex,
+			"kind": kind,
+			"status": QUEUED,
+			"params": params,
+			"result": None,
+			"error": None,
+			"created_at": time.time(),
+			"started_at": None,
+			"finished_at": None,
+		}
+		self.store.save(job)
+		try:
+			self._queue.put_nowait(job["id"])
+		except queue.Full:
+			self._finish(job, FAILED, error="Job queue is full.")
+			raise QueueFull(f"Job queue is full ({self._queue.maxsize} pending).")
+		return job
+
+	def get(self, job_id: str, wait: float = 0.0) -> Optional[Job]:
+		"""Return the job record, blocking up to ``wait`` seconds for it to finish."""
+		deadline = time.monotonic() + wait
+		with self._finished:
+			while True:
+				job = self.store.get(job_id)
+				remaining = deadline - time.monotonic()
+				if job is None or job["status"] in FINISHED_STATES or remaining <= 0:
+					return job
+				self._finished.wait(remaining)
+
+	def stats(self) -> Dict[str, Any]:
+		return {
+			"queued": self._queue.qsize(),
+			"max_queue": self._queue.maxsize,
+			"workers": self.workers,
+		}
+
+	def _finish(self, job: Job, status: str, result: Any = None, error: Optional[str] = None) -> None:
+		job.update({"status": status, "result": result, "error": error, "finished_at": time.time()})
+		self.store.save(job)
+		with self._finished:
+			self._finished.notify_all()
+
+	def _work(self) -> None:
+		while True:
+			job_id = self._queue.get()
+			try:
+				self._run(job_id)
+			finally:
+				self._queue.task_done()
+
+	def _run(self, job_id: str) -> None:
+		job = self.store.get(job_id)
+		if job is None or job["status"] != QUEUED:
+			return
+		if time.time() - job["created_at"] > self.job_ttl:
+			self._finish(job, EXPIRED, error="Job expired before a worker picked it up.")
+			return
+		job.update({"status": RUNNING, "started_at": time.time()})
+		self.store.save(job)
+		route_token = set_route(f"job:{job['kind']}")
+		try:
+			with span(f"job:{job['kind']}", job_id=job_id):
+				result = self._handlers[job["kind"]](job["params"])
+		except Exception as exc:
+			self._finish(job, FAILED, error=str(exc))
+			return
+		finally:
+			reset_route(route_token)
+		self._finish(job, DONE, result=result)
+
+
+# Global job queue (lazily initialized under lock)
+_job_queue: JobQueue | None = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+	"""Get the process-wide job queue, creating it on first access."""
+	global _job_queue
+	with _job_queue_lock:
+		if _job_queue is None:
+			store = SqliteJobStore(JOB_STORE_DB) if JOB_STORE_DB else InMemoryJobStore()
+			_job_queue = JobQueue(store)
+	return _job_queue
+
+
+def set_job_queue(job_queue: JobQueue | None) -> None:
+	"""Replace the global job queue; None rebuilds the default on next access."""
+	global _job_queue
+	_job_queue = job_queue
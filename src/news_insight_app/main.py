@@ -1,22 +1,111 @@
-from flask import Blueprint, render_template, jsonify, request
+from flask import Blueprint, Response, g, render_template, jsonify, request, stream_with_context
+from contextlib import ExitStack
 from datetime import datetime
-
-from .analysis_service import analyze_rhetoric, compare_article_texts
+import json
+import time
+
+from .analysis_service import (
+	COMBINED_ANALYSIS,
+	analyze_article_combined,
+	analyze_rhetoric,
+	compare_article_texts,
+	comparison_fallback,
+	rhetoric_fallback,
+	stream_comparison,
+	stream_rhetoric,
+)
+from .article_store import get_article_store
+from .concurrency import merge_streams, run_parallel
+from .http_client import get_http_client
+from .jobs import QueueFull, get_job_queue, register_job_handler
+from .metrics import CONTENT_TYPE, PREFIX, get_metrics_registry, observe_request, reset_route, set_route
+from .result_cache import cache_bypass, get_analysis_cache
 from .services import (
-	MOCK_NEWS,
-	generate_summary,
 	analyze_sentiment,
-	get_article_insights,
+	analyze_sentiments,
+	get_text_profile,
+	sentiment_cache_stats,
 )
-from .news_api_service import NewsApiService
+from .news_api_service import NewsApiService, get_news_cache
+from .tokenizer_utils import get_tokenizer_provider
+from .tracing import TRACE_ID_HEADER, TRACEPARENT_HEADER, get_trace_exporter, span
 
 main = Blueprint('main', __name__)
 
 
-def _serialize_article(article):
-    summary = generate_summary(article['content'])
-    sentiment = analyze_sentiment(article['content'])
-    insights = get_article_insights(article['content'])
+@main.before_app_request
+def _start_request_telemetry():
+    # Label by URL rule, not path, so article ids don't explode label cardinality
+    g.metrics_route = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.metrics_route_token = set_route(g.metrics_route)
+    g.metrics_start = time.perf_counter()
+    # Root span for the request; continues the caller's trace when it sent a traceparent
+    g.trace_stack = ExitStack()
+    g.trace_span = g.trace_stack.enter_context(span(
+        f"{request.method} {g.metrics_route}",
+        traceparent=request.headers.get(TRACEPARENT_HEADER),
+        method=request.method,
+        path=request.path,
+    ))
+
+
+@main.after_app_request
+def _record_request_telemetry(response):
+    if 'metrics_start' in g:
+        observe_request(
+            g.metrics_route, request.method, response.status_code, time.perf_counter() - g.metrics_start,
+        )
+    if g.get('trace_span') is not None:
+        g.trace_span.set_attribute('status', response.status_code)
+        response.headers[TRACE_ID_HEADER] = g.trace_span.trace.trace_id
+    return response
+
+
+@main.teardown_app_request
+def _end_request_telemetry(exc=None):
+    trace_span = g.pop('trace_span', None)
+    if trace_span is not None and exc is not None:
+        trace_span.error = f"{type(exc).__name__}: {exc}"
+    trace_stack = g.pop('trace_stack', None)
+    if trace_stack is not None:
+        trace_stack.close()
+    token = g.pop('metrics_route_token', None)
+    if token is not None:
+        reset_route(token)
+
+
+def _detach_request_telemetry():
+    """
+    Take the request's root span and metrics route label away from
+    teardown, which Flask runs as soon as the view returns, before a
+    streamed body is generated. Returns a callable that ends both; calling
+    it again does nothing.
+    """
+    trace_stack = g.pop('trace_stack', None)
+    route_token = g.pop('metrics_route_token', None)
+    finished = []
+
+    def finish():
+        if finished:
+            return
+        finished.append(True)
+        if trace_stack is not None:
+            trace_stack.close()
+        if route_token is not None:
+            reset_route(route_token)
+
+    return finish
+
+
+def _serialize_article(article, sentiment=None):
+    # Stored articles carry summary/insights computed at insert time
+    if 'summary' in article and 'insights' in article:
+        summary, insights = article['summary'], article['insights']
+    else:
+        profile = get_text_profile(article['content'])
+        summary, insights = profile.summary(), profile.insights()
+    if sentiment is None:
+        sentiment = analyze_sentiment(article['content'])
     return {
         "id": article['id'],
         "title": article['title'],
@@ -30,14 +119,22 @@ def _serialize_article(article):
     }
 
 
+def _refresh_requested(data=None):
+    """True when the caller asked to skip cached analyses (?refresh=1 or {"refresh": true})."""
+    if request.args.get('refresh', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return bool(data and data.get('refresh'))
+
+
 def _find_article(article_id):
-    return next((a for a in MOCK_NEWS if a['id'] == article_id), None)
+    return get_article_store().get(article_id)
 
 @main.route('/')
 def index():
     """Main page route"""
     article_options = [
-        {"id": article['id'], "title": article['title']} for article in MOCK_NEWS
+        {"id": article['id'], "title": article['title']}
+        for article in get_article_store().all()
     ]
     if article_options:
         default_article_id = article_options[0]['id']
@@ -52,15 +149,24 @@ def index():
     )
 
 
-def _process_api_article(article):
-    """Normalise a raw NewsAPI article dict into a template-ready dict."""
-    content_text = (
+def _api_article_text(article):
+    return (
         article.get('content')
         or article.get('description')
         or article.get('title')
         or ''
     )
-    sentiment = analyze_sentiment(content_text)
+
+
+def _process_api_article(article, sentiment=None):
+    """Normalise a raw NewsAPI article dict into a template-ready dict.
+
+    ``sentiment`` may be supplied when it was already computed in a batch.
+    """
+    content_text = _api_article_text(article)
+    profile = get_text_profile(content_text)
+    if sentiment is None:
+        sentiment = analyze_sentiment(content_text)
     # Promote Phi-specific fields before stripping raw
     raw = sentiment.get('raw') or {}
     tone = raw.get('tone', '') if isinstance(raw, dict) else ''
@@ -74,9 +180,9 @@ def _process_api_article(article):
         'url': article.get('url', '#'),
         'source': article.get('source', 'Unknown'),
         'published_at': article.get('published_at', '') or article.get('publishedAt', ''),
-        'summary': generate_summary(content_text),
+        'summary': profile.summary(),
         'sentiment': sentiment,
-        'insights': get_article_insights(content_text),
+        'insights': profile.insights(),
         'content': content_text,
         'description': article.get('description', ''),
     }
@@ -86,7 +192,8 @@ def _fetch_side(service, query, side, max_articles=5):
     """Fetch and process articles for one political-lean bucket."""
     try:
         raw = service.search_news(query, max_articles=max_articles, source_category=side)
-        return [_process_api_article(a) for a in raw], None
+        sentiments = analyze_sentiments([_api_article_text(a) for a in raw])
+        return [_process_api_article(a, s) for a, s in zip(raw, sentiments)], None
     except Exception as exc:
         return [], str(exc)
 
@@ -102,8 +209,11 @@ def news_search():
     if query:
         try:
             service = NewsApiService()
-            left_articles, left_err = _fetch_side(service, query, 'left')
-            right_articles, right_err = _fetch_side(service, query, 'right')
+            # Each side is a NewsAPI call plus a batched sentiment pass; run both at once.
+            (left_articles, left_err), (right_articles, right_err) = run_parallel([
+                lambda: _fetch_side(service, query, 'left'),
+                lambda: _fetch_side(service, query, 'right'),
+            ])
             error = left_err or right_err
         except Exception as exc:
             error = str(exc)
@@ -120,7 +230,7 @@ def news_search():
 def get_news():
     """API endpoint to get all news articles"""
 
-    return jsonify([_serialize_article(article) for article in MOCK_NEWS])
+    return jsonify([_serialize_article(article) for article in get_article_store().all()])
 
 @main.route('/api/news/<int:article_id>')
 def get_article(article_id):
@@ -138,31 +248,153 @@ def get_article_analysis(article_id):
     if not article:
         return jsonify({"error": "Article not found"}), 404
 
-    article_payload = _serialize_article(article)
-    reference_article = next((a for a in MOCK_NEWS if a['id'] != article_id), None)
+    return jsonify(_article_analysis(article, _refresh_requested()))
 
-    if reference_article:
-        comparison = compare_article_texts(article['content'], reference_article['content'])
-        comparison["reference"] = {
-            "id": reference_article['id'],
-            "title": reference_article['title'],
-        }
-    else:
-        comparison = {
-            "comparison": "Comparison unavailable; only one article configured.",
-            "model": "Mistral-7B",
-            "tokens_used": 0,
-            "error": "No reference article available.",
-            "reference": None,
-        }
 
-    rhetoric = analyze_rhetoric(article['content'])
+def _article_analysis(article, refresh=False):
+    """Build the deep-analysis payload for a stored article."""
+    reference_article = get_article_store().reference_for(article['id'])
 
-    return jsonify({
+    def _comparison():
+        if not reference_article:
+            return _missing_reference_comparison()
+        result = compare_article_texts(article['content'], reference_article['content'])
+        result["reference"] = _reference_meta(reference_article)
+        return result
+
+    if COMBINED_ANALYSIS:
+        # One completion answers sentiment and rhetoric, so the article is prefilled once
+        with cache_bypass(refresh):
+            (sentiment, rhetoric), comparison = run_parallel([
+                lambda: analyze_article_combined(article['content']),
+                _comparison,
+            ])
+        article_payload = _serialize_article(article, sentiment)
+    else:
+        # Sentiment, comparison and rhetoric hit different models; run them together.
+        with cache_bypass(refresh):
+            article_payload, comparison, rhetoric = run_parallel([
+                lambda: _serialize_article(article),
+                _comparison,
+                lambda: analyze_rhetoric(article['content']),
+            ])
+
+    return {
         "article": article_payload,
         "rhetoric": rhetoric,
         "comparison": comparison,
-    })
+    }
+
+def _missing_reference_comparison():
+    return {
+        "comparison": "Comparison unavailable; only one article configured.",
+        "model": "Mistral-7B",
+        "tokens_used": 0,
+        "error": "No reference article available.",
+        "reference": None,
+    }
+
+
+def _reference_meta(reference_article):
+    return {
+        "id": reference_article['id'],
+        "title": reference_article['title'],
+    }
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _sse_response(sections, streams, refresh, finalize=None, fallbacks=None):
+    """
+    Relay several analysis streams to the browser as Server-Sent Events.
+
+    Emits ``token`` events ({"section", "text"}) while models generate, one
+    ``result`` event ({"section", "result"}) per section when it completes,
+    and a final ``done`` event. If a stream fails, an ``error`` event is
+    followed by a fallback ``result`` for every section still pending,
+    built by ``fallbacks[section](message)`` where given.
+    """
+    fallbacks = fallbacks or {}
+    # Model calls made while streaming belong to this request's trace and route
+    finish_telemetry = _detach_request_telemetry()
+
+    def generate():
+        try:
+            yield from relay()
+        finally:
+            finish_telemetry()
+
+    def relay():
+        pending = list(sections)
+        events = merge_streams(streams)
+        try:
+            with cache_bypass(refresh):
+                for index, event in events:
+                    section = sections[index]
+                    if event["type"] == "token":
+                        yield _sse("token", {"section": section, "text": event["text"]})
+                        continue
+                    result = event["result"]
+                    if finalize is not None:
+                        finalize(section, result)
+                    pending.remove(section)
+                    yield _sse("result", {"section": section, "result": result})
+        except Exception as exc:
+            yield _sse("error", {"error": str(exc)})
+            message = f"Stream failed before this section finished: {exc}"
+            for section in pending:
+                fallback = fallbacks.get(section)
+                result = fallback(message) if fallback is not None else {"error": message}
+                if finalize is not None:
+                    finalize(section, result)
+                yield _sse("result", {"section": section, "result": result})
+        finally:
+            # Stops the remaining producers when the client disconnects
+            events.close()
+        yield _sse("done", {})
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+    # Also covers a body that is closed before it was ever iterated
+    response.call_on_close(finish_telemetry)
+    return response
+
+
+@main.route('/api/news/<int:article_id>/analysis/stream')
+def stream_article_analysis(article_id):
+    """Streaming variant of the deep analysis endpoint (Server-Sent Events)"""
+    article = _find_article(article_id)
+    if not article:
+        return jsonify({"error": "Article not found"}), 404
+
+    reference_article = get_article_store().reference_for(article_id)
+
+    def _comparison_stream():
+        if not reference_article:
+            return [{"type": "result", "result": _missing_reference_comparison()}]
+        return stream_comparison(article['content'], reference_article['content'])
+
+    def _finalize(section, result):
+        if section == "comparison" and reference_article:
+            result["reference"] = _reference_meta(reference_article)
+
+    return _sse_response(
+        ["article", "comparison", "rhetoric"],
+        [
+            lambda: [{"type": "result", "result": _serialize_article(article)}],
+            _comparison_stream,
+            lambda: stream_rhetoric(article['content']),
+        ],
+        _refresh_requested(),
+        _finalize,
+        {"comparison": comparison_fallback, "rhetoric": rhetoric_fallback},
+    )
+
 
 @main.route('/compare')
 def compare():
@@ -183,22 +415,206 @@ def compare_articles_api():
     if not primary_content or not reference_content:
         return jsonify({'error': 'Both articles must have content.'}), 400
 
-    primary_rhetoric = analyze_rhetoric(primary_content)
-    reference_rhetoric = analyze_rhetoric(reference_content)
-    comparison = compare_article_texts(primary_content, reference_content)
+    return jsonify(_compare_analysis(primary, reference, _refresh_requested(data)))
+
+
+def _compare_analysis(primary, reference, refresh=False):
+    """Build the /api/compare payload for two externally supplied articles."""
+    primary_content = primary.get('content', '')
+    reference_content = reference.get('content', '')
+
+    with cache_bypass(refresh):
+        primary_rhetoric, reference_rhetoric, comparison = run_parallel([
+            lambda: analyze_rhetoric(primary_content),
+            lambda: analyze_rhetoric(reference_content),
+            lambda: compare_article_texts(primary_content, reference_content),
+        ])
     comparison['reference'] = {
         'title': reference.get('title', ''),
         'source': reference.get('source', ''),
     }
 
-    return jsonify({
+    return {
         'primary': {'meta': primary, 'rhetoric': primary_rhetoric},
         'reference': {'meta': reference, 'rhetoric': reference_rhetoric},
         'comparison': comparison,
+    }
+
+
+@main.route('/api/compare/stream', methods=['POST'])
+def stream_compare_articles_api():
+    """Streaming variant of /api/compare (Server-Sent Events)"""
+    data = request.get_json(force=True) or {}
+    primary = data.get('primary', {})
+    reference = data.get('reference', {})
+
+    primary_content = primary.get('content', '')
+    reference_content = reference.get('content', '')
+
+    if not primary_content or not reference_content:
+        return jsonify({'error': 'Both articles must have content.'}), 400
+
+    def _finalize(section, result):
+        if section == 'comparison':
+            result['reference'] = {
+                'title': reference.get('title', ''),
+                'source': reference.get('source', ''),
+            }
+
+    return _sse_response(
+        ['primary', 'reference', 'comparison'],
+        [
+            lambda: stream_rhetoric(primary_content),
+            lambda: stream_rhetoric(reference_content),
+            lambda: stream_comparison(primary_content, reference_content),
+        ],
+        _refresh_requested(data),
+        _finalize,
+        {'primary': rhetoric_fallback, 'reference': rhetoric_fallback, 'comparison': comparison_fallback},
+    )
+
+
+def _run_article_analysis_job(params):
+    article = _find_article(params['article_id'])
+    if not article:
+        raise ValueError("Article not found")
+    return _article_analysis(article, params.get('refresh', False))
+
+
+def _run_compare_job(params):
+    return _compare_analysis(params['primary'], params['reference'], params.get('refresh', False))
+
+
+register_job_handler('article_analysis', _run_article_analysis_job)
+register_job_handler('compare', _run_compare_job)
+
+
+def _job_view(job):
+    return {
+        key: job[key]
+        for key in ('id', 'kind', 'status', 'result', 'error', 'created_at', 'started_at', 'finished_at')
+    }
+
+
+def _submit_job(kind, params):
+    try:
+        job = get_job_queue().submit(kind, params)
+    except QueueFull as exc:
+        return jsonify({'error': str(exc)}), 503, {'Retry-After': '5'}
+    view = _job_view(job)
+    view['poll'] = f"/api/jobs/{job['id']}"
+    return jsonify(view), 202
+
+
+@main.route('/api/jobs/news/<int:article_id>/analysis', methods=['POST'])
+def submit_article_analysis_job(article_id):
+    """Queue deep analysis for a stored article; returns a job id to poll"""
+    if not _find_article(article_id):
+        return jsonify({"error": "Article not found"}), 404
+    return _submit_job('article_analysis', {
+        'article_id': article_id,
+        'refresh': _refresh_requested(),
     })
 
 
+@main.route('/api/jobs/compare', methods=['POST'])
+def submit_compare_job():
+    """Queue rhetoric + comparison analysis for two articles; returns a job id to poll"""
+    data = request.get_json(force=True) or {}
+    primary = data.get('primary', {})
+    reference = data.get('reference', {})
+    if not primary.get('content') or not reference.get('content'):
+        return jsonify({'error': 'Both articles must have content.'}), 400
+    return _submit_job('compare', {
+        'primary': primary,
+        'reference': reference,
+        'refresh': _refresh_requested(data),
+    })
+
+
+@main.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """Job status and, once finished, its result. ?wait=N long-polls up to 30 s."""
+    wait = min(max(request.args.get('wait', 0, type=float), 0.0), 30.0)
+    job = get_job_queue().get(job_id, wait=wait)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(_job_view(job))
+
+
 @main.route('/api/health')
 def health_check():
     """Health check endpoint"""
-    return jsonify({"status": "healthy", "timestamp": datetime.now().isoformat()})
\ No newline at end of file
+    return jsonify({"status": "healthy", "timestamp": datetime.now().isoformat()})
+
+
+@main.route('/api/stats')
+def runtime_stats():
+    """Runtime statistics for connection pools and caches"""
+    return jsonify({
+        "http_pools": get_http_client().pool_stats(),
+        "replica_pools": get_http_client().replica_stats(),
+        "analysis_cache": get_analysis_cache().stats(),
+        "sentiment_cache": sentiment_cache_stats(),
+        "news_cache": get_news_cache().stats(),
+        "jobs": get_job_queue().stats(),
+        "tokenizers": get_tokenizer_provider().describe(),
+        "token_cache": get_tokenizer_provider().cache_stats(),
+    })
+
+
+def _cache_metric_families():
+    """Cache counters already kept by each cache, exposed at scrape time."""
+    lookups = []
+    for cache, stats in (
+        ('analysis', get_analysis_cache().stats()),
+        ('sentiment', sentiment_cache_stats()),
+        ('news', get_news_cache().stats()),
+        ('token', get_tokenizer_provider().cache_stats()),
+    ):
+        for field, result in (('hits', 'hit'), ('stale_hits', 'stale_hit'), ('misses', 'miss')):
+            if field in stats:
+                lookups.append(({'cache': cache, 'result': result}, stats[field]))
+    return [(PREFIX + 'cache_lookups_total', 'counter', 'Cache lookups by cache and result.', lookups)]
+
+
+_CIRCUIT_STATE_VALUES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+
+def _circuit_metric_families():
+    """Per-endpoint circuit breaker state and fast-failed request counts."""
+    states = []
+    rejected = []
+    for endpoint, stats in get_http_client().pool_stats().items():
+        circuit = stats.get('circuit')
+        if circuit is None:
+            continue
+        states.append(({'endpoint': endpoint}, _CIRCUIT_STATE_VALUES[circuit['state']]))
+        rejected.append(({'endpoint': endpoint}, circuit['rejected']))
+    return [
+        (PREFIX + 'circuit_state', 'gauge', 'Model endpoint circuit: 0 closed, 1 half-open, 2 open.', states),
+        (PREFIX + 'circuit_rejected_total', 'counter', 'Model requests failed fast by an open circuit.', rejected),
+    ]
+
+
+@main.route('/api/traces/slowest')
+def slowest_traces():
+    """Slowest recently finished request traces, with their spans"""
+    limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+    return jsonify(get_trace_exporter().slowest(limit))
+
+
+@main.route('/api/traces/<trace_id>')
+def get_trace(trace_id):
+    """One recently finished trace by id"""
+    record = get_trace_exporter().get(trace_id)
+    if record is None:
+        return jsonify({"error": "Trace not found"}), 404
+    return jsonify(record)
+
+
+@main.route('/metrics')
+def metrics():
+    """Prometheus text exposition of request, model, tokenizer, NewsAPI, cache and circuit metrics"""
+    body = get_metrics_registry().render(extra=_cache_metric_families() + _circuit_metric_families())
+    return Response(body, content_type=CONTENT_TYPE)
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import bisect
+import contextvars
+import math
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "news_insight_"
+
+# Seconds; model calls run from tens of milliseconds to the 120 s timeout
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+COUNT_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+LabelValues = Tuple[str, ...]
+# (name, type, help, [(labels, value)]) for values computed at scrape time
+MetricFamily = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+_route = contextvars.ContextVar("metrics_route", default="none")
+
+
+def set_route(route: str) -> contextvars.Token:
+	"""Label metrics recorded in this context (and work fanned out from it) with ``route``."""
+	return _route.set(route)
+
+
+def reset_route(token: contextvars.Token) -> None:
+	_route.reset(token)
+
+
+def current_route() -> str:
+	return _route.get()
+
+
+def _escape(value: str) -> str:
+	return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+	if not labels:
+		return ""
+	return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+	if value == math.inf:
+		return "+Inf"
+	if float(value).is_integer():
+		return str(int(value))
+	return repr(float(value))
+
+
+class Counter:
+	"""Monotonic counter with a fixed set of label names."""
+
+	kind = "counter"
+
+	def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+		self.name = name
+		self.help = help
+		self.labelnames = tuple(labelnames)
+		self._values: Dict[LabelValues, float] = {}
+		self._lock = threading.Lock()
+
+	def inc(self, amount: float = 1.0, **labels: Any) -> None:
+		key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+		with self._lock:
+			self._values[key] = self._values.get(key, 0.0) + amount
+
+	def value(self, **labels: Any) -> float:
+		key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+		with self._lock:
+			return self._values.get(key, 0.0)
+
+	def render(self) -> List[str]:
+		with self._lock:
+			values = dict(self._values)
+		return [
+			f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}"
+			for key, value in sorted(values.items())
+		]
+
+
+class Histogram:
+	"""Cumulative-bucket histogram with a fixed set of label names."""
+
+	kind = "histogram"
+
+	def __init__(
+		self,
+		name: str,
+		help: str,
+		labelnames: Sequence[str] = (),
+		buckets: Sequence[float] = LATENCY_BUCKETS,
+	) -> None:
+		self.name = name
+		self.help = help
+		self.labelnames = tuple(labelnames)
+		self.buckets = tuple(sorted(buckets))
+		# label values -> [per-bucket counts (+Inf last), sum, count]
+		self._series: Dict[LabelValues, List[Any]] = {}
+		self._lock = threading.Lock()
+
+	def observe(self, value: float, **labels: Any) -> None:
+		key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+		index = bisect.bisect_left(self.buckets, value)
+		with self._lock:
+			series = self._series.get(key)
+			if series is None:
+				series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+			series[0][index] += 1
+			series[1] += value
+			series[2] += 1
+
+	def count(self, **labels: Any) -> int:
+		key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+		with self._lock:
+			series = self._series.get(key)
+			return series[2] if series else 0
+
+	def render(self) -> List[str]:
+		with self._lock:
+			snapshot = {key: (list(series[0]), series[1], series[2]) for key, series in self._series.items()}
+		lines = []
+		for key, (bucket_counts, total, count) in sorted(snapshot.items()):
+			labels = dict(zip(self.labelnames, key))
+			cumulative = 0
+			for bound, bucket_count in zip(self.buckets + (math.inf,), bucket_counts):
+				cumulative += bucket_count
+				bucket_labels = _format_labels(dict(labels, le=_format_value(bound)))
+				lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+			lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+			lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+		return lines
+
+
+class MetricsRegistry:
+	"""Named counters and histograms rendered in the Prometheus text format."""
+
+	def __init__(self) -> None:
+		self._metrics: Dict[str, Any] = {}
+		self._lock = threading.Lock()
+
+	def _get_or_create(self, cls: type, name: str, *args: Any, **kwargs: Any) -> Any:
+		metric = self._metrics.get(name)
+		if metric is None:
+			with self._lock:
+				metric = self._metrics.get(name)
+				if metric is None:
+					metric = self._metrics[name] = cls(name, *args, **kwargs)
+		return metric
+
+	def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+		return self._get_or_create(Counter, name, help, labelnames)
+
+	def histogram(
+		self,
+		name: str,
+		help: str,
+		labelnames: Sequence[str] = (),
+		buckets: Sequence[float] = LATENCY_BUCKETS,
+	) -> Histogram:
+		return self._get_or_create(Histogram, name, help, labelnames, buckets)
+
+	def render(self, extra: Iterable[MetricFamily] = ()) -> str:
+		"""Text exposition of every metric, plus ``extra`` families computed by the caller."""
+		lines: List[str] = []
+		for name in sorted(self._metrics):
+			metric = self._metrics[name]
+			lines.append(f"# HELP {name} {metric.help}")
+			lines.append(f"# TYPE {name} {metric.kind}")
+			lines.extend(metric.render())
+		for name, kind, help, samples in extra:
+			lines.append(f"# HELP {name} {help}")
+			lines.append(f"# TYPE {name} {kind}")
+			lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+		return "\n".join(lines) + "\n"
+
+
+# Global registry (lazily initialized under lock)
+_registry: MetricsRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+	"""Get the process-wide metrics registry, creating it on first access."""
+	global _registry
+	registry = _registry
+	if registry is not None:
+		return registry
+	with _registry_lock:
+		if _registry is None:
+			_registry = MetricsRegistry()
+		return _registry
+
+
+def set_metrics_registry(registry: MetricsRegistry | None) -> None:
+	"""Replace the global registry; None starts an empty one on next access."""
+	global _registry
+	_registry = registry
+
+
+def observe_request(route: str, method: str, status: int, seconds: float) -> None:
+	get_metrics_registry().histogram(
+		PREFIX + "http_request_seconds", "Flask request latency until the response is returned.",
+		("route", "method", "status"),
+	).observe(seconds, route=route, method=method, status=status)
+
+
+def observe_completion(model: str, seconds: float, tokens: int = 0, error: Optional[str] = None) -> None:
+	"""Record one model completion call; ``error`` is a short reason when it failed."""
+	registry = get_metrics_registry()
+	route = current_route()
+	registry.histogram(
+		PREFIX + "completion_seconds", "Model completion request latency.", ("model", "route"),
+	).observe(seconds, model=model, route=route)
+	if tokens:
+		registry.counter(
+			PREFIX + "completion_tokens_total", "Tokens reported used by model completions.", ("model", "route"),
+		).inc(tokens, model=model, route=route)
+	if error:
+		count_error("completion:" + model, error)
+
+
+def observe_tokenization(model: str, op: str, seconds: float) -> None:
+	get_metrics_registry().histogram(
+		PREFIX + "tokenization_seconds", "Time spent encoding (op=encode) or chunking (op=chunk) text.",
+		("model", "op", "route"),
+	).observe(seconds, model=model, op=op, route=current_route())
+
+
+def observe_chunks(model: str, count: int) -> None:
+	get_metrics_registry().histogram(
+		PREFIX + "sentiment_chunks", "Chunks an article is split into for sentiment analysis.",
+		("model",), buckets=COUNT_BUCKETS,
+	).observe(count, model=model)
+
+
+def observe_newsapi(call: str, seconds: float, error: Optional[str] = None) -> None:
+	get_metrics_registry().histogram(
+		PREFIX + "newsapi_seconds", "NewsAPI request latency (cache misses only).", ("call", "route"),
+	).observe(seconds, call=call, route=current_route())
+	if error:
+		count_error("newsapi:" + call, error)
+
+
+def count_error(component: str, reason: str) -> None:
+	get_metrics_registry().counter(
+		PREFIX + "errors_total", "Failed upstream calls by component and reason.", ("component", "reason", "route"),
+	).inc(component=component, reason=reason, route=current_route())
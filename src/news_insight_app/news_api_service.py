@@ -1,19 +1,193 @@
+import contextvars
 import os
-from typing import List, Dict, Optional
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, List, Dict, Optional, Tuple
 import logging
 
+import requests
 from newsapi import NewsApiClient
 
+from .concurrency import get_executor
+from .metrics import observe_newsapi
+from .tracing import traced
+
+NEWSAPI_ORIGIN = 'https://newsapi.org'
+NEWS_API_BASE_URL = os.getenv('NEWS_API_BASE_URL', '').rstrip('/')
+NEWS_CACHE_TTL = float(os.getenv('NEWS_CACHE_TTL_SECONDS', '300'))
+NEWS_CACHE_STALE_TTL = float(os.getenv('NEWS_CACHE_STALE_SECONDS', '900'))
+NEWS_SOURCES_TTL = float(os.getenv('NEWS_SOURCES_TTL_SECONDS', '86400'))
+NEWS_CACHE_MAX_ENTRIES = int(os.getenv('NEWS_CACHE_MAX_ENTRIES', '256'))
+
+
+class ResponseCache:
+    """
+    Process-wide TTL cache with stale-while-revalidate and request coalescing.
+
+    Entries are fresh for ``ttl`` seconds and may then be served stale for a
+    further ``stale_ttl`` seconds while a single background refresh runs on
+    the ``news_refresh`` pool. Concurrent misses for the same key wait on one
+    in-flight fetch instead of each calling the API. At most ``max_entries``
+    values are kept; the least recently used one is evicted first.
+    """
+
+    def __init__(self, max_entries: int = NEWS_CACHE_MAX_ENTRIES,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple, Tuple[float, float, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.logger = logging.getLogger(__name__)
+
+    def get_or_fetch(self, key: Tuple, fetch: Callable[[], Any],
+                     ttl: float, stale_ttl: float = 0.0) -> Any:
+        """
+        Return the cached value for key, fetching it when missing.
+
+        Args:
+            key (Tuple): Normalized cache key
+            fetch (Callable): Zero-argument function producing a fresh value
+            ttl (float): Seconds a fetched value stays fresh
+            stale_ttl (float): Extra seconds a value may be served while refreshing
+
+        Returns:
+            Any: The cached or freshly fetched value
+        """
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry[0]:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None and now < entry[1]:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    future = Future()
+                    self._inflight[key] = future
+                    # Carry the route label and trace into the refresh's metrics and spans
+                    get_executor('news_refresh').submit(
+                        contextvars.copy_context().run,
+                        self._refresh_stale, key, fetch, ttl, stale_ttl, future,
+                    )
+                return entry[2]
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                future = Future()
+                self._inflight[key] = future
+                leader = True
+        if leader:
+            self._refresh(key, fetch, ttl, stale_ttl, future)
+        return future.result()
+
+    def _refresh(self, key: Tuple, fetch: Callable[[], Any], ttl: float,
+                 stale_ttl: float, future: Future) -> None:
+        try:
+            value = fetch()
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            return
+        expires = self._clock() + ttl
+        with self._lock:
+            self._entries[key] = (expires, expires + stale_ttl, value)
+            self._entries.move_to_end(key)
+            self._inflight.pop(key, None)
+            self._evict()
+        future.set_result(value)
+
+    def _refresh_stale(self, key: Tuple, fetch: Callable[[], Any], ttl: float,
+                       stale_ttl: float, future: Future) -> None:
+        """Refresh a stale entry in the background, logging a failed fetch."""
+        self._refresh(key, fetch, ttl, stale_ttl, future)
+        error = future.exception()
+        if error is not None:
+            self.logger.warning(f"Background refresh of {key[0]} failed: {error}")
+
+    def _evict(self) -> None:
+        now = self._clock()
+        for key in [k for k, entry in self._entries.items() if entry[1] <= now]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+            }
+
+
+# Shared across NewsApiService instances, which are created per request
+_response_cache = ResponseCache()
+
+
+def get_news_cache() -> ResponseCache:
+    """Return the process-wide NewsAPI response cache."""
+    return _response_cache
+
+
+class RebasedSession(requests.Session):
+    """
+    Session that sends requests meant for newsapi.org to another base URL,
+    such as a local NewsAPI stand-in used for load tests.
+    """
+
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, url, *args, **kwargs):
+        if isinstance(url, str) and url.startswith(NEWSAPI_ORIGIN):
+            url = self.base_url + url[len(NEWSAPI_ORIGIN):]
+        return super().request(method, url, *args, **kwargs)
+
 
 class NewsApiService:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None,
+                 cache_ttl: float = NEWS_CACHE_TTL,
+                 stale_ttl: float = NEWS_CACHE_STALE_TTL,
+                 sources_ttl: float = NEWS_SOURCES_TTL,
+                 base_url: str = NEWS_API_BASE_URL):
         """
         Initialize the News API service using the newsapi-python library.
         
         Args:
             api_key (str, optional): The API key for NewsAPI. If not provided,
                                    will try to read from NEWS_API_KEY environment variable.
+            cache_ttl (float): Seconds a search response stays fresh
+            stale_ttl (float): Extra seconds a stale search response may be served
+                               while it is refreshed in the background
+            sources_ttl (float): Seconds the source catalog stays cached
+            base_url (str): Send API calls here instead of https://newsapi.org
         """
+        self.cache_ttl = cache_ttl
+        self.stale_ttl = stale_ttl
+        self.sources_ttl = sources_ttl
         if api_key:
             self.api_key = api_key
         else:
@@ -22,9 +196,13 @@ class NewsApiService:
         if not self.api_key:
             raise ValueError("No API key provided. Set NEWS_API_KEY environment variable or pass it explicitly.")
         
-        self.client = NewsApiClient(api_key=self.api_key)
+        if base_url:
+            self.client = NewsApiClient(api_key=self.api_key, session=RebasedSession(base_url))
+        else:
+            self.client = NewsApiClient(api_key=self.api_key)
         self.logger = logging.getLogger(__name__)
     
+    @traced("newsapi.search_news")
     def search_news(self, query: str, max_articles: int = 10, 
                    source_category: Optional[str] = None) -> List[Dict]:
         """
@@ -58,26 +236,89 @@ class NewsApiService:
             if source_category:
                 kwargs['sources'] = self._get_sources_for_category(source_category)
             
-            # Make the API request using the library
-            response = self.client.get_everything(**kwargs)
+            articles = get_news_cache().get_or_fetch(
+                self._search_cache_key(kwargs),
+                lambda: self._fetch_articles(kwargs),
+                ttl=self.cache_ttl,
+                stale_ttl=self.stale_ttl,
+            )
+            return [dict(article) for article in articles[:max_articles]]
             
-            # Check for API errors
-            if response.get('status') != 'ok':
-                raise Exception(f"API returned status: {response.get('status')}")
+        except Exception as e:
+            self.logger.error(f"Error fetching news: {e}")
+            raise Exception(f"Failed to fetch news articles: {str(e)}")
+    
+    @staticmethod
+    def _search_cache_key(kwargs: Dict) -> Tuple:
+        """
+        Build a normalized cache key for a get_everything call.
+        
+        Args:
+            kwargs (Dict): Query parameters passed to get_everything
             
-            # Process articles
-            articles = []
-            if 'articles' in response:
-                for article in response['articles']:
-                    processed_article = self._process_article(article)
-                    if processed_article:
-                        articles.append(processed_article)
+        Returns:
+            Tuple: (query, sources, page_size, language, sort_by)
+        """
+        return (
+            'everything',
+            # Only whitespace is normalized: NewsAPI's AND/OR/NOT operators are case-sensitive
+            ' '.join(kwargs['q'].split()),
+            kwargs.get('sources', ''),
+            kwargs['page_size'],
+            kwargs['language'],
+            kwargs['sort_by'],
+        )
+    
+    def _fetch_articles(self, kwargs: Dict) -> List[Dict]:
+        """
+        Call get_everything and process the returned articles.
+        
+        Args:
+            kwargs (Dict): Query parameters passed to get_everything
             
-            return articles[:max_articles]
+        Returns:
+            List[Dict]: List of processed article dictionaries
+        """
+        # Make the API request using the library
+        response = self._timed_call('everything', lambda: self.client.get_everything(**kwargs))
+        
+        # Check for API errors
+        if response.get('status') != 'ok':
+            raise Exception(f"API returned status: {response.get('status')}")
+        
+        # Process articles
+        articles = []
+        if 'articles' in response:
+            for article in response['articles']:
+                processed_article = self._process_article(article)
+                if processed_article:
+                    articles.append(processed_article)
+        return articles
+    
+    @staticmethod
+    def _timed_call(call: str, request: Callable[[], Dict]) -> Dict:
+        """
+        Run one NewsAPI request and record its latency and outcome.
+        
+        Args:
+            call (str): Metric label for the endpoint ('everything' or 'sources')
+            request (Callable): Zero-argument function performing the request
             
+        Returns:
+            Dict: The API response
+        """
+        start = time.perf_counter()
+        error = None
+        try:
+            response = request()
+            if response.get('status') != 'ok':
+                error = f"status_{response.get('status')}"
+            return response
         except Exception as e:
-            self.logger.error(f"Error fetching news: {e}")
-            raise Exception(f"Failed to fetch news articles: {str(e)}")
+            error = type(e).__name__
+            raise
+        finally:
+            observe_newsapi(call, time.perf_counter() - start, error)
     
     def _validate_source_category(self, category: str) -> bool:
         """
@@ -150,13 +391,24 @@ class NewsApiService:
             List[Dict]: List of source dictionaries
         """
         try:
-            response = self.client.get_sources()
-            
-            if response.get('status') == 'ok':
-                return response.get('sources', [])
-            else:
-                raise Exception(f"API returned status: {response.get('status')}")
+            sources = get_news_cache().get_or_fetch(
+                ('sources',), self._fetch_sources, ttl=self.sources_ttl,
+            )
+            return list(sources)
             
         except Exception as e:
             self.logger.error(f"Error fetching sources: {e}")
-            raise Exception(f"Failed to fetch sources: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Failed to fetch sources: {str(e)}")
+    
+    def _fetch_sources(self) -> List[Dict]:
+        """
+        Call get_sources on the API client.
+        
+        Returns:
+            List[Dict]: List of source dictionaries
+        """
+        response = self._timed_call('sources', self.client.get_sources)
+        
+        if response.get('status') == 'ok':
+            return response.get('sources', [])
+        raise Exception(f"API returned status: {response.get('status')}")
\ No newline at end of file
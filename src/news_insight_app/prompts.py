@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Dict
+
+from .tokenizer_utils import get_tokenizer_provider
+
+
+class PromptTemplate:
+	"""
+	A versioned completion prompt laid out for server-side prefix caching.
+
+	``prefix`` holds every instruction that is the same for all requests and
+	always comes first; ``body`` is formatted with the per-request fields and
+	appended to it. Servers with automatic prefix caching (vLLM's APC) can
+	then reuse the KV cache of the whole instruction block and only prefill
+	the article. Bump ``version`` whenever either part changes, so results
+	cached under the old wording are not served.
+	"""
+
+	def __init__(self, name: str, version: str, prefix: str, body: str) -> None:
+		self.name = name
+		self.version = version
+		self.prefix = prefix
+		self.body = body
+		digest = hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:12]
+		self.prefix_id = f"{name}-v{version}-{digest}"
+		self._prefix_lengths: Dict[str, int] = {}
+
+	def render(self, **fields: Any) -> str:
+		return self.prefix + self.body.format(**fields)
+
+	def prefix_length(self, tokenizer_name: str) -> int:
+		"""Tokens in the shared prefix under ``tokenizer_name``'s tokenizer (memoized)."""
+		length = self._prefix_lengths.get(tokenizer_name)
+		if length is None:
+			length = self._prefix_lengths[tokenizer_name] = get_tokenizer_provider().count_tokens(
+				self.prefix, tokenizer_name,
+			)
+		return length
+
+	def payload_fields(self, tokenizer_name: str) -> Dict[str, Any]:
+		"""``prefix_id``/``prefix_length`` announcing the cacheable prefix to the backend."""
+		return {"prefix_id": self.prefix_id, "prefix_length": self.prefix_length(tokenizer_name)}
+
+
+RHETORIC_PROMPT = PromptTemplate(
+	"rhetoric",
+	"2",
+	"""You are a media analyst. Analyze the news article below for tone and rhetorical devices.
+
+Provide analysis in this format:
+1. Overall Tone: (e.g., neutral, persuasive, alarmist, celebratory)
+2. Sentiment: (positive, negative, or neutral with confidence score)
+3. Rhetorical Devices Found:
+   - List specific devices used (metaphors, appeals to emotion, repetition, loaded language, etc.)
+   - Quote examples from the text
+4. Bias Indicators: Any signs of bias or framing
+
+Article:
+""",
+	"""{article}
+
+Analysis:""",
+)
+
+COMPARISON_PROMPT = PromptTemplate(
+	"comparison",
+	"2",
+	"""You are a media analyst. Compare the two news articles below, which cover similar topics.
+
+Provide comparison in this format:
+1. Framing Differences: How does each article frame the story?
+2. Tone Comparison: Compare the tone and emotional appeal
+3. Source Selection: Note any differences in sources cited or perspectives included
+4. Key Differences: What facts or angles does one include that the other doesn't?
+5. Bias Assessment: Which article appears more balanced?
+
+Article 1:
+""",
+	"""{primary}
+
+Article 2:
+{reference}
+
+Comparison:""",
+)
+
+SENTIMENT_PROMPT = PromptTemplate(
+	"sentiment",
+	"2",
+	"""You are a sentiment and tone classifier. Return JSON only with no other text.
+Classify the article below:
+- sentiment: positive, negative, or neutral
+- tone: calm | emotional | inflammatory | persuasive | neutral | sarcastic | urgent
+- evidence: list of phrases that influenced your classification
+
+Article:
+""",
+	"""{article}
+
+JSON:""",
+)
+
+# Sentiment, tone and rhetoric of one article in a single completion; the
+# article is prefilled once instead of once per model.
+COMBINED_PROMPT = PromptTemplate(
+	"combined",
+	"1",
+	"""You are a media analyst and sentiment and tone classifier. Return JSON only with no other text.
+Analyze the news article below and answer with these keys:
+- sentiment: positive, negative, or neutral
+- tone: calm | emotional | inflammatory | persuasive | neutral | sarcastic | urgent
+- evidence: list of phrases that influenced your classification
+- analysis: one string holding a rhetorical analysis in this format:
+1. Overall Tone: (e.g., neutral, persuasive, alarmist, celebratory)
+2. Sentiment: (positive, negative, or neutral with confidence score)
+3. Rhetorical Devices Found:
+   - List specific devices used (metaphors, appeals to emotion, repetition, loaded language, etc.)
+   - Quote examples from the text
+4. Bias Indicators: Any signs of bias or framing
+
+Article:
+""",
+	"""{article}
+
+JSON:""",
+)
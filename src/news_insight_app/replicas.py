@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+ROUTING_POLICY = os.getenv("MODEL_ROUTING", "least_outstanding").lower()
+HEALTH_CHECK_SECONDS = float(os.getenv("MODEL_HEALTH_CHECK_SECONDS", "10"))
+HEALTH_PATH = os.getenv("MODEL_HEALTH_PATH", "/health")
+HEALTH_TIMEOUT = float(os.getenv("MODEL_HEALTH_TIMEOUT_SECONDS", "2"))
+HEDGE_REQUESTS = os.getenv("MODEL_HEDGE_REQUESTS", "0").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("MODEL_HEDGE_PERCENTILE", "0.95"))
+# Weight of the newest sample in each replica's moving-average latency
+LATENCY_ALPHA = 0.2
+
+POLICIES = ("least_outstanding", "latency")
+
+
+def parse_replicas(spec: str) -> List[str]:
+	"""Split a comma-separated endpoint setting into replica URLs."""
+	return [url.strip() for url in spec.split(",") if url.strip()]
+
+
+class Replica:
+	def __init__(self, url: str) -> None:
+		self.url = url
+		parts = urlsplit(url)
+		self.health_url = f"{parts.scheme}://{parts.netloc}{HEALTH_PATH}"
+		self.outstanding = 0
+		self.healthy = True
+		self.latency: Optional[float] = None
+		self.requests = 0
+		self.failures = 0
+
+
+class ReplicaPool:
+	"""
+	Interchangeable completion endpoints serving one model.
+
+	ranked() orders replicas best first. Replicas that failed their last
+	health probe, or that the caller reports as unavailable (an open
+	circuit), go to the back rather than being dropped, so a pool whose
+	replicas all look unhealthy still tries them. Among the rest,
+	``least_outstanding`` prefers the replica with the fewest requests in
+	flight, and ``latency`` the lowest expected wait, (outstanding + 1) x
+	moving-average latency. Ties rotate so idle replicas share the load.
+	"""
+
+	def __init__(self, urls: List[str], policy: str = ROUTING_POLICY) -> None:
+		if not urls:
+			raise ValueError("a replica pool needs at least one URL")
+		if policy not in POLICIES:
+			raise ValueError(f"unknown routing policy {policy!r}; expected one of {', '.join(POLICIES)}")
+		self.replicas = [Replica(url) for url in urls]
+		self.policy = policy
+		self.hedges_sent = 0
+		self.hedges_won = 0
+		self._rotation = itertools.count()
+		self._lock = threading.Lock()
+		self._prober: Optional[threading.Thread] = None
+		self._stopped = threading.Event()
+
+	def __len__(self) -> int:
+		return len(self.replicas)
+
+	def ranked(self, unavailable: Callable[[Replica], bool] = lambda replica: False) -> List[Replica]:
+		with self._lock:
+			offset = next(self._rotation) % len(self.replicas)
+			rotated = self.replicas[offset:] + self.replicas[:offset]
+			if self.policy == "latency":
+				# Replicas without a latency yet score 0 so they get tried
+				def load(replica: Replica) -> float:
+					return (replica.outstanding + 1) * (replica.latency or 0.0)
+			else:
+				def load(replica: Replica) -> float:
+					return replica.outstanding
+			scored = [(not replica.healthy, load(replica), replica) for replica in rotated]
+		scored.sort(key=lambda item: (item[0] or unavailable(item[2]), item[1]))
+		return [replica for _, _, replica in scored]
+
+	def acquire(self, replica: Replica) -> None:
+		with self._lock:
+			replica.outstanding += 1
+			replica.requests += 1
+
+	def release(self, replica: Replica, seconds: Optional[float] = None, ok: bool = True) -> None:
+		"""End one request; ``seconds`` updates the latency average when given."""
+		with self._lock:
+			replica.outstanding -= 1
+			if not ok:
+				replica.failures += 1
+			elif seconds is not None:
+				if replica.latency is None:
+					replica.latency = seconds
+				else:
+					replica.latency += LATENCY_ALPHA * (seconds - replica.latency)
+
+	def record_hedge(self, won: bool) -> None:
+		with self._lock:
+			self.hedges_sent += 1
+			if won:
+				self.hedges_won += 1
+
+	def probe(self, check: Callable[[str], bool]) -> None:
+		"""Run one health check per replica; ``check`` returns True for a healthy URL."""
+		for replica in self.replicas:
+			try:
+				healthy = check(replica.health_url)
+			except Exception:
+				healthy = False
+			with self._lock:
+				replica.healthy = healthy
+
+	def start_probing(self, check: Callable[[str], bool], interval: float = HEALTH_CHECK_SECONDS) -> None:
+		"""
+		Probe every ``interval`` seconds from a daemon thread until
+		stop_probing() is called (no-op if already running or stopped).
+		"""
+		if interval <= 0 or self._prober is not None or self._stopped.is_set():
+			return
+
+		def loop() -> None:
+			while not self._stopped.wait(interval):
+				self.probe(check)
+
+		self._prober = threading.Thread(target=loop, name="replica-health", daemon=True)
+		self._prober.start()
+
+	def stop_probing(self, timeout: Optional[float] = None) -> None:
+		"""Stop the health prober, waiting up to ``timeout`` seconds for an in-flight probe."""
+		self._stopped.set()
+		prober = self._prober
+		if prober is not None and prober is not threading.current_thread():
+			prober.join(timeout)
+
+	def stats(self) -> Dict[str, Any]:
+		with self._lock:
+			return {
+				"policy": self.policy,
+				"hedges_sent": self.hedges_sent,
+				"hedges_won": self.hedges_won,
+				"replicas": {
+					replica.url: {
+						"healthy": replica.healthy,
+						"outstanding": replica.outstanding,
+						"requests": replica.requests,
+						"failures": replica.failures,
+						"latency_ms": round(replica.latency * 1000, 1) if replica.latency is not None else None,
+					}
+					for replica in self.replicas
+				},
+			}
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+ANALYSIS_CACHE_TTL = float(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "86400"))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "512"))
+ANALYSIS_CACHE_DB = os.getenv("ANALYSIS_CACHE_DB", "")
+
+_bypass = contextvars.ContextVar("analysis_cache_bypass", default=False)
+
+
+@contextlib.contextmanager
+def cache_bypass(enabled: bool = True) -> Iterator[None]:
+	"""Skip cache reads for model calls made inside this block.
+
+	Fresh results are still written back, so a bypassed request refreshes
+	the cached entry for everyone else.
+	"""
+	token = _bypass.set(bool(enabled))
+	try:
+		yield
+	finally:
+		_bypass.reset(token)
+
+
+def cache_bypassed() -> bool:
+	return _bypass.get()
+
+
+def make_cache_key(*parts: Any) -> str:
+	"""Hash arbitrary JSON-serialisable key parts into a stable hex digest."""
+	encoded = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+	return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+	"""Thread-safe in-memory LRU with per-entry TTL and hit/miss counters."""
+
+	def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+		self.max_entries = max_entries
+		self.ttl_seconds = ttl_seconds
+		self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+		self._lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def get(self, key: str) -> Optional[Any]:
+		now = time.monotonic()
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is not None and entry[0] > now:
+				self._entries.move_to_end(key)
+				self.hits += 1
+				return entry[1]
+			if entry is not None:
+				del self._entries[key]
+			self.misses += 1
+			return None
+
+	def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+		ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+		if self.max_entries <= 0 or ttl <= 0:
+			return
+		with self._lock:
+			self._entries[key] = (time.monotonic() + ttl, value)
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.max_entries:
+				self._entries.popitem(last=False)
+				self.evictions += 1
+
+	def clear(self) -> None:
+		with self._lock:
+			self._entries.clear()
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+	def stats(self) -> Dict[str, Any]:
+		with self._lock:
+			lookups = self.hits + self.misses
+			return {
+				"entries": len(self._entries),
+				"max_entries": self.max_entries,
+				"hits": self.hits,
+				"misses": self.misses,
+				"evictions": self.evictions,
+				"hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+			}
+
+
+class ResultCache:
+	"""
+	Two-tier cache for deterministic model analyses.
+
+	The in-memory LRU serves hot entries; when ``db_path`` is set, entries
+	are also written to a SQLite table so they survive restarts. Expired
+	rows are deleted on the next write, or when a read finds one.
+	"""
+
+	def __init__(
+		self,
+		max_entries: int = ANALYSIS_CACHE_MAX_ENTRIES,
+		ttl_seconds: float = ANALYSIS_CACHE_TTL,
+		db_path: Optional[str] = ANALYSIS_CACHE_DB or None,
+	) -> None:
+		self.ttl_seconds = ttl_seconds
+		self._memory = LRUCache(max_entries, ttl_seconds)
+		self._db_path = db_path
+		self._db: Optional[sqlite3.Connection] = None
+		self._db_lock = threading.Lock()
+		self.disk_hits = 0
+		if db_path:
+			self._db = sqlite3.connect(db_path, check_same_thread=False)
+			self._db.execute(
+				"CREATE TABLE IF NOT EXISTS analysis_cache ("
+				"key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+			)
+			self._db.execute(
+				"CREATE INDEX IF NOT EXISTS analysis_cache_expires_at ON analysis_cache (expires_at)"
+			)
+			self._db.commit()
+
+	def get(self, key: str) -> Optional[Dict[str, Any]]:
+		value = self._memory.get(key)
+		if value is not None or self._db is None:
+			return value
+		now = time.time()
+		with self._db_lock:
+			row = self._db.execute(
+				"SELECT value, expires_at FROM analysis_cache WHERE key = ?",
+				(key,),
+			).fetchone()
+			if row is not None and row[1] <= now:
+				self._db.execute(
+					"DELETE FROM analysis_cache WHERE key = ? AND expires_at <= ?", (key, now),
+				)
+				self._db.commit()
+		if row is None or row[1] <= now:
+			return None
+		value = json.loads(row[0])
+		self.disk_hits += 1
+		self._memory.set(key, value, ttl_seconds=row[1] - time.time())
+		return value
+
+	def set(self, key: str, value: Dict[str, Any]) -> None:
+		self._memory.set(key, value)
+		if self._db is None:
+			return
+		now = time.time()
+		with self._db_lock:
+			# Expired rows are never read again; prune them so the table stays bounded
+			self._db.execute("DELETE FROM analysis_cache WHERE expires_at <= ?", (now,))
+			self._db.execute(
+				"INSERT OR REPLACE INTO analysis_cache (key, value, expires_at) VALUES (?, ?, ?)",
+				(key, json.dumps(value), now + self.ttl_seconds),
+			)
+			self._db.commit()
+
+	def clear(self) -> None:
+		self._memory.clear()
+		if self._db is None:
+			return
+		with self._db_lock:
+			self._db.execute("DELETE FROM analysis_cache")
+			self._db.commit()
+
+	def stats(self) -> Dict[str, Any]:
+		stats = self._memory.stats()
+		stats["disk_enabled"] = self._db is not None
+		stats["disk_hits"] = self.disk_hits
+		return stats
+
+
+# Global analysis cache instance (lazily initialized under lock)
+_analysis_cache: ResultCache | None = None
+_analysis_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> ResultCache:
+	"""Get the process-wide analysis result cache, creating it on first access."""
+	global _analysis_cache
+	with _analysis_cache_lock:
+		if _analysis_cache is None:
+			_analysis_cache = ResultCache()
+	return _analysis_cache
+
+
+def set_analysis_cache(cache: ResultCache | None) -> None:
+	"""Replace the global analysis cache; None resets it on next access."""
+	global _analysis_cache
+	_analysis_cache = cache
@@ -2,115 +2,443 @@ from __future__ import annotations
 
 import json
 import os
+import re
 import time
-from typing import Any, Dict
-
-import requests
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
+from .concurrency import run_parallel
+from .http_client import get_http_client
+from .metrics import observe_completion
+from .prompts import SENTIMENT_PROMPT
+from .result_cache import LRUCache, cache_bypassed, make_cache_key
 from .tokenizer_utils import get_tokenizer_provider
+from .tracing import traced
 
 PHI_URL = os.getenv("PHI_ANALYSIS_URL", "http://192.168.1.108:8002/v1/completions")
 PHI_MODEL_NAME = "phi3.5:latest"
+PHI_TIMEOUT = float(os.getenv("PHI_TIMEOUT_SECONDS", "60"))
+PHI_MAX_BATCH_SIZE = int(os.getenv("PHI_MAX_BATCH_SIZE", "8"))
+SENTIMENT_CACHE_MAX_ENTRIES = int(os.getenv("SENTIMENT_CACHE_MAX_ENTRIES", "1024"))
+SENTIMENT_CACHE_TTL = float(os.getenv("SENTIMENT_CACHE_TTL_SECONDS", "3600"))
+# "text" (free-form answer, parsed leniently), "guided_json" (vLLM guided
+# decoding) or "response_format" (OpenAI-style json_schema response format)
+SENTIMENT_OUTPUT_MODE = os.getenv("SENTIMENT_OUTPUT_MODE", "text").lower()
+OUTPUT_MODES = ("text", "guided_json", "response_format")
 
+SENTIMENT_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "sentiment": {"type": "string", "enum": ["positive", "negative", "neutral"]},
+        "tone": {
+            "type": "string",
+            "enum": ["calm", "emotional", "inflammatory", "persuasive", "neutral", "sarcastic", "urgent"],
+        },
+        "evidence": {"type": "array", "items": {"type": "string", "maxLength": 200}, "maxItems": 5},
+    },
+    "required": ["sentiment", "tone", "evidence"],
+    "additionalProperties": False,
+}
+# Constrained decoders may pad with whitespace until max_tokens; a blank
+# line never occurs inside the JSON answer, so stop there.
+STRUCTURED_STOP = ["\n\n"]
 
-def _extract_first_json(text: str) -> Any:
-    """Return the first valid JSON object found in text, or None."""
-    decoder = json.JSONDecoder()
-    for i, ch in enumerate(text):
-        if ch == "{":
-            try:
-                obj, _ = decoder.raw_decode(text, i)
-                return obj
-            except json.JSONDecodeError:
-                continue
+
+# Structural characters inside an object
+_STRUCTURE = re.compile(r'[{}"]')
+# A JSON object opens with a key or closes at once
+_OBJECT_START = re.compile(r'\{\s*["}]')
+_SENTIMENT_FIELD = re.compile(r'"sentiment"\s*:\s*"(positive|negative|neutral)"', re.I)
+# Nested spans deeper than this are not candidates of their own
+_MAX_DEPTH = 64
+# Characters json.loads may be handed per character of model output
+_PARSE_BUDGET = 4
+
+
+def _string_end(text: str, pos: int) -> int:
+    """
+    Return the index just past the string literal opening at pos, or -1.
+
+    Closing quotes are located with str.find and skipped while an odd
+    number of backslashes escapes them, so an unterminated string costs
+    one scan to the end of text instead of a backtracking regex failure.
+    """
+    end = text.find('"', pos + 1)
+    while end >= 0:
+        before = end - 1
+        while text[before] == "\\":
+            before -= 1
+        if (end - before) % 2:
+            return end + 1
+        end = text.find('"', end + 1)
+    return -1
+
+
+def _object_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """
+    Yield (start, end) of balanced ``{...}`` spans in one pass over text.
+
+    Each top-level span is yielded as soon as it closes, followed by the
+    spans nested in it in order of their opening brace; spans inside an
+    object that never closes come last. Braces inside string literals
+    don't count, and quotes only open strings inside an object, so stray
+    quotes in prose are ignored. Scanning stops at an unterminated string.
+    """
+    nested: List[Tuple[int, int]] = []
+    stack: List[int] = []
+    overflow = 0
+    pos = 0
+    while True:
+        if not stack:
+            if nested:
+                nested.sort()
+                yield from nested
+                nested = []
+            pos = text.find("{", pos)
+            if pos < 0:
+                return
+            stack.append(pos)
+            pos += 1
+            continue
+        match = _STRUCTURE.search(text, pos)
+        if match is None:
+            break
+        char, pos = match.group(), match.start()
+        if char == '"':
+            pos = _string_end(text, pos)
+            if pos < 0:
+                break
+            continue
+        if char == "{":
+            if len(stack) < _MAX_DEPTH:
+                stack.append(pos)
+            else:
+                overflow += 1
+        elif overflow:
+            overflow -= 1
+        else:
+            start = stack.pop()
+            if stack:
+                nested.append((start, pos + 1))
+            else:
+                yield start, pos + 1
+        pos += 1
+    nested.sort()
+    yield from nested
+
+
+def _extract_first_json(text: str, strict: bool = True) -> Any:
+    """
+    Return the first valid JSON object found in text, or None.
+
+    Well-formed output is decoded straight from its first brace. Otherwise
+    the balanced spans from _object_spans are tried, outer objects before
+    the objects nested in them, and the total text handed to the decoder
+    is capped at a few times the input length, so malformed output costs
+    linear time at worst. ``strict=False`` accepts raw control characters
+    such as newlines inside strings, which unconstrained models emit in
+    multi-line string values.
+    """
+    first = text.find("{")
+    if first < 0:
+        return None
+    decoder = json.JSONDecoder(strict=strict)
+    # Nesting past the interpreter's recursion limit makes the decoder raise
+    # RecursionError; such answers are as unusable as malformed ones
+    try:
+        obj, _ = decoder.raw_decode(text, first)
+        if isinstance(obj, dict):
+            return obj
+    except (ValueError, RecursionError):
+        pass
+    budget = _PARSE_BUDGET * len(text)
+    for start, end in _object_spans(text):
+        if end - start > budget or not _OBJECT_START.match(text, start):
+            continue
+        budget -= end - start
+        try:
+            obj = decoder.decode(text[start:end])
+        except (ValueError, RecursionError):
+            continue
+        if isinstance(obj, dict):
+            return obj
     return None
 
 
+def structured_output_fields(output_mode: str, name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Payload fields asking the server to constrain its answer to ``schema`` in ``output_mode``."""
+    if output_mode == "guided_json":
+        return {"guided_json": schema, "stop": STRUCTURED_STOP}
+    if output_mode == "response_format":
+        return {
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {"name": name, "schema": schema, "strict": True},
+            },
+            "stop": STRUCTURED_STOP,
+        }
+    return {}
+
+
+def _fallback_sentiment(raw_text: str, output_mode: str) -> str:
+    """
+    Label for an answer that holds no valid JSON object.
+
+    A truncated or malformed JSON answer still names its sentiment field;
+    otherwise only a plain prose answer in text mode is searched for
+    keywords. Words inside broken JSON (quoted evidence, say) or inside a
+    constrained answer never decide the label; those stay neutral.
+    """
+    field = _SENTIMENT_FIELD.search(raw_text)
+    if field is not None:
+        return field.group(1).lower()
+    if output_mode != "text" or "{" in raw_text:
+        return "neutral"
+    lower = raw_text.lower()
+    if "negative" in lower:
+        return "negative"
+    if "positive" in lower:
+        return "positive"
+    return "neutral"
+
+
+def check_output_mode(output_mode: str) -> None:
+    """Raise ValueError unless ``output_mode`` is one of OUTPUT_MODES."""
+    if output_mode not in OUTPUT_MODES:
+        raise ValueError(f"unknown sentiment output mode {output_mode!r}; expected one of {', '.join(OUTPUT_MODES)}")
+
+
+def parse_sentiment_answer(raw_text: str, output_mode: str = "text", strict: bool = True) -> Tuple[str, Any]:
+    """
+    Return (sentiment, raw) for a model answer: the lower-case sentiment
+    label and the first JSON object in the answer, or the answer text
+    itself when it holds no valid object. See _extract_first_json for
+    ``strict``.
+    """
+    parsed = _extract_first_json(raw_text, strict)
+    if parsed is not None:
+        return str(parsed.get("sentiment", "neutral")).lower(), parsed
+    return _fallback_sentiment(raw_text, output_mode), raw_text
+
+
+def sentiment_result(
+    text: str,
+    sentiment_raw: str,
+    raw: Any,
+    model_name: str,
+    latency_ms: int,
+    tokenizer_name: Optional[str] = None,
+) -> Dict[str, Any]:
+    """The sentiment result for ``text`` given the model's label and parsed answer."""
+    if sentiment_raw == "negative":
+        label, sentiment, polarity = "NEGATIVE", "Negative", -1.0
+    elif sentiment_raw == "positive":
+        label, sentiment, polarity = "POSITIVE", "Positive", 1.0
+    else:
+        label, sentiment, polarity = "NEUTRAL", "Neutral", 0.0
+
+    score = 1.0 if sentiment_raw != "neutral" else 0.0
+
+    provider = get_tokenizer_provider()
+    token_count = provider.count_tokens(text, tokenizer_name or model_name)
+
+    return {
+        "sentiment": sentiment,
+        "polarity": polarity,
+        "subjectivity": 1.0,
+        "model": model_name,
+        "confidence": score,
+        "label": label,
+        "score": score,
+        "raw": raw,
+        "token_count": token_count,
+        "latency_ms": latency_ms,
+        "cached": False,
+    }
+
+
+def _normalize_chunk(text: str) -> str:
+    """Collapse whitespace so trivially re-wrapped copies of a chunk share a cache entry."""
+    return " ".join(text.split())
+
+
 class SentimentService:
     def __init__(
         self,
         model_name: str = PHI_MODEL_NAME,
         phi_url: str = PHI_URL,
+        cache_max_entries: int = SENTIMENT_CACHE_MAX_ENTRIES,
+        cache_ttl_seconds: float = SENTIMENT_CACHE_TTL,
+        max_batch_size: int = PHI_MAX_BATCH_SIZE,
+        output_mode: str = SENTIMENT_OUTPUT_MODE,
     ) -> None:
+        check_output_mode(output_mode)
         self.model_name = model_name
+        self.output_mode = output_mode
         self._phi_url = phi_url
+        self._memo = LRUCache(cache_max_entries, cache_ttl_seconds)
+        self.max_batch_size = max(1, max_batch_size)
 
-    def analyze(self, text: str) -> Dict[str, Any]:
-        if not text:
-            return {
-                "sentiment": "Neutral",
-                "polarity": 0.0,
-                "subjectivity": 0.0,
-                "model": self.model_name,
-                "confidence": 0.0,
-                "label": "NEUTRAL",
-                "score": 0.0,
-                "raw": None,
-                "token_count": 0,
-                "latency_ms": 0,
-            }
-
-        prompt = (
-            "You are a sentiment and tone classifier. Return JSON only with no other text.\n"
-            "Article:\n"
-            f"{text}\n\n"
-            "Classify:\n"
-            "- sentiment: positive, negative, or neutral\n"
-            "- tone: calm | emotional | inflammatory | persuasive | neutral | sarcastic | urgent\n"
-            "- evidence: list of phrases that influenced your classification\n"
-        )
+    def _memo_key(self, text: str) -> str:
+        return make_cache_key(self.model_name, SENTIMENT_PROMPT.version, _normalize_chunk(text))
 
-        start_time = time.perf_counter()
-        body: Dict[str, Any] = {}
+    def cache_stats(self) -> Dict[str, Any]:
+        return self._memo.stats()
+
+    def _empty_result(self) -> Dict[str, Any]:
+        return {
+            "sentiment": "Neutral",
+            "polarity": 0.0,
+            "subjectivity": 0.0,
+            "model": self.model_name,
+            "confidence": 0.0,
+            "label": "NEUTRAL",
+            "score": 0.0,
+            "raw": None,
+            "token_count": 0,
+            "latency_ms": 0,
+            "cached": False,
+        }
+
+    def _memo_lookup(self, memo_key: str) -> Optional[Dict[str, Any]]:
+        if cache_bypassed():
+            return None
+        cached = self._memo.get(memo_key)
+        if cached is None:
+            return None
+        # latency_ms stays that of the original model call
+        return dict(cached, cached=True)
+
+    @staticmethod
+    def _build_prompt(text: str) -> str:
+        return SENTIMENT_PROMPT.render(article=text)
+
+    def _output_fields(self) -> Dict[str, Any]:
+        """Payload fields asking the server to constrain its answer to SENTIMENT_SCHEMA."""
+        return structured_output_fields(self.output_mode, "sentiment", SENTIMENT_SCHEMA)
+
+    def _post(self, prompt: Any) -> Dict[str, Any]:
+        """Send one completion request; ``prompt`` may be a string or a list of strings."""
+        start = time.perf_counter()
+        tokens = 0
+        error: Optional[str] = None
         try:
-            response = requests.post(
+            response = get_http_client().post(
                 self._phi_url,
-                json={"prompt": prompt, "max_tokens": 200, "temperature": 0.3},
-                timeout=60,
+                json={
+                    "prompt": prompt,
+                    "max_tokens": 200,
+                    "temperature": 0.3,
+                    **SENTIMENT_PROMPT.payload_fields(self.model_name),
+                    **self._output_fields(),
+                },
+                timeout=PHI_TIMEOUT,
             )
             response.raise_for_status()
             body = response.json()
+            tokens = (body.get("usage") or {}).get("total_tokens", 0) or 0
+            return body
+        except Exception as exc:
+            error = type(exc).__name__
+            raise
+        finally:
+            observe_completion(self.model_name, time.perf_counter() - start, tokens, error)
+
+    def _build_result(self, text: str, raw_text: str, latency_ms: int) -> Dict[str, Any]:
+        sentiment_raw, raw_parsed = parse_sentiment_answer(raw_text, self.output_mode)
+        return sentiment_result(text, sentiment_raw, raw_parsed, self.model_name, latency_ms)
+
+    @traced("sentiment.analyze")
+    def analyze(self, text: str) -> Dict[str, Any]:
+        if not text:
+            return self._empty_result()
+
+        memo_key = self._memo_key(text)
+        cached = self._memo_lookup(memo_key)
+        if cached is not None:
+            return cached
+
+        start_time = time.perf_counter()
+        body: Dict[str, Any] = {}
+        try:
+            body = self._post(self._build_prompt(text))
         except Exception:
             pass
         latency_ms = int((time.perf_counter() - start_time) * 1000)
 
         choices = body.get("choices") or []
         raw_text = choices[0].get("text", "").strip() if choices else ""
+        result = self._build_result(text, raw_text, latency_ms)
+        # Only memoize real model answers; a failed call should be retried next time.
+        if choices:
+            self._memo.set(memo_key, dict(result))
+        return result
 
-        sentiment_raw = "neutral"
-        raw_parsed: Any = raw_text
-        parsed = _extract_first_json(raw_text)
-        if parsed is not None:
-            raw_parsed = parsed
-            sentiment_raw = str(parsed.get("sentiment", "neutral")).lower()
-        else:
-            lower = raw_text.lower()
-            if "negative" in lower:
-                sentiment_raw = "negative"
-            elif "positive" in lower:
-                sentiment_raw = "positive"
-
-        if sentiment_raw == "negative":
-            label, sentiment, polarity = "NEGATIVE", "Negative", -1.0
-        elif sentiment_raw == "positive":
-            label, sentiment, polarity = "POSITIVE", "Positive", 1.0
-        else:
-            label, sentiment, polarity = "NEUTRAL", "Neutral", 0.0
+    @traced("sentiment.analyze_many")
+    def analyze_many(self, texts: Sequence[str]) -> List[Dict[str, Any]]:
+        """
+        Classify many texts using batched completion requests.
 
-        score = 1.0 if sentiment_raw != "neutral" else 0.0
+        Memoized and empty texts are answered locally; the remaining unique
+        texts are sent as prompt lists of at most ``max_batch_size`` per
+        request. Results come back in the same order as ``texts``.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        pending: Dict[str, List[int]] = {}
+        pending_text: Dict[str, str] = {}
+        for i, text in enumerate(texts):
+            if not text:
+                results[i] = self._empty_result()
+                continue
+            memo_key = self._memo_key(text)
+            cached = self._memo_lookup(memo_key)
+            if cached is not None:
+                results[i] = cached
+                continue
+            pending.setdefault(memo_key, []).append(i)
+            pending_text.setdefault(memo_key, text)
 
-        provider = get_tokenizer_provider()
-        token_count = provider.count_tokens(text, self.model_name)
+        keys = list(pending)
+        batches = [
+            keys[start:start + self.max_batch_size]
+            for start in range(0, len(keys), self.max_batch_size)
+        ]
+        # Batches beyond the first are independent requests; send them together.
+        batch_results = run_parallel(
+            [lambda batch=batch: self._classify_batch(batch, pending_text) for batch in batches],
+            pool="sentiment_chunks",
+        )
+        for batch, batch_result in zip(batches, batch_results):
+            for key, result in zip(batch, batch_result):
+                for i in pending[key]:
+                    results[i] = dict(result)
+        return results  # type: ignore[return-value]
 
-        return {
-            "sentiment": sentiment,
-            "polarity": polarity,
-            "subjectivity": 1.0,
-            "model": self.model_name,
-            "confidence": score,
-            "label": label,
-            "score": score,
-            "raw": raw_parsed,
-            "token_count": token_count,
-            "latency_ms": latency_ms,
-        }
\ No newline at end of file
+    def _classify_batch(
+        self,
+        batch_keys: List[str],
+        texts_by_key: Dict[str, str],
+    ) -> List[Dict[str, Any]]:
+        batch_texts = [texts_by_key[key] for key in batch_keys]
+        start_time = time.perf_counter()
+        body: Dict[str, Any] = {}
+        try:
+            body = self._post([self._build_prompt(text) for text in batch_texts])
+        except Exception:
+            pass
+        latency_ms = int((time.perf_counter() - start_time) * 1000)
+
+        raw_texts = [""] * len(batch_keys)
+        answered = [False] * len(batch_keys)
+        for position, choice in enumerate(body.get("choices") or []):
+            index = choice.get("index", position)
+            if isinstance(index, int) and 0 <= index < len(batch_keys):
+                raw_texts[index] = (choice.get("text") or "").strip()
+                answered[index] = True
+
+        results = []
+        for key, text, raw_text, ok in zip(batch_keys, batch_texts, raw_texts, answered):
+            result = self._build_result(text, raw_text, latency_ms)
+            if ok:
+                self._memo.set(key, dict(result))
+            results.append(result)
+        return results
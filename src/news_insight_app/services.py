@@ -1,5 +1,12 @@
+import bisect
+import time
+
+from .concurrency import run_parallel
+from .metrics import observe_chunks, observe_tokenization
 from .sentiment_service import SentimentService
-from .tokenizer_utils import get_tokenizer_provider
+from .text_profile import get_text_profile
+from .tokenizer_utils import encode_with_offsets, get_tokenizer_provider
+from .tracing import traced
 
 _sentiment_service = None
 
@@ -53,10 +60,7 @@ Some Republicans have suggested requiring a standing filibuster, which would req
 
 def generate_summary(text, max_sentences=2):
 	"""Generate a concise summary using simple sentence extraction"""
-	sentences = [s.strip() for s in text.split('.') if s.strip()]
-	if len(sentences) <= max_sentences:
-		return text
-	return '. '.join(sentences[:max_sentences]) + '. ..'
+	return get_text_profile(text).summary(max_sentences)
 
 
 def _get_sentiment_service():
@@ -66,6 +70,11 @@ def _get_sentiment_service():
 	return _sentiment_service
 
 
+def sentiment_cache_stats():
+	"""Hit/miss counters for the shared sentiment service's chunk memo."""
+	return _get_sentiment_service().cache_stats()
+
+
 def _get_max_chunk_tokens(tokenizer, max_tokens):
 	model_max = getattr(tokenizer, "model_max_length", max_tokens)
 	if model_max is None or model_max > 100000:
@@ -90,6 +99,7 @@ def _split_long_sentence(sentence_text, tokenizer, max_chunk_tokens):
 	return chunks
 
 
+@traced("chunk_text")
 def _chunk_text(text, max_tokens=510):
 	"""
 	Chunk text into manageable pieces for analysis.
@@ -103,6 +113,93 @@ def _chunk_text(text, max_tokens=510):
 	tokenizer = provider.get_tokenizer(model_name)
 	max_chunk_tokens = _get_max_chunk_tokens(tokenizer, max_tokens)
 
+	start = time.perf_counter()
+	offsets = encode_with_offsets(tokenizer, text)
+	if offsets is None:
+		chunks = _chunk_text_by_sentence(text, tokenizer, max_chunk_tokens)
+	else:
+		chunks = _chunk_text_by_offsets(text, offsets, max_chunk_tokens)
+	observe_tokenization(model_name, "chunk", time.perf_counter() - start)
+	observe_chunks(model_name, len(chunks))
+	return chunks
+
+
+def _chunk_text_by_offsets(text, offsets, max_chunk_tokens):
+	"""
+	Chunk using one whole-document encoding.
+
+	Sentence spans come from the same '.' split as the per-sentence chunker,
+	and a sentence's token count is the number of document tokens that
+	overlap its span, found by bisecting the token offsets. The span runs
+	through the sentence's closing '.', since the per-sentence chunker
+	encodes ``f"{sentence}."``; a final sentence without one is counted as
+	if it had it. Sentences longer than the limit are cut into token windows
+	by slicing the original string at token offsets, so nothing is
+	re-encoded or decoded.
+	"""
+	token_starts = [start for start, _ in offsets]
+	token_ends = [end for _, end in offsets]
+
+	chunks = []
+	current_sentences = []
+	current_token_count = 0
+	position = 0
+	for piece in text.split('.'):
+		piece_start = position
+		position += len(piece) + 1
+		sentence = piece.strip()
+		if not sentence:
+			continue
+		start = piece_start + len(piece) - len(piece.lstrip())
+		end = min(position, len(text))
+		first = bisect.bisect_right(token_ends, start)
+		last = bisect.bisect_left(token_starts, end)
+		# The period the per-sentence chunker appends to an unterminated sentence
+		missing_period = 0 if position <= len(text) else 1
+		sentence_token_count = max(0, last - first) + missing_period
+		sentence_text = f"{sentence}."
+
+		if sentence_token_count > max_chunk_tokens:
+			if current_sentences:
+				chunks.append(" ".join(current_sentences).strip())
+				current_sentences = []
+				current_token_count = 0
+			# Tokens from here on hold only the closing period
+			period = bisect.bisect_left(token_starts, start + len(sentence))
+			for i in range(first, first + sentence_token_count, max_chunk_tokens):
+				if i >= period:
+					chunks.append(".")
+					continue
+				j = min(i + max_chunk_tokens, period) - 1
+				# Collapse whitespace runs as decoding the window's tokens would
+				chunk_text = " ".join(
+					text[max(start, token_starts[i]):min(end, token_ends[j])].split()
+				)
+				if chunk_text and not chunk_text.endswith("."):
+					chunk_text += "."
+				if chunk_text:
+					chunks.append(chunk_text)
+			continue
+
+		if current_token_count + sentence_token_count <= max_chunk_tokens:
+			current_sentences.append(sentence_text)
+			current_token_count += sentence_token_count
+		else:
+			chunks.append(" ".join(current_sentences).strip())
+			current_sentences = [sentence_text]
+			current_token_count = sentence_token_count
+
+	if current_sentences:
+		chunks.append(" ".join(current_sentences).strip())
+
+	return chunks
+
+
+def _chunk_text_by_sentence(text, tokenizer, max_chunk_tokens):
+	"""
+	Sentence-by-sentence chunker: encodes each sentence separately.
+	Used when the tokenizer cannot report character offsets.
+	"""
 	# Split by sentences and group into chunks based on token counts.
 	sentences = [s.strip() for s in text.split('.') if s.strip()]
 	chunks = []
@@ -139,6 +236,73 @@ def _chunk_text(text, max_tokens=510):
 	return chunks
 
 
+_LABELS = {
+	"Positive": ("POSITIVE", 1.0),
+	"Negative": ("NEGATIVE", -1.0),
+	"Neutral": ("NEUTRAL", 0.0),
+}
+
+
+def _reduce_chunk_sentiments(chunk_results):
+	"""
+	Combine per-chunk sentiment results into one, weighting each chunk by
+	its token count. The label with the most token weight wins; polarity is
+	the weighted mean and confidence is the winning label's weight share.
+	"""
+	weights = [max(1, r.get("token_count") or 0) for r in chunk_results]
+	total_weight = sum(weights)
+
+	label_weight = {}
+	for result, weight in zip(chunk_results, weights):
+		label_weight[result["sentiment"]] = label_weight.get(result["sentiment"], 0) + weight
+	sentiment = max(label_weight, key=label_weight.get)
+	label, _ = _LABELS.get(sentiment, _LABELS["Neutral"])
+	polarity = sum(r["polarity"] * w for r, w in zip(chunk_results, weights)) / total_weight
+	confidence = label_weight[sentiment] / total_weight if sentiment != "Neutral" else 0.0
+
+	evidence = []
+	tone_weight = {}
+	chunks = []
+	for index, (result, weight) in enumerate(zip(chunk_results, weights)):
+		raw = result.get("raw")
+		tone = ""
+		if isinstance(raw, dict):
+			tone = raw.get("tone") or ""
+			chunk_evidence = raw.get("evidence")
+			if isinstance(chunk_evidence, list):
+				evidence.extend(e for e in chunk_evidence if e not in evidence)
+		if tone:
+			tone_weight[tone] = tone_weight.get(tone, 0) + weight
+		chunks.append({
+			"index": index,
+			"sentiment": result["sentiment"],
+			"tone": tone,
+			"token_count": result.get("token_count", 0),
+			"latency_ms": result.get("latency_ms", 0),
+			"cached": result.get("cached", False),
+		})
+
+	return {
+		"sentiment": sentiment,
+		"polarity": round(polarity, 4),
+		"subjectivity": 1.0,
+		"model": chunk_results[0]["model"],
+		"confidence": round(confidence, 4),
+		"label": label,
+		"score": round(confidence, 4),
+		"raw": {
+			"sentiment": sentiment.lower(),
+			"tone": max(tone_weight, key=tone_weight.get) if tone_weight else "",
+			"evidence": evidence,
+		},
+		"token_count": sum(r.get("token_count", 0) for r in chunk_results),
+		# Chunks run concurrently, so wall-clock latency is the slowest chunk
+		"latency_ms": max(r.get("latency_ms", 0) for r in chunk_results),
+		"cached": all(r.get("cached", False) for r in chunk_results),
+		"chunks": chunks,
+	}
+
+
 def analyze_sentiment(text):
 	"""Sentiment analysis using the configured model service"""
 	service = _get_sentiment_service()
@@ -154,36 +318,48 @@ def analyze_sentiment(text):
 	if len(chunks) == 1:
 		# If only one chunk, analyze directly
 		return service.analyze(chunks[0])
-	else:
-		# For multiple chunks, analyze each and combine results
-		# Simple approach: analyze first chunk for overall sentiment
-		# In a production system, you'd want more sophisticated aggregation
-		return service.analyze(chunks[0])
+
+	# Classify every chunk concurrently, then reduce to one article-level result
+	chunk_results = run_parallel(
+		[lambda chunk=chunk: service.analyze(chunk) for chunk in chunks],
+		pool="sentiment_chunks",
+	)
+	return _reduce_chunk_sentiments(chunk_results)
+
+
+def analyze_sentiments(texts):
+	"""
+	Sentiment analysis for many texts at once.
+
+	Every chunk of every text is classified through the service's batched
+	API, so a page of articles costs a handful of model calls rather than
+	one per article. Results are returned in input order.
+	"""
+	service = _get_sentiment_service()
+	chunk_lists = [_chunk_text(text, max_tokens=2000) if text else [] for text in texts]
+	flat_chunks = [chunk for chunks in chunk_lists for chunk in chunks]
+	flat_results = service.analyze_many(flat_chunks) if flat_chunks else []
+
+	results = []
+	offset = 0
+	for chunks in chunk_lists:
+		chunk_results = flat_results[offset:offset + len(chunks)]
+		offset += len(chunks)
+		if not chunk_results:
+			results.append(service.analyze(""))
+		elif len(chunk_results) == 1:
+			results.append(chunk_results[0])
+		else:
+			results.append(_reduce_chunk_sentiments(chunk_results))
+	return results
 
 
 def extract_keywords(text, num_keywords=5):
 	"""Simple keyword extraction"""
 	# This is a basic approach - in production, you'd use NLTK or spaCy
-	words = text.lower().split()
-	# Remove common stop words
-	stop_words = {'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'a', 'an', 'is', 'are', 'was', 'were'}
-	filtered_words = [word.strip('.,!?";()[]{}') for word in words if word not in stop_words and len(word) > 3]
-
-	# Simple frequency count
-	word_freq = {}
-	for word in filtered_words:
-		word_freq[word] = word_freq.get(word, 0) + 1
-
-	# Return top keywords
-	sorted_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
-	return [word for word, freq in sorted_words[:num_keywords]]
+	return get_text_profile(text).keywords(num_keywords)
 
 
 def get_article_insights(text):
 	"""Extract various insights from the article"""
-	return {
-		"word_count": len(text.split()),
-		"sentence_count": len([s for s in text.split('.') if s.strip()]),
-		"keywords": extract_keywords(text),
-		"reading_time_minutes": max(1, len(text.split()) // 200)  # Average 200 words per minute
-	}
+	return get_text_profile(text).insights()
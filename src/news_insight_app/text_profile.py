@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import functools
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+STOP_WORDS = frozenset({
+	'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with',
+	'by', 'a', 'an', 'is', 'are', 'was', 'were',
+})
+KEYWORD_STRIP_CHARS = '.,!?";()[]{}'
+PROFILE_CACHE_SIZE = 256
+
+
+@dataclass(frozen=True)
+class ArticleTextProfile:
+	"""
+	Everything the summary, insights and keyword helpers need, derived from
+	one split of the text into sentences and one split into words.
+	"""
+
+	text: str
+	sentences: Tuple[str, ...]
+	sentence_spans: Tuple[Tuple[int, int], ...]
+	word_count: int
+	keyword_counts: Tuple[Tuple[str, int], ...]
+	ranked_keywords: Tuple[str, ...]
+
+	@classmethod
+	def from_text(cls, text: str) -> "ArticleTextProfile":
+		sentences: List[str] = []
+		spans: List[Tuple[int, int]] = []
+		offset = 0
+		for piece in text.split('.'):
+			stripped = piece.strip()
+			if stripped:
+				start = offset + len(piece) - len(piece.lstrip())
+				sentences.append(stripped)
+				spans.append((start, start + len(stripped)))
+			offset += len(piece) + 1
+
+		words = text.split()
+		counts: Dict[str, int] = {}
+		for word in words:
+			lowered = word.lower()
+			if lowered in STOP_WORDS or len(lowered) <= 3:
+				continue
+			keyword = lowered.strip(KEYWORD_STRIP_CHARS)
+			counts[keyword] = counts.get(keyword, 0) + 1
+		# sorted() is stable, so ties keep first-seen order
+		ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+
+		return cls(
+			text=text,
+			sentences=tuple(sentences),
+			sentence_spans=tuple(spans),
+			word_count=len(words),
+			keyword_counts=tuple(counts.items()),
+			ranked_keywords=tuple(word for word, _ in ranked),
+		)
+
+	@property
+	def sentence_count(self) -> int:
+		return len(self.sentences)
+
+	def summary(self, max_sentences: int = 2) -> str:
+		if len(self.sentences) <= max_sentences:
+			return self.text
+		return '. '.join(self.sentences[:max_sentences]) + '. ..'
+
+	def keywords(self, num_keywords: int = 5) -> List[str]:
+		return list(self.ranked_keywords[:num_keywords])
+
+	def insights(self) -> Dict[str, Any]:
+		return {
+			"word_count": self.word_count,
+			"sentence_count": self.sentence_count,
+			"keywords": self.keywords(),
+			"reading_time_minutes": max(1, self.word_count // 200),  # Average 200 words per minute
+		}
+
+
+@functools.lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def get_text_profile(text: str) -> ArticleTextProfile:
+	"""Return the (memoized) profile for ``text``; repeat articles cost one dict lookup."""
+	return ArticleTextProfile.from_text(text)
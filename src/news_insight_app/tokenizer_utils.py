@@ -1,7 +1,29 @@
 from __future__ import annotations
 
+import hashlib
+import logging
+import os
+import re
 import threading
-from typing import Any, Dict
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .metrics import observe_tokenization
+
+_WHITESPACE_TOKEN = re.compile(r"\S+")
+
+TOKENIZER_CACHE_DIR = os.getenv("TOKENIZER_CACHE_DIR", "")
+TOKEN_CACHE_MAX_TOKENS = int(os.getenv("TOKEN_CACHE_MAX_TOKENS", "1000000"))
+
+# Hub repositories holding the tokenizer for each model name used by the
+# services. Names not listed here are looked up as given.
+TOKENIZER_REPOS: Dict[str, str] = {
+	"qwen2-7b": "Qwen/Qwen2-7B-Instruct",
+	"phi3.5:latest": "microsoft/Phi-3.5-mini-instruct",
+}
+
+logger = logging.getLogger(__name__)
 
 
 def create_fallback_tokenizer():
@@ -23,27 +45,246 @@ def create_fallback_tokenizer():
 	return _FallbackTokenizer()
 
 
+def _local_dir_name(name: str) -> str:
+	"""Directory name for a model under the cache dir, e.g. ``mistralai--Mistral-7B``."""
+	return name.replace("/", "--").replace(":", "-")
+
+
+def load_tokenizer(model_name: str, cache_dir: str = TOKENIZER_CACHE_DIR) -> Optional[Any]:
+	"""
+	Load the real tokenizer for ``model_name`` from ``cache_dir`` without
+	touching the network, or return None when it is not available.
+
+	Looks for a saved tokenizer directory first (``save_pretrained`` output
+	named after the model or its hub repo), then for a Hugging Face hub cache
+	inside ``cache_dir``. Requires ``transformers``.
+	"""
+	if not cache_dir:
+		return None
+	try:
+		from transformers import AutoTokenizer
+	except ImportError:
+		return None
+
+	repo = TOKENIZER_REPOS.get(model_name, model_name)
+	candidates = [
+		os.path.join(cache_dir, _local_dir_name(name)) for name in dict.fromkeys((model_name, repo))
+	]
+	candidates = [path for path in candidates if os.path.isdir(path)] + [repo]
+	for source in candidates:
+		try:
+			return AutoTokenizer.from_pretrained(source, cache_dir=cache_dir, local_files_only=True)
+		except Exception:
+			continue
+	return None
+
+
+def whitespace_offsets(text: str) -> List[Tuple[int, int]]:
+	"""Character spans of the fallback tokenizer's whitespace tokens."""
+	return [match.span() for match in _WHITESPACE_TOKEN.finditer(text)]
+
+
+def encode_with_offsets(tokenizer: Any, text: str) -> Optional[List[Tuple[int, int]]]:
+	"""
+	Encode ``text`` once and return each token's (start, end) character span,
+	or None when the tokenizer cannot report offsets.
+
+	Supports Hugging Face fast tokenizers (``return_offsets_mapping``) and
+	any tokenizer exposing ``encode_with_offsets(text) -> (tokens, offsets)``.
+	The whitespace fallback deliberately does not: ``str.split`` per
+	sentence is already cheaper than building offsets for it in Python.
+	"""
+	if hasattr(tokenizer, "encode_with_offsets"):
+		_, offsets = tokenizer.encode_with_offsets(text)
+		return list(offsets)
+	if getattr(tokenizer, "is_fast", False):
+		encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+		return [tuple(span) for span in encoding["offset_mapping"]]
+	return None
+
+
+def _token_cache_key(model_name: str, text: str) -> Tuple[str, bytes]:
+	return model_name, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class TokenCache:
+	"""
+	Thread-safe LRU of encode results whose budget is the total number of
+	stored tokens rather than the number of entries, so a handful of long
+	articles cannot crowd out memory the way an entry count would allow.
+	"""
+
+	def __init__(self, max_tokens: int) -> None:
+		self.max_tokens = max_tokens
+		self._entries: "OrderedDict[Tuple[str, bytes], Tuple[Any, ...]]" = OrderedDict()
+		self._size = 0
+		self._lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def get(self, key: Tuple[str, bytes]) -> Optional[Tuple[Any, ...]]:
+		with self._lock:
+			token_ids = self._entries.get(key)
+			if token_ids is None:
+				self.misses += 1
+				return None
+			self._entries.move_to_end(key)
+			self.hits += 1
+			return token_ids
+
+	def set(self, key: Tuple[str, bytes], token_ids: Tuple[Any, ...]) -> None:
+		# Entries larger than the whole budget are not worth evicting everything for
+		if len(token_ids) > self.max_tokens:
+			return
+		with self._lock:
+			previous = self._entries.pop(key, None)
+			if previous is not None:
+				self._size -= len(previous)
+			self._entries[key] = token_ids
+			self._size += len(token_ids)
+			while self._size > self.max_tokens:
+				_, evicted = self._entries.popitem(last=False)
+				self._size -= len(evicted)
+				self.evictions += 1
+
+	def clear(self) -> None:
+		with self._lock:
+			self._entries.clear()
+			self._size = 0
+
+	def stats(self) -> Dict[str, Any]:
+		with self._lock:
+			lookups = self.hits + self.misses
+			return {
+				"entries": len(self._entries),
+				"tokens": self._size,
+				"max_tokens": self.max_tokens,
+				"hits": self.hits,
+				"misses": self.misses,
+				"evictions": self.evictions,
+				"hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+			}
+
+
 class TokenizerProvider:
-	"""Centralized tokenizer management with caching and fallback."""
+	"""
+	Centralized tokenizer management with caching and fallback.
+
+	Real tokenizers are loaded from ``cache_dir`` the first time a model is
+	asked for; models whose files are missing get the whitespace fallback.
+	Once loaded, lookups are plain dict reads with no lock, so request
+	threads never contend here after warmup.
+	"""
 
-	def __init__(self) -> None:
+	def __init__(
+		self,
+		cache_dir: str = TOKENIZER_CACHE_DIR,
+		cache_max_tokens: int = TOKEN_CACHE_MAX_TOKENS,
+	) -> None:
+		self.cache_dir = cache_dir
 		self._tokenizers: Dict[str, Any] = {}
+		self._fallback_models: set = set()
+		self._load_lock = threading.Lock()
+		self._token_cache = TokenCache(cache_max_tokens)
 
 	def get_tokenizer(self, model_name: str) -> Any:
 		"""
 		Get or load a tokenizer for the given model.
 		Caches tokenizers by model name.
 		"""
-		if model_name not in self._tokenizers:
-			self._tokenizers[model_name] = create_fallback_tokenizer()
-		return self._tokenizers[model_name]
+		tokenizer = self._tokenizers.get(model_name)
+		if tokenizer is not None:
+			return tokenizer
+		with self._load_lock:
+			tokenizer = self._tokenizers.get(model_name)
+			if tokenizer is None:
+				tokenizer = load_tokenizer(model_name, self.cache_dir)
+				if tokenizer is None:
+					if self.cache_dir:
+						logger.warning("No local tokenizer for %s; using whitespace fallback", model_name)
+					tokenizer = create_fallback_tokenizer()
+					self._fallback_models.add(model_name)
+				self._tokenizers[model_name] = tokenizer
+		return tokenizer
+
+	def warmup(self, model_names: Iterable[str]) -> Dict[str, str]:
+		"""Load the tokenizers for ``model_names`` now rather than on first request."""
+		for model_name in model_names:
+			self.get_tokenizer(model_name)
+		return self.describe()
+
+	def describe(self) -> Dict[str, str]:
+		"""Map each loaded model name to its tokenizer class, or "fallback"."""
+		return {
+			model_name: "fallback" if model_name in self._fallback_models else type(tokenizer).__name__
+			for model_name, tokenizer in list(self._tokenizers.items())
+		}
+
+	def encode(self, text: str, model_name: str) -> Tuple[Any, ...]:
+		"""
+		Token ids for ``text`` without special tokens, memoized per model.
+
+		The returned tuple is shared with the cache; callers must not rely on
+		getting a fresh copy.
+		"""
+		if not text:
+			return ()
+		key = _token_cache_key(model_name, text)
+		token_ids = self._token_cache.get(key)
+		if token_ids is None:
+			tokenizer = self.get_tokenizer(model_name)
+			start = time.perf_counter()
+			token_ids = tuple(tokenizer.encode(text, add_special_tokens=False))
+			observe_tokenization(model_name, "encode", time.perf_counter() - start)
+			self._token_cache.set(key, token_ids)
+		return token_ids
 
 	def count_tokens(self, text: str, model_name: str) -> int:
 		"""Count tokens in text using the specified model's tokenizer."""
-		if not text:
-			return 0
+		return len(self.encode(text, model_name))
+
+	def encode_batch(self, texts: Sequence[str], model_name: str) -> List[Tuple[Any, ...]]:
+		"""
+		Memoized encode() for several texts. Cache misses are encoded with one
+		tokenizer call where the tokenizer supports it (fast tokenizers encode
+		a batch in parallel natively).
+		"""
+		results: List[Tuple[Any, ...]] = [()] * len(texts)
+		missing: Dict[Tuple[str, bytes], List[int]] = {}
+		for i, text in enumerate(texts):
+			if not text:
+				continue
+			key = _token_cache_key(model_name, text)
+			token_ids = self._token_cache.get(key)
+			if token_ids is not None:
+				results[i] = token_ids
+			else:
+				missing.setdefault(key, []).append(i)
+		if not missing:
+			return results
+
 		tokenizer = self.get_tokenizer(model_name)
-		return len(tokenizer.encode(text, add_special_tokens=False))
+		pending = [texts[positions[0]] for positions in missing.values()]
+		start = time.perf_counter()
+		if getattr(tokenizer, "is_fast", False):
+			encoded = tokenizer(pending, add_special_tokens=False)["input_ids"]
+		else:
+			encoded = [tokenizer.encode(text, add_special_tokens=False) for text in pending]
+		observe_tokenization(model_name, "encode", time.perf_counter() - start)
+		for (key, positions), token_ids in zip(missing.items(), encoded):
+			token_ids = tuple(token_ids)
+			self._token_cache.set(key, token_ids)
+			for i in positions:
+				results[i] = token_ids
+		return results
+
+	def count_tokens_batch(self, texts: Sequence[str], model_name: str) -> List[int]:
+		"""Token counts for several texts; see encode_batch()."""
+		return [len(token_ids) for token_ids in self.encode_batch(texts, model_name)]
+
+	def cache_stats(self) -> Dict[str, Any]:
+		return self._token_cache.stats()
 
 
 # Global tokenizer provider instance (lazily initialized under lock)
@@ -56,13 +297,17 @@ def get_tokenizer_provider() -> TokenizerProvider:
 	Get the global tokenizer provider instance, creating it on first access.
 
 	This function lazily initializes a TokenizerProvider using double-checked
-	locking to ensure thread-safety in multi-threaded environments like Flask.
+	locking to ensure thread-safety in multi-threaded environments like Flask;
+	once the provider exists, callers read it without taking the lock.
 	"""
 	global _provider
+	provider = _provider
+	if provider is not None:
+		return provider
 	with _provider_lock:
 		if _provider is None:
 			_provider = TokenizerProvider()
-	return _provider
+		return _provider
 
 
 def set_tokenizer_provider(provider: TokenizerProvider | None) -> None:
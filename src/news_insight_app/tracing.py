@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import collections
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1").lower() not in ("0", "false", "no")
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+
+TRACEPARENT_HEADER = "traceparent"
+TRACE_ID_HEADER = "X-Trace-Id"
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+class Trace:
+	"""Spans recorded under one trace id; finished spans are appended from any thread."""
+
+	def __init__(self, trace_id: str, remote_parent_id: Optional[str] = None) -> None:
+		self.trace_id = trace_id
+		self.remote_parent_id = remote_parent_id
+		self.spans: List[Dict[str, Any]] = []
+		self._lock = threading.Lock()
+
+	def add(self, span: Dict[str, Any]) -> None:
+		with self._lock:
+			self.spans.append(span)
+
+
+class Span:
+	def __init__(self, trace: Trace, name: str, parent_id: Optional[str], attributes: Dict[str, Any]) -> None:
+		self.trace = trace
+		self.name = name
+		self.span_id = secrets.token_hex(8)
+		self.parent_id = parent_id
+		self.attributes = attributes
+		self.error: Optional[str] = None
+		self.start = time.time()
+		self._start_perf = time.perf_counter()
+		self.duration_ms = 0.0
+
+	def set_attribute(self, key: str, value: Any) -> None:
+		self.attributes[key] = value
+
+	def finish(self) -> None:
+		self.duration_ms = round((time.perf_counter() - self._start_perf) * 1000, 3)
+		self.trace.add({
+			"span_id": self.span_id,
+			"parent_id": self.parent_id,
+			"name": self.name,
+			"start": self.start,
+			"duration_ms": self.duration_ms,
+			"attributes": self.attributes,
+			"error": self.error,
+		})
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class TraceExporter:
+	"""Keeps the most recent finished traces in memory and optionally appends them to a JSONL file."""
+
+	def __init__(self, buffer_size: int = TRACE_BUFFER_SIZE, path: str = TRACE_FILE) -> None:
+		self._traces: Deque[Dict[str, Any]] = collections.deque(maxlen=max(1, buffer_size))
+		self.path = path
+		self._lock = threading.Lock()
+
+	def export(self, record: Dict[str, Any]) -> None:
+		with self._lock:
+			self._traces.append(record)
+			if self.path:
+				with open(self.path, "a", encoding="utf-8") as handle:
+					handle.write(json.dumps(record, default=str) + "\n")
+
+	def recent(self) -> List[Dict[str, Any]]:
+		with self._lock:
+			return list(self._traces)
+
+	def slowest(self, limit: int = 10) -> List[Dict[str, Any]]:
+		return sorted(self.recent(), key=lambda record: record["duration_ms"], reverse=True)[:limit]
+
+	def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+		return next((record for record in self.recent() if record["trace_id"] == trace_id), None)
+
+
+def _trace_record(root: Span) -> Dict[str, Any]:
+	spans = sorted(root.trace.spans, key=lambda span: span["start"])
+	return {
+		"trace_id": root.trace.trace_id,
+		"name": root.name,
+		"start": root.start,
+		"duration_ms": root.duration_ms,
+		"error": root.error,
+		"remote_parent_id": root.trace.remote_parent_id,
+		"attributes": root.attributes,
+		"span_count": len(spans),
+		"spans": spans,
+	}
+
+
+def current_span() -> Optional[Span]:
+	return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+	span = _current_span.get()
+	return span.trace.trace_id if span is not None else None
+
+
+@contextlib.contextmanager
+def span(name: str, traceparent: Optional[str] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+	"""
+	Time the enclosed block as a span of the current trace.
+
+	With no active span this starts a new trace (continuing the caller's
+	trace when a W3C ``traceparent`` header value is given); the whole trace
+	is exported when that root span ends. Exceptions are recorded on the
+	span and re-raised. Spans follow work into thread pools because
+	run_parallel copies the calling context.
+	"""
+	if not TRACING_ENABLED:
+		yield None
+		return
+	parent = _current_span.get()
+	if parent is not None:
+		current = Span(parent.trace, name, parent.span_id, attributes)
+	else:
+		match = _TRACEPARENT.match(traceparent or "")
+		trace = Trace(match.group(1), match.group(2)) if match else Trace(secrets.token_hex(16))
+		current = Span(trace, name, None, attributes)
+	token = _current_span.set(current)
+	try:
+		yield current
+	except BaseException as exc:
+		current.error = f"{type(exc).__name__}: {exc}"
+		raise
+	finally:
+		_current_span.reset(token)
+		current.finish()
+		if parent is None:
+			get_trace_exporter().export(_trace_record(current))
+
+
+def traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+	"""Decorator form of span() for functions."""
+
+	def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+		@functools.wraps(func)
+		def wrapper(*args: Any, **kwargs: Any) -> Any:
+			with span(name):
+				return func(*args, **kwargs)
+		return wrapper
+
+	return decorator
+
+
+def trace_headers() -> Dict[str, str]:
+	"""W3C trace-context headers identifying the current span to an upstream server."""
+	span_ = _current_span.get()
+	if span_ is None:
+		return {}
+	return {
+		TRACEPARENT_HEADER: f"00-{span_.trace.trace_id}-{span_.span_id}-01",
+		TRACE_ID_HEADER: span_.trace.trace_id,
+	}
+
+
+# Global exporter (lazily initialized under lock)
+_exporter: TraceExporter | None = None
+_exporter_lock = threading.Lock()
+
+
+def get_trace_exporter() -> TraceExporter:
+	"""Get the process-wide trace exporter, creating it on first access."""
+	global _exporter
+	exporter = _exporter
+	if exporter is not None:
+		return exporter
+	with _exporter_lock:
+		if _exporter is None:
+			_exporter = TraceExporter()
+		return _exporter
+
+
+def set_trace_exporter(exporter: TraceExporter | None) -> None:
+	"""Replace the global exporter; None starts an empty one on next access."""
+	global _exporter
+	_exporter = exporter
@@ -1,3 +1,4 @@
+import json
 import sys
 import os
 import pytest
@@ -6,12 +7,18 @@ import pytest
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from news_insight_app import create_app
+from news_insight_app import services
+from news_insight_app.http_client import set_http_client
+from news_insight_app.news_api_service import get_news_cache
+from news_insight_app.result_cache import set_analysis_cache
 from news_insight_app.tokenizer_utils import create_fallback_tokenizer
 
 
 class DummyResponse:
     """Reusable fake requests.Response for HTTP-mocking in tests."""
 
+    status_code = 200
+
     def __init__(self, payload):
         self._payload = payload
 
@@ -22,6 +29,27 @@ class DummyResponse:
         return self._payload
 
 
+class DummyStreamResponse:
+    """Fake streaming requests.Response yielding OpenAI-style SSE lines."""
+
+    def __init__(self, chunks):
+        self._lines = []
+        for chunk in chunks:
+            self._lines.append("data: " + json.dumps(chunk))
+            self._lines.append("")
+        self._lines.append("data: [DONE]")
+        self.closed = False
+
+    def raise_for_status(self):
+        return None
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self._lines)
+
+    def close(self):
+        self.closed = True
+
+
 class DummyTokenizerProvider:
     """Mock tokenizer provider for testing that tracks get_tokenizer calls."""
 
@@ -34,6 +62,20 @@ class DummyTokenizerProvider:
         return create_fallback_tokenizer()
 
 
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """Give every test cold result caches and closed circuits so state never leaks between tests."""
+    set_analysis_cache(None)
+    set_http_client(None)
+    services._sentiment_service = None
+    get_news_cache().clear()
+    yield
+    set_analysis_cache(None)
+    set_http_client(None)
+    services._sentiment_service = None
+    get_news_cache().clear()
+
+
 @pytest.fixture
 def app():
     """Create and configure a new app instance for each test."""
@@ -1,8 +1,10 @@
 import pytest
 
 from news_insight_app import analysis_service
+from news_insight_app.http_client import get_http_client
+from news_insight_app.result_cache import cache_bypass
 from requests.exceptions import RequestException
-from conftest import DummyResponse
+from conftest import DummyResponse, DummyStreamResponse
 
 
 def _assert_token_payload(tokens):
@@ -23,7 +25,7 @@ def test_analyze_rhetoric_includes_tokens(monkeypatch):
             'usage': {'total_tokens': 42},
         })
 
-    monkeypatch.setattr(analysis_service.requests, 'post', fake_post)
+    monkeypatch.setattr(get_http_client(), 'post', fake_post)
     result = analysis_service.analyze_rhetoric('hello world')
 
     _assert_token_payload(recorded['tokens'])
@@ -37,7 +39,7 @@ def test_analyze_rhetoric_handles_http_errors(monkeypatch):
     def fake_post(url, json, timeout):
         raise RequestException('network down')
 
-    monkeypatch.setattr(analysis_service.requests, 'post', fake_post)
+    monkeypatch.setattr(get_http_client(), 'post', fake_post)
     result = analysis_service.analyze_rhetoric('fail case')
 
     assert result['analysis'] == 'Rhetorical analysis unavailable for this story.'
@@ -55,7 +57,7 @@ def test_compare_article_texts_returns_comparison(monkeypatch):
             'usage': {'total_tokens': 99},
         })
 
-    monkeypatch.setattr(analysis_service.requests, 'post', fake_post)
+    monkeypatch.setattr(get_http_client(), 'post', fake_post)
     result = analysis_service.compare_article_texts('article one', 'article two')
 
     _assert_token_payload(recorded['primary_tokens'])
@@ -65,6 +67,47 @@ def test_compare_article_texts_returns_comparison(monkeypatch):
     assert result['error'] is None
 
 
+def test_base64_token_payload_round_trips(monkeypatch):
+    import base64
+    import struct
+
+    recorded = {}
+
+    def fake_post(url, json, timeout):
+        recorded.update(json)
+        return DummyResponse({'choices': [{'text': 'ok'}], 'usage': {}})
+
+    monkeypatch.setattr(analysis_service, 'TOKEN_PAYLOAD_FORMAT', 'base64')
+    monkeypatch.setattr(get_http_client(), 'post', fake_post)
+    analysis_service.compare_article_texts('article one', 'article two words')
+
+    expected = analysis_service._tokenize('article two words', analysis_service.MISTRAL_TOKENIZER, 10)
+    raw = base64.b64decode(recorded['reference_tokens'])
+    assert list(struct.unpack(f'<{len(raw) // 4}i', raw)) == expected
+    assert recorded['token_format'] == 'base64'
+    assert recorded['token_dtype'] == '<i4'
+
+
+def test_token_payload_can_be_omitted(monkeypatch):
+    recorded = {}
+
+    def fake_post(url, json, timeout):
+        recorded.update(json)
+        return DummyResponse({'choices': [{'text': 'ok'}], 'usage': {}})
+
+    def no_tokenize(*args):
+        raise AssertionError('tokenizer should not run')
+
+    monkeypatch.setattr(analysis_service, 'TOKEN_PAYLOAD_FORMAT', 'none')
+    monkeypatch.setattr(analysis_service, '_tokenize_many', no_tokenize)
+    monkeypatch.setattr(get_http_client(), 'post', fake_post)
+    result = analysis_service.analyze_rhetoric('hello world')
+
+    assert 'article_tokens' not in recorded
+    assert 'token_format' not in recorded
+    assert result['analysis'] == 'ok'
+
+
 def test_compare_article_texts_missing_reference():
     result = analysis_service.compare_article_texts('article', '')
     assert 'error' in result and result['error']
@@ -75,3 +118,159 @@ def test_tokenize_fallback_for_short_text():
     tokens = analysis_service._tokenize('some text', 'unknown-model', 10)
     assert isinstance(tokens, list)
     assert tokens
+
+
+def test_analyze_rhetoric_serves_repeat_calls_from_cache(monkeypatch):
+    calls = []
+
+    def fake_post(url, json, timeout):
+        calls.append(json)
+        return DummyResponse({
+            'choices': [{'text': 'Deep analysis'}],
+            'usage': {'total_tokens': 42},
+        })
+
+    monkeypatch.setattr(get_http_client(), 'post', fake_post)
+    first = analysis_service.analyze_rhetoric('popular story')
+    second = analysis_service.analyze_rhetoric('popular story')
+
+    assert len(calls) == 1
+    assert first['cached'] is False
+    assert second['cached'] is True
+    assert second['analysis'] == 'Deep analysis'
+
+
+def test_analysis_cache_bypass_forces_model_call(monkeypatch):
+    calls = []
+
+    def fake_post(url, json, timeout):
+        calls.append(json)
+        return DummyResponse({'choices': [{'text': 'Comparison output'}], 'usage': {}})
+
+    monkeypatch.setattr(get_http_client(), 'post', fake_post)
+    analysis_service.compare_article_texts('one', 'two')
+    with cache_bypass():
+        result = analysis_service.compare_article_texts('one', 'two')
+    analysis_service.compare_article_texts('one', 'two', use_cache=False)
+
+    assert len(calls) == 3
+    assert result['cached'] is False
+
+
+def test_failed_analysis_is_not_cached(monkeypatch):
+    def failing_post(url, json, timeout):
+        raise RequestException('network down')
+
+    monkeypatch.setattr(get_http_client(), 'post', failing_post)
+    analysis_service.analyze_rhetoric('flaky story')
+    assert analysis_service.get_analysis_cache().stats()['entries'] == 0
+
+
+def test_stream_rhetoric_relays_tokens_and_final_result(monkeypatch):
+    recorded = {}
+
+    def fake_post_stream(url, json, timeout):
+        recorded['stream'] = json.get('stream')
+        return DummyStreamResponse([
+            {'choices': [{'text': 'Tone: '}]},
+            {'choices': [{'text': 'calm'}], 'usage': {'total_tokens': 12}},
+        ])
+
+    monkeypatch.setattr(get_http_client(), 'post_stream', fake_post_stream)
+    events = list(analysis_service.stream_rhetoric('streamed story'))
+
+    assert recorded['stream'] is True
+    assert [e['text'] for e in events if e['type'] == 'token'] == ['Tone: ', 'calm']
+    result = events[-1]['result']
+    assert result['analysis'] == 'Tone: calm'
+    assert result['tokens_used'] == 12
+    assert result['error'] is None
+    # Streamed output is cached like a blocking call
+    assert analysis_service.analyze_rhetoric('streamed story')['cached'] is True
+
+
+def test_stream_comparison_reports_request_errors(monkeypatch):
+    def failing_post_stream(url, json, timeout):
+        raise RequestException('network down')
+
+    monkeypatch.setattr(get_http_client(), 'post_stream', failing_post_stream)
+    events = list(analysis_service.stream_comparison('one', 'two'))
+
+    assert len(events) == 1
+    assert 'Mistral request failed' in events[0]['result']['error']
+    assert events[0]['result']['comparison'] == 'Comparison unavailable for this pair of stories.'
+
+
+def test_combined_analysis_splits_one_answer_into_both_sections(monkeypatch):
+    calls = []
+    answer = (
+        '{"sentiment": "negative", "tone": "urgent", "evidence": ["sharp losses"],'
+        ' "analysis": "1. Overall Tone: alarmist"}'
+    )
+
+    def fake_post(url, json, timeout):
+        calls.append((url, json))
+        return DummyResponse({'choices': [{'text': answer}], 'usage': {'total_tokens': 80}})
+
+    monkeypatch.setattr(get_http_client(), 'post', fake_post)
+    sentiment, rhetoric = analysis_service.analyze_article_combined('Markets suffered sharp losses.')
+
+    [(url, payload)] = calls
+    assert url == analysis_service.COMBINED_URL
+    assert payload['prompt'].startswith(analysis_service.COMBINED_PROMPT.prefix)
+    assert sentiment['sentiment'] == 'Negative'
+    assert sentiment['raw'] == {'sentiment': 'negative', 'tone': 'urgent', 'evidence': ['sharp losses']}
+    assert sentiment['model'] == rhetoric['model'] == analysis_service.COMBINED_MODEL
+    assert rhetoric['analysis'] == rhetoric['text'] == '1. Overall Tone: alarmist'
+    assert rhetoric['tokens_used'] == 80
+    assert rhetoric['error'] is None
+
+    # Both halves come back from one cache entry
+    sentiment, rhetoric = analysis_service.analyze_article_combined('Markets suffered sharp losses.')
+    assert len(calls) == 1
+    assert sentiment['cached'] is True and rhetoric['cached'] is True
+
+
+def test_combined_analysis_without_analysis_field_reports_error(monkeypatch):
+    def fake_post(url, json, timeout):
+        return DummyResponse({'choices': [{'text': '{"sentiment": "positive"}'}], 'usage': {}})
+
+    monkeypatch.setattr(get_http_client(), 'post', fake_post)
+    sentiment, rhetoric = analysis_service.analyze_article_combined('Record harvest.')
+
+    assert sentiment['sentiment'] == 'Positive'
+    assert 'no analysis' in rhetoric['error']
+    assert rhetoric['analysis'] == 'Rhetorical analysis unavailable for this story.'
+    # Incomplete answers are not cached
+    assert analysis_service.analyze_article_combined('Record harvest.')[1]['cached'] is False
+
+
+def test_combined_analysis_request_failure_falls_back(monkeypatch):
+    def failing_post(url, json, timeout):
+        raise RequestException('network down')
+
+    monkeypatch.setattr(get_http_client(), 'post', failing_post)
+    sentiment, rhetoric = analysis_service.analyze_article_combined('Any story.')
+
+    assert sentiment['sentiment'] == 'Neutral'
+    assert 'Combined request failed' in rhetoric['error']
+
+
+def test_combined_analysis_accepts_raw_newlines_in_the_analysis(monkeypatch):
+    answer = '{"sentiment": "negative", "tone": "urgent", "evidence": [], "analysis": "1. Overall Tone: alarmist\n2. Sentiment: negative"}'
+
+    def fake_post(url, json, timeout):
+        return DummyResponse({'choices': [{'text': answer}], 'usage': {}})
+
+    monkeypatch.setattr(get_http_client(), 'post', fake_post)
+    sentiment, rhetoric = analysis_service.analyze_article_combined('Markets fell.', use_cache=False)
+
+    assert sentiment['sentiment'] == 'Negative'
+    assert rhetoric['error'] is None
+    assert rhetoric['analysis'] == '1. Overall Tone: alarmist\n2. Sentiment: negative'
+
+
+def test_combined_analysis_rejects_unknown_output_mode(monkeypatch):
+    monkeypatch.setattr(analysis_service, 'COMBINED_OUTPUT_MODE', 'yaml')
+    with pytest.raises(ValueError):
+        analysis_service.analyze_article_combined('Any story.')
@@ -0,0 +1,77 @@
+import pytest
+
+from news_insight_app.article_store import (
+    InMemoryArticleStore,
+    SqliteArticleStore,
+    set_article_store,
+)
+from news_insight_app.services import MOCK_NEWS
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryArticleStore()
+    return SqliteArticleStore(str(tmp_path / "articles.db"))
+
+
+def _article(**overrides):
+    article = {
+        "title": "Ingested story",
+        "content": "First sentence. Second sentence. Third sentence.",
+        "url": "https://example.com/ingested",
+        "source": "Example",
+        "published_at": "2026-02-18T12:00:00Z",
+    }
+    article.update(overrides)
+    return article
+
+
+def test_store_precomputes_derived_fields(store):
+    stored = store.add(_article())
+
+    fetched = store.get(stored["id"])
+    assert fetched["summary"] == "First sentence. Second sentence. .."
+    assert fetched["insights"]["sentence_count"] == 3
+
+
+def test_store_looks_up_by_url(store):
+    stored = store.add(_article())
+    assert store.get_by_url("https://example.com/ingested")["id"] == stored["id"]
+    assert store.get_by_url("https://example.com/missing") is None
+
+
+def test_store_readding_url_keeps_id(store):
+    first = store.add(_article())
+    second = store.add(_article(title="Updated story"))
+
+    assert second["id"] == first["id"]
+    assert [a["title"] for a in store.all()] == ["Updated story"]
+
+
+def test_store_explicit_id_takes_over_url(store):
+    store.add(_article(id=1))
+    store.add(_article(id=2, title="Moved story"))
+
+    assert [(a["id"], a["title"]) for a in store.all()] == [(2, "Moved story")]
+    assert store.get(1) is None
+    assert store.get_by_url("https://example.com/ingested")["id"] == 2
+
+
+def test_store_reference_for_returns_other_article(store):
+    store.add_many(MOCK_NEWS)
+    assert store.reference_for(1)["id"] == 2
+    assert store.reference_for(2)["id"] == 1
+    assert store.get(999) is None
+
+
+def test_routes_read_from_injected_store(client):
+    store = InMemoryArticleStore([_article(id=42)])
+    set_article_store(store)
+    try:
+        response = client.get('/api/news/42')
+        assert response.status_code == 200
+        assert response.get_json()["summary"] == "First sentence. Second sentence. .."
+        assert client.get('/api/news/1').status_code == 404
+    finally:
+        set_article_store(None)
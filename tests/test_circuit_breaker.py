@@ -0,0 +1,203 @@
+import pytest
+from requests.exceptions import ConnectionError, ReadTimeout
+
+from news_insight_app import analysis_service, services
+from news_insight_app.circuit_breaker import CircuitBreaker, CircuitOpenError, LatencyTracker
+from news_insight_app.http_client import ModelHttpClient, get_http_client
+from conftest import DummyResponse
+
+URL = 'http://gpu:8000/v1/completions'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FlakySession:
+    """Stand-in session that fails until told otherwise and records read timeouts."""
+
+    def __init__(self):
+        self.down = True
+        self.calls = 0
+        self.timeouts = []
+
+    def post(self, url, json=None, timeout=None, stream=False, headers=None):
+        self.calls += 1
+        self.timeouts.append(timeout[1])
+        if self.down:
+            raise ConnectionError("gpu box unreachable")
+        return DummyResponse({'choices': [{'text': 'ok'}], 'usage': {}})
+
+
+def test_breaker_opens_after_consecutive_failures_and_probes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=10, clock=clock)
+    breaker.record_failure()
+    breaker.record_success()
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    assert breaker.retry_in() == 10
+
+    clock.now = 10
+    assert breaker.allow()
+    assert breaker.state == 'half_open'
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_failure()
+    assert breaker.state == 'open'
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.stats()['times_opened'] == 2
+    assert breaker.stats()['rejected'] == 2
+
+
+def test_latency_tracker_timeout_is_clamped():
+    tracker = LatencyTracker(window=100, min_samples=10)
+    assert tracker.timeout(120) == 120  # not enough samples yet
+
+    for _ in range(10):
+        tracker.observe(2.0)
+    assert tracker.timeout(120, fraction=0.99, multiplier=3, floor=5) == 6.0
+    assert tracker.timeout(4, fraction=0.99, multiplier=3, floor=1) == 4
+    assert tracker.timeout(120, fraction=0.99, multiplier=1, floor=5) == 5
+
+
+def test_client_fails_fast_while_circuit_is_open(monkeypatch):
+    client = ModelHttpClient(failure_threshold=2, reset_seconds=60)
+    session = FlakySession()
+    monkeypatch.setattr(client, '_session_for', lambda url: session)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            client.post(URL, json={}, timeout=120)
+    with pytest.raises(CircuitOpenError):
+        client.post(URL, json={}, timeout=120)
+
+    assert session.calls == 2
+    assert client._breakers['http://gpu:8000'].stats()['state'] == 'open'
+
+
+def test_client_adapts_read_timeout_to_observed_latency(monkeypatch):
+    client = ModelHttpClient(adaptive_timeout=True)
+    session = FlakySession()
+    session.down = False
+    monkeypatch.setattr(client, '_session_for', lambda url: session)
+    _, latencies = client._endpoint_state('http://gpu:8000')
+    for _ in range(latencies.min_samples):
+        latencies.observe(1.0)
+
+    client.post(URL, json={}, timeout=120)
+
+    assert session.timeouts == [5.0]  # 3 x p99 of 1 s, raised to the 5 s floor
+
+
+class SlowerSession:
+    """Endpoint whose generations now take ``seconds``; shorter read timeouts expire."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.timeouts = []
+
+    def post(self, url, json=None, timeout=None, stream=False, headers=None):
+        self.timeouts.append(timeout[1])
+        if timeout[1] < self.seconds:
+            raise ReadTimeout("read timed out")
+        return DummyResponse({'choices': [{'text': 'ok'}], 'usage': {}})
+
+
+def test_learned_timeout_recovers_when_endpoint_gets_slower(monkeypatch):
+    client = ModelHttpClient(adaptive_timeout=True, failure_threshold=10)
+    session = SlowerSession(20.0)
+    monkeypatch.setattr(client, '_session_for', lambda url: session)
+    _, latencies = client._endpoint_state('http://gpu:8000')
+    for _ in range(latencies.min_samples):
+        latencies.observe(1.0)
+
+    for _ in range(2):
+        with pytest.raises(ReadTimeout):
+            client.post(URL, json={}, timeout=120)
+    client.post(URL, json={}, timeout=120)
+
+    # Each timeout enters the window, so the next timeout is 3 x the last one
+    assert session.timeouts == [5.0, 15.0, 45.0]
+
+
+def test_half_open_probe_gets_the_full_timeout(monkeypatch):
+    client = ModelHttpClient(adaptive_timeout=True, failure_threshold=1, reset_seconds=0)
+    session = FlakySession()
+    monkeypatch.setattr(client, '_session_for', lambda url: session)
+    _, latencies = client._endpoint_state('http://gpu:8000')
+    for _ in range(latencies.min_samples):
+        latencies.observe(1.0)
+
+    with pytest.raises(ConnectionError):
+        client.post(URL, json={}, timeout=120)
+    session.down = False
+    client.post(URL, json={}, timeout=120)
+
+    assert session.timeouts == [5.0, 120]
+    assert client._breakers['http://gpu:8000'].state == 'closed'
+
+
+def test_programming_errors_do_not_trip_the_circuit(monkeypatch):
+    client = ModelHttpClient(failure_threshold=1)
+
+    class BrokenSession:
+        def post(self, *args, **kwargs):
+            raise TypeError("bad call")
+
+    monkeypatch.setattr(client, '_session_for', lambda url: BrokenSession())
+    with pytest.raises(TypeError):
+        client.post(URL, json={}, timeout=120)
+    assert client._breakers['http://gpu:8000'].state == 'closed'
+
+
+def test_programming_error_in_half_open_probe_releases_it(monkeypatch):
+    client = ModelHttpClient(failure_threshold=1, reset_seconds=0)
+    session = FlakySession()
+    monkeypatch.setattr(client, '_session_for', lambda url: session)
+    with pytest.raises(ConnectionError):
+        client.post(URL, json={}, timeout=120)
+
+    class BrokenSession:
+        def post(self, *args, **kwargs):
+            raise TypeError("bad call")
+
+    monkeypatch.setattr(client, '_session_for', lambda url: BrokenSession())
+    with pytest.raises(TypeError):
+        client.post(URL, json={}, timeout=120)
+    assert client._breakers['http://gpu:8000'].state == 'half_open'
+
+    session.down = False
+    monkeypatch.setattr(client, '_session_for', lambda url: session)
+    client.post(URL, json={}, timeout=120)
+    assert client._breakers['http://gpu:8000'].state == 'closed'
+
+
+def test_open_circuit_returns_existing_fallback_shapes(monkeypatch):
+    client = get_http_client()
+    session = FlakySession()
+    monkeypatch.setattr(client, '_session_for', lambda url: session)
+    for url in (analysis_service.QWEN_URL, analysis_service.PHI_URL):
+        for _ in range(client.failure_threshold):
+            with pytest.raises(ConnectionError):
+                client.post(url, json={}, timeout=1)
+    calls_before = session.calls
+
+    rhetoric = analysis_service.analyze_rhetoric('Some article text.', use_cache=False)
+    sentiment = services._get_sentiment_service().analyze('Markets fell sharply.')
+
+    assert rhetoric['analysis'] == 'Rhetorical analysis unavailable for this story.'
+    assert 'circuit open' in rhetoric['error']
+    assert sentiment['label'] == 'NEUTRAL'
+    assert session.calls == calls_before
@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+from news_insight_app.concurrency import merge_streams, run_parallel
+
+
+def test_run_parallel_preserves_order():
+    results = run_parallel([lambda: 1, lambda: 2, lambda: 3])
+    assert results == [1, 2, 3]
+
+
+def test_run_parallel_runs_calls_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def wait():
+        barrier.wait()
+        return threading.current_thread().name
+
+    names = run_parallel([wait, wait, wait])
+    assert len(set(names)) == 3
+
+
+def test_run_parallel_propagates_exceptions():
+    def boom():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        run_parallel([lambda: 1, boom])
+
+
+def test_run_parallel_nested_calls_run_inline():
+    def outer():
+        inner_thread = run_parallel([lambda: threading.current_thread().name] * 2)
+        return threading.current_thread().name, inner_thread
+
+    outer_name, inner_names = run_parallel([outer, lambda: None])[0]
+    assert inner_names == [outer_name, outer_name]
+
+
+def test_merge_streams_tags_items_with_stream_index():
+    merged = list(merge_streams([lambda: ["a", "b"], lambda: iter(["c"])]))
+    assert sorted(merged) == [(0, "a"), (0, "b"), (1, "c")]
+    assert [item for index, item in merged if index == 0] == ["a", "b"]
+
+
+def test_merge_streams_reraises_producer_errors():
+    def failing():
+        yield "partial"
+        raise RuntimeError("stream broke")
+
+    seen = []
+    with pytest.raises(RuntimeError):
+        for item in merge_streams([failing]):
+            seen.append(item)
+    assert seen == [(0, "partial")]
+
+
+def test_merge_streams_closes_producers_when_consumer_stops():
+    closed = threading.Event()
+
+    def endless():
+        try:
+            while True:
+                yield threading.current_thread().name
+                time.sleep(0.01)
+        finally:
+            closed.set()
+
+    merged = merge_streams([endless])
+    _, thread_name = next(merged)
+    merged.close()
+
+    # Producers use their own pool, not the one blocking fan-out shares
+    assert thread_name.startswith("streams")
+    assert closed.wait(2)
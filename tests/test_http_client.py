@@ -0,0 +1,61 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from news_insight_app.http_client import ModelHttpClient, _endpoint_key
+
+
+class _CompletionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        body = json.dumps({"choices": [{"text": "ok"}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def completion_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _CompletionHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1/completions"
+    server.shutdown()
+    server.server_close()
+
+
+def test_endpoint_key_strips_path():
+    assert _endpoint_key("http://10.0.0.1:8000/v1/completions") == "http://10.0.0.1:8000"
+
+
+def test_client_reuses_connections(completion_server):
+    client = ModelHttpClient(pool_maxsize=2)
+    for _ in range(5):
+        response = client.post(completion_server, json={"prompt": "hi"}, timeout=5)
+        assert response.json()["choices"][0]["text"] == "ok"
+
+    stats = client.pool_stats()[_endpoint_key(completion_server)]
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["reuse_ratio"] == pytest.approx(0.8)
+    client.close()
+
+
+def test_client_keeps_one_session_per_endpoint():
+    client = ModelHttpClient()
+    first = client._session_for("http://10.0.0.1:8000/v1/completions")
+    second = client._session_for("http://10.0.0.1:8000/v1/chat")
+    other = client._session_for("http://10.0.0.1:8001/v1/completions")
+    assert first is second
+    assert first is not other
+    client.close()
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from news_insight_app.jobs import (
+    DONE,
+    EXPIRED,
+    FAILED,
+    InMemoryJobStore,
+    JobQueue,
+    QueueFull,
+    SqliteJobStore,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryJobStore()
+    return SqliteJobStore(str(tmp_path / "jobs.db"))
+
+
+def test_job_runs_and_result_can_be_polled(store):
+    jobs = JobQueue(store, handlers={"echo": lambda params: {"echo": params["value"]}})
+    job = jobs.submit("echo", {"value": 7})
+
+    finished = jobs.get(job["id"], wait=5)
+    assert finished["status"] == DONE
+    assert finished["result"] == {"echo": 7}
+
+
+def test_job_failure_is_recorded(store):
+    def boom(params):
+        raise RuntimeError("model exploded")
+
+    jobs = JobQueue(store, handlers={"boom": boom})
+    job = jobs.submit("boom", {})
+
+    finished = jobs.get(job["id"], wait=5)
+    assert finished["status"] == FAILED
+    assert finished["error"] == "model exploded"
+
+
+def test_queue_depth_is_enforced():
+    release = threading.Event()
+    started = threading.Event()
+
+    def block(params):
+        started.set()
+        release.wait(5)
+
+    jobs = JobQueue(workers=1, max_queue=1, handlers={"block": block})
+    jobs.submit("block", {})
+    assert started.wait(5)
+    jobs.submit("block", {})
+    with pytest.raises(QueueFull):
+        jobs.submit("block", {})
+    release.set()
+
+
+def test_stale_queued_job_expires():
+    jobs = JobQueue(job_ttl=-1, handlers={"echo": lambda params: params})
+    job = jobs.submit("echo", {})
+    assert jobs.get(job["id"], wait=5)["status"] == EXPIRED
+
+
+def test_finished_jobs_are_purged_after_retention():
+    jobs = JobQueue(result_ttl=-1, handlers={"echo": lambda params: params})
+    first = jobs.submit("echo", {})
+    jobs.get(first["id"], wait=5)
+    jobs.submit("echo", {})
+    assert jobs.get(first["id"]) is None
+
+
+def test_unknown_job_kind_is_rejected():
+    with pytest.raises(ValueError):
+        JobQueue(handlers={}).submit("missing", {})
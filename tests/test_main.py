@@ -96,6 +96,38 @@ def test_get_article_analysis_route(client, monkeypatch):
     assert reference['id'] in valid_reference_ids
 
 
+def test_get_article_analysis_combined_mode(client, monkeypatch):
+    """With COMBINED_ANALYSIS on, one call fills both the sentiment and rhetoric sections"""
+    import news_insight_app.main as bp
+
+    calls = []
+
+    def fake_combined(text):
+        calls.append(text)
+        return (
+            {'sentiment': 'Negative', 'label': 'NEGATIVE', 'model': 'Qwen2-7B'},
+            {'model': 'Qwen2-7B', 'analysis': 'Combined analysis.', 'text': 'Combined analysis.',
+             'tokens_used': 120, 'error': None},
+        )
+
+    def unexpected(*args):
+        raise AssertionError('two-model path used in combined mode')
+
+    monkeypatch.setattr(bp, 'COMBINED_ANALYSIS', True)
+    monkeypatch.setattr(bp, 'analyze_article_combined', fake_combined)
+    monkeypatch.setattr(bp, 'analyze_rhetoric', unexpected)
+    monkeypatch.setattr(bp, 'analyze_sentiment', unexpected)
+    monkeypatch.setattr(bp, 'compare_article_texts', lambda p, r: {'model': 'Mistral-7B', 'comparison': 'diff', 'error': None})
+
+    data = client.get('/api/news/1/analysis').get_json()
+
+    assert len(calls) == 1
+    assert data['article']['id'] == 1
+    assert data['article']['sentiment']['sentiment'] == 'Negative'
+    assert data['rhetoric']['analysis'] == 'Combined analysis.'
+    assert data['comparison']['comparison'] == 'diff'
+
+
 def test_get_article_analysis_route_not_found(client):
     """Test that a non-existent article ID returns 404 with an error body"""
     response = client.get('/api/news/999/analysis')
@@ -211,4 +243,186 @@ def test_empty_text_handling():
     assert isinstance(empty_summary, str)
     assert isinstance(empty_sentiment, dict)
     assert isinstance(empty_keywords, list)
-    assert isinstance(empty_insights, dict)
\ No newline at end of file
+    assert isinstance(empty_insights, dict)
+
+
+def test_stats_route_reports_http_pools(client):
+    """The stats endpoint exposes model connection pool counters"""
+    response = client.get('/api/stats')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert isinstance(data['http_pools'], dict)
+    assert 'qwen2-7b' in data['tokenizers']
+    assert 'hit_rate' in data['token_cache']
+
+
+def test_compare_api_runs_model_calls_concurrently(client, monkeypatch):
+    """Rhetoric and comparison calls for /api/compare are dispatched together"""
+    import threading
+    import news_insight_app.main as bp
+
+    barrier = threading.Barrier(3, timeout=5)
+
+    def fake_rhetoric(text):
+        barrier.wait()
+        return {'model': 'Qwen2-7B', 'analysis': text, 'tokens_used': 0, 'error': None}
+
+    def fake_compare(primary, reference):
+        barrier.wait()
+        return {'model': 'Mistral-7B', 'comparison': 'diff', 'tokens_used': 0, 'error': 'Mistral request failed: x'}
+
+    monkeypatch.setattr(bp, 'analyze_rhetoric', fake_rhetoric)
+    monkeypatch.setattr(bp, 'compare_article_texts', fake_compare)
+
+    response = client.post('/api/compare', json={
+        'primary': {'content': 'left story'},
+        'reference': {'content': 'right story', 'title': 'Right'},
+    })
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['primary']['rhetoric']['analysis'] == 'left story'
+    assert data['reference']['rhetoric']['analysis'] == 'right story'
+    assert data['comparison']['error'] == 'Mistral request failed: x'
+    assert data['comparison']['reference']['title'] == 'Right'
+
+
+def test_news_search_fetches_both_sides_concurrently(client, monkeypatch):
+    """Left and right NewsAPI calls overlap and per-side errors are still reported"""
+    import threading
+    import news_insight_app.main as bp
+
+    barrier = threading.Barrier(2, timeout=5)
+
+    class FakeNewsApiService:
+        def search_news(self, query, max_articles=10, source_category=None):
+            barrier.wait()
+            if source_category == 'right':
+                raise Exception('right side unavailable')
+            return [{'title': 'Left story', 'url': 'https://example.com/l', 'content': 'Left content.'}]
+
+    monkeypatch.setattr(bp, 'NewsApiService', FakeNewsApiService)
+    monkeypatch.setattr(bp, 'analyze_sentiments', lambda texts: [analyze_sentiment('') for _ in texts])
+
+    response = client.get('/news-search?q=vote')
+    assert response.status_code == 200
+    assert b'Left story' in response.data
+    assert b'right side unavailable' in response.data
+
+
+
+def _parse_sse(body):
+    import json
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def test_compare_stream_route_emits_tokens_and_results(client, monkeypatch):
+    """The streaming compare endpoint relays tokens then one result per section"""
+    import news_insight_app.main as bp
+
+    def fake_stream_rhetoric(text):
+        yield {'type': 'token', 'text': text[:4]}
+        yield {'type': 'result', 'result': {'model': 'Qwen2-7B', 'analysis': text, 'error': None}}
+
+    def fake_stream_comparison(primary, reference):
+        yield {'type': 'result', 'result': {'model': 'Mistral-7B', 'comparison': 'diff', 'error': None}}
+
+    monkeypatch.setattr(bp, 'stream_rhetoric', fake_stream_rhetoric)
+    monkeypatch.setattr(bp, 'stream_comparison', fake_stream_comparison)
+
+    response = client.post('/api/compare/stream', json={
+        'primary': {'content': 'left story'},
+        'reference': {'content': 'right story', 'title': 'Right'},
+    })
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    events = _parse_sse(response.get_data(as_text=True))
+
+    assert events[-1][0] == 'done'
+    results = {data['section']: data['result'] for name, data in events if name == 'result'}
+    assert results['primary']['analysis'] == 'left story'
+    assert results['reference']['analysis'] == 'right story'
+    assert results['comparison']['reference']['title'] == 'Right'
+    tokens = {data['text'] for name, data in events if name == 'token'}
+    assert tokens == {'left', 'righ'}
+
+
+def test_compare_stream_route_reports_pending_sections_after_error(client, monkeypatch):
+    """A failing stream still yields one result per section, then done"""
+    import news_insight_app.main as bp
+
+    def failing_stream_comparison(primary, reference):
+        raise RuntimeError('upstream broke')
+        yield
+
+    monkeypatch.setattr(bp, 'stream_rhetoric', lambda text: iter(()))
+    monkeypatch.setattr(bp, 'stream_comparison', failing_stream_comparison)
+
+    response = client.post('/api/compare/stream', json={
+        'primary': {'content': 'left story'},
+        'reference': {'content': 'right story', 'title': 'Right'},
+    })
+    events = _parse_sse(response.get_data(as_text=True))
+    names = [name for name, _ in events]
+
+    assert 'error' in names and names[-1] == 'done'
+    results = {data['section']: data['result'] for name, data in events if name == 'result'}
+    assert set(results) == {'primary', 'reference', 'comparison'}
+    assert results['comparison']['comparison'] == 'Comparison unavailable for this pair of stories.'
+    assert 'upstream broke' in results['comparison']['error']
+    assert results['comparison']['reference']['title'] == 'Right'
+    assert results['primary']['analysis'] == 'Rhetorical analysis unavailable for this story.'
+
+
+def test_article_analysis_stream_route_not_found(client):
+    response = client.get('/api/news/999/analysis/stream')
+    assert response.status_code == 404
+
+
+def test_article_analysis_stream_route_includes_all_sections(client, monkeypatch):
+    import news_insight_app.main as bp
+
+    monkeypatch.setattr(bp, 'analyze_sentiment', lambda text: analyze_sentiment(''))
+    monkeypatch.setattr(bp, 'stream_rhetoric', lambda text: [
+        {'type': 'result', 'result': {'model': 'Qwen2-7B', 'analysis': 'ok', 'error': None}},
+    ])
+    monkeypatch.setattr(bp, 'stream_comparison', lambda p, r: [
+        {'type': 'result', 'result': {'model': 'Mistral-7B', 'comparison': 'ok', 'error': None}},
+    ])
+
+    response = client.get('/api/news/1/analysis/stream')
+    events = _parse_sse(response.get_data(as_text=True))
+    results = {data['section']: data['result'] for name, data in events if name == 'result'}
+
+    assert results['article']['id'] == 1
+    assert results['comparison']['reference']['id'] != 1
+    assert results['rhetoric']['analysis'] == 'ok'
+
+
+def test_compare_job_returns_id_then_result(client, monkeypatch):
+    """Submitting a compare job returns immediately; polling yields the usual payload"""
+    import news_insight_app.main as bp
+    from news_insight_app.jobs import JobQueue, set_job_queue
+
+    monkeypatch.setattr(bp, 'analyze_rhetoric', lambda text: {'model': 'Qwen2-7B', 'analysis': text, 'error': None})
+    monkeypatch.setattr(bp, 'compare_article_texts', lambda p, r: {'model': 'Mistral-7B', 'comparison': 'diff', 'error': None})
+    set_job_queue(JobQueue())
+    try:
+        response = client.post('/api/jobs/compare', json={
+            'primary': {'content': 'left story'},
+            'reference': {'content': 'right story', 'title': 'Right'},
+        })
+        assert response.status_code == 202
+        job = response.get_json()
+        assert job['status'] == 'queued'
+
+        polled = client.get(job['poll'] + '?wait=5').get_json()
+        assert polled['status'] == 'done'
+        assert polled['result']['primary']['rhetoric']['analysis'] == 'left story'
+        assert polled['result']['comparison']['reference']['title'] == 'Right'
+        assert client.get('/api/jobs/unknown').status_code == 404
+    finally:
+        set_job_queue(None)
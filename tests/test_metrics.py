@@ -0,0 +1,113 @@
+import pytest
+
+from news_insight_app import analysis_service, services
+from news_insight_app.http_client import get_http_client
+from news_insight_app.metrics import (
+    MetricsRegistry,
+    get_metrics_registry,
+    set_metrics_registry,
+    set_route,
+    reset_route,
+)
+from conftest import DummyResponse, DummyStreamResponse
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    set_metrics_registry(MetricsRegistry())
+    yield
+    set_metrics_registry(None)
+
+
+def test_counter_renders_labels_and_escapes():
+    registry = MetricsRegistry()
+    counter = registry.counter("demo_total", "A demo counter.", ("route",))
+    counter.inc(route='/a"b')
+    counter.inc(2, route='/a"b')
+
+    text = registry.render()
+
+    assert "# TYPE demo_total counter" in text
+    assert 'demo_total{route="/a\\"b"} 3' in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("demo_seconds", "Demo.", ("model",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value, model="m")
+
+    lines = registry.render().splitlines()
+
+    assert 'demo_seconds_bucket{model="m",le="0.1"} 2' in lines
+    assert 'demo_seconds_bucket{model="m",le="1"} 3' in lines
+    assert 'demo_seconds_bucket{model="m",le="+Inf"} 4' in lines
+    assert 'demo_seconds_count{model="m"} 4' in lines
+    assert 'demo_seconds_sum{model="m"} 5.65' in lines
+
+
+def test_completion_metrics_use_current_route(monkeypatch):
+    def fake_post(url, json, timeout):
+        return DummyResponse({'choices': [{'text': 'analysis'}], 'usage': {'total_tokens': 7}})
+
+    monkeypatch.setattr(get_http_client(), 'post', fake_post)
+    token = set_route('/api/test')
+    try:
+        analysis_service.analyze_rhetoric('Some article text.', use_cache=False)
+    finally:
+        reset_route(token)
+
+    registry = get_metrics_registry()
+    latency = registry.histogram("news_insight_completion_seconds", "", ("model", "route"))
+    tokens = registry.counter("news_insight_completion_tokens_total", "", ("model", "route"))
+    assert latency.count(model="Qwen2-7B", route="/api/test") == 1
+    assert tokens.value(model="Qwen2-7B", route="/api/test") == 7
+
+
+def test_failed_completion_counts_error(monkeypatch):
+    from requests.exceptions import ConnectionError
+
+    def fake_post(url, json, timeout):
+        raise ConnectionError("down")
+
+    monkeypatch.setattr(get_http_client(), 'post', fake_post)
+    services._get_sentiment_service().analyze("Markets fell sharply.")
+
+    errors = get_metrics_registry().counter(
+        "news_insight_errors_total", "", ("component", "reason", "route"),
+    )
+    assert errors.value(component="completion:phi3.5:latest", reason="ConnectionError", route="none") == 1
+
+
+def test_metrics_endpoint_exposes_request_and_cache_metrics(client, monkeypatch):
+    def fake_post(url, json, timeout):
+        return DummyResponse({'choices': [{'text': '{"sentiment": "positive"}'}], 'usage': {}})
+
+    monkeypatch.setattr(get_http_client(), 'post', fake_post)
+    client.get('/api/news/1')
+
+    response = client.get('/metrics')
+    text = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+    assert 'news_insight_http_request_seconds_count{route="/api/news/<int:article_id>",method="GET",status="200"} 1' in text
+    assert 'news_insight_completion_seconds_count{model="phi3.5:latest",route="/api/news/<int:article_id>"}' in text
+    assert 'news_insight_sentiment_chunks_count{model="phi3.5:latest"}' in text
+    assert 'news_insight_cache_lookups_total{cache="sentiment",result="miss"}' in text
+
+
+def test_streamed_completions_are_labelled_with_their_route(client, monkeypatch):
+    def fake_post_stream(url, json, timeout):
+        return DummyStreamResponse([{'choices': [{'text': 'ok'}], 'usage': {'total_tokens': 3}}])
+
+    monkeypatch.setattr(get_http_client(), 'post_stream', fake_post_stream)
+    response = client.post('/api/compare/stream?refresh=1', json={
+        'primary': {'content': 'left story'},
+        'reference': {'content': 'right story'},
+    })
+    response.get_data()
+
+    latency = get_metrics_registry().histogram("news_insight_completion_seconds", "", ("model", "route"))
+    assert latency.count(model="Qwen2-7B", route="/api/compare/stream") == 2
+    assert latency.count(model="Qwen2-7B", route="none") == 0
@@ -1,7 +1,10 @@
+import threading
+import time
 import unittest
 from unittest.mock import Mock, patch
 import os
-from news_insight_app.news_api_service import NewsApiService
+from news_insight_app.metrics import current_route, reset_route, set_route
+from news_insight_app.news_api_service import NewsApiService, RebasedSession, ResponseCache
 
 
 class TestNewsApiService(unittest.TestCase):
@@ -142,6 +145,196 @@ class TestNewsApiService(unittest.TestCase):
         call_kwargs = mock_client.get_everything.call_args[1]
         self.assertIn('sources', call_kwargs)
 
+    
+    @patch('requests.Session.request')
+    def test_rebased_session_redirects_newsapi_urls(self, mock_request):
+        session = RebasedSession('http://127.0.0.1:9100/')
+        session.get('https://newsapi.org/v2/everything', params={'q': 'x'})
+        session.get('https://example.com/other')
+        
+        self.assertEqual(mock_request.call_args_list[0][0][1], 'http://127.0.0.1:9100/v2/everything')
+        self.assertEqual(mock_request.call_args_list[1][0][1], 'https://example.com/other')
+    
+    @patch('news_insight_app.news_api_service.NewsApiClient')
+    def test_base_url_uses_rebased_session(self, mock_client_class):
+        NewsApiService(api_key='test_api_key', base_url='http://127.0.0.1:9100')
+        
+        session = mock_client_class.call_args[1]['session']
+        self.assertIsInstance(session, RebasedSession)
+        self.assertEqual(session.base_url, 'http://127.0.0.1:9100')
+    
+    @patch('news_insight_app.news_api_service.NewsApiClient')
+    def test_search_news_cached_across_instances(self, mock_client_class):
+        mock_client = Mock()
+        mock_client_class.return_value = mock_client
+        mock_client.get_everything.return_value = {
+            'status': 'ok',
+            'articles': [
+                {
+                    'title': 'Cached Article',
+                    'content': 'Cached content',
+                    'url': 'https://example.com/cached',
+                    'source': {'name': 'Test Source'},
+                    'publishedAt': '2023-01-01T00:00:00Z',
+                    'description': 'Cached description'
+                }
+            ]
+        }
+        
+        first = NewsApiService(api_key='test_api_key').search_news(' voting  rights', 5, 'left')
+        second = NewsApiService(api_key='test_api_key').search_news('voting rights', 5, 'left')
+        
+        # Queries differing only in whitespace share one upstream call
+        self.assertEqual(mock_client.get_everything.call_count, 1)
+        self.assertEqual(first, second)
+        
+        NewsApiService(api_key='test_api_key').search_news('voting rights', 5, 'right')
+        self.assertEqual(mock_client.get_everything.call_count, 2)
+        
+        # NewsAPI operators are case-sensitive, so case is part of the key
+        NewsApiService(api_key='test_api_key').search_news('trump AND biden', 5)
+        NewsApiService(api_key='test_api_key').search_news('trump and biden', 5)
+        self.assertEqual(mock_client.get_everything.call_count, 4)
+    
+    @patch('news_insight_app.news_api_service.NewsApiClient')
+    def test_get_sources_cached(self, mock_client_class):
+        mock_client = Mock()
+        mock_client_class.return_value = mock_client
+        mock_client.get_sources.return_value = {'status': 'ok', 'sources': [{'id': 'npr'}]}
+        
+        NewsApiService(api_key='test_api_key').get_sources()
+        sources = NewsApiService(api_key='test_api_key').get_sources()
+        
+        self.assertEqual(sources, [{'id': 'npr'}])
+        self.assertEqual(mock_client.get_sources.call_count, 1)
+    
+    @patch('news_insight_app.news_api_service.NewsApiClient')
+    def test_search_news_errors_not_cached(self, mock_client_class):
+        mock_client = Mock()
+        mock_client_class.return_value = mock_client
+        mock_client.get_everything.return_value = {'status': 'error'}
+        
+        service = NewsApiService(api_key='test_api_key')
+        with self.assertRaises(Exception):
+            service.search_news('test topic', 2)
+        with self.assertRaises(Exception):
+            service.search_news('test topic', 2)
+        self.assertEqual(mock_client.get_everything.call_count, 2)
+
+
+class TestResponseCache(unittest.TestCase):
+    
+    def setUp(self):
+        self.now = [1000.0]
+        self.cache = ResponseCache(clock=lambda: self.now[0])
+    
+    def test_serves_stale_value_while_refreshing(self):
+        values = iter(['old', 'new'])
+        refreshed = threading.Event()
+        
+        def fetch():
+            value = next(values)
+            if value == 'new':
+                refreshed.set()
+            return value
+        
+        self.assertEqual(self.cache.get_or_fetch(('k',), fetch, ttl=10, stale_ttl=60), 'old')
+        self.now[0] += 20
+        self.assertEqual(self.cache.get_or_fetch(('k',), fetch, ttl=10, stale_ttl=60), 'old')
+        self.assertTrue(refreshed.wait(5))
+        for _ in range(100):
+            if self.cache.stats()['entries'] and not self.cache._inflight:
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.cache.get_or_fetch(('k',), fetch, ttl=10, stale_ttl=60), 'new')
+        self.assertEqual(self.cache.stats()['stale_hits'], 1)
+    
+    def test_expired_value_is_refetched(self):
+        calls = []
+        
+        def fetch():
+            calls.append(1)
+            return len(calls)
+        
+        self.cache.get_or_fetch(('k',), fetch, ttl=10)
+        self.now[0] += 11
+        self.assertEqual(self.cache.get_or_fetch(('k',), fetch, ttl=10), 2)
+    
+    def test_background_refresh_keeps_the_route_label(self):
+        routes = []
+        refreshed = threading.Event()
+        
+        def fetch():
+            routes.append(current_route())
+            if len(routes) == 2:
+                refreshed.set()
+            return 'value'
+        
+        token = set_route('/api/news')
+        try:
+            self.cache.get_or_fetch(('k',), fetch, ttl=10, stale_ttl=60)
+            self.now[0] += 20
+            self.cache.get_or_fetch(('k',), fetch, ttl=10, stale_ttl=60)
+        finally:
+            reset_route(token)
+        self.assertTrue(refreshed.wait(5))
+        self.assertEqual(routes, ['/api/news', '/api/news'])
+    
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResponseCache(max_entries=2, clock=lambda: self.now[0])
+        for key in ('a', 'b'):
+            cache.get_or_fetch((key,), lambda: key, ttl=10)
+        cache.get_or_fetch(('a',), lambda: 'refetched', ttl=10)
+        cache.get_or_fetch(('c',), lambda: 'c', ttl=10)
+        
+        self.assertEqual(cache.get_or_fetch(('a',), lambda: 'refetched', ttl=10), 'a')
+        self.assertEqual(cache.get_or_fetch(('b',), lambda: 'refetched', ttl=10), 'refetched')
+        self.assertEqual(cache.stats()['entries'], 2)
+        self.assertEqual(cache.stats()['evictions'], 2)
+    
+    def test_failed_background_refresh_is_logged(self):
+        def fail():
+            raise RuntimeError('upstream down')
+        
+        self.cache.get_or_fetch(('k',), lambda: 'old', ttl=10, stale_ttl=60)
+        self.now[0] += 20
+        with self.assertLogs('news_insight_app.news_api_service', level='WARNING') as logs:
+            self.assertEqual(self.cache.get_or_fetch(('k',), fail, ttl=10, stale_ttl=60), 'old')
+            for _ in range(100):
+                if not self.cache._inflight and logs.records:
+                    break
+                time.sleep(0.01)
+        self.assertIn('upstream down', logs.output[0])
+        self.assertEqual(self.cache.get_or_fetch(('k',), fail, ttl=10, stale_ttl=60), 'old')
+    
+    def test_concurrent_misses_are_coalesced(self):
+        release = threading.Event()
+        calls = []
+        
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return 'value'
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                self.cache.get_or_fetch(('k',), fetch, ttl=10)))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        for _ in range(100):
+            if self.cache.stats()['coalesced'] == 2:
+                break
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 3)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,52 @@
+from news_insight_app import analysis_service, services
+from news_insight_app.http_client import get_http_client
+from news_insight_app.prompts import (
+    COMBINED_PROMPT,
+    COMPARISON_PROMPT,
+    RHETORIC_PROMPT,
+    SENTIMENT_PROMPT,
+    PromptTemplate,
+)
+from conftest import DummyResponse
+
+
+def test_rendered_prompts_share_the_static_prefix():
+    for template, fields in (
+        (RHETORIC_PROMPT, {'article': 'First story.'}),
+        (COMPARISON_PROMPT, {'primary': 'One.', 'reference': 'Two.'}),
+        (SENTIMENT_PROMPT, {'article': 'Markets fell.'}),
+        (COMBINED_PROMPT, {'article': 'Markets rose.'}),
+    ):
+        prompt = template.render(**fields)
+        assert prompt.startswith(template.prefix)
+        # Nothing request-specific may leak into the cached part
+        assert all(value not in template.prefix for value in fields.values())
+
+
+def test_prefix_id_tracks_version_and_wording():
+    base = PromptTemplate('demo', '1', 'Instructions.\n', '{article}')
+    assert base.prefix_id == PromptTemplate('demo', '1', 'Instructions.\n', 'Other {article}').prefix_id
+    assert base.prefix_id != PromptTemplate('demo', '2', 'Instructions.\n', '{article}').prefix_id
+    assert base.prefix_id != PromptTemplate('demo', '1', 'New instructions.\n', '{article}').prefix_id
+
+
+def test_article_braces_are_not_formatted():
+    assert RHETORIC_PROMPT.render(article='{reference}').endswith('{reference}\n\nAnalysis:')
+
+
+def test_payloads_announce_the_prefix(monkeypatch):
+    payloads = []
+
+    def fake_post(url, json, timeout):
+        payloads.append(json)
+        return DummyResponse({'choices': [{'text': '{"sentiment": "negative"}'}], 'usage': {}})
+
+    monkeypatch.setattr(get_http_client(), 'post', fake_post)
+    analysis_service.analyze_rhetoric('Some article text.', use_cache=False)
+    analysis_service.compare_article_texts('Story one.', 'Story two.', use_cache=False)
+    services._get_sentiment_service().analyze('Markets fell sharply.')
+
+    for payload, template in zip(payloads, (RHETORIC_PROMPT, COMPARISON_PROMPT, SENTIMENT_PROMPT)):
+        assert payload['prompt'].startswith(template.prefix)
+        assert payload['prefix_id'] == template.prefix_id
+        assert payload['prefix_length'] > 0
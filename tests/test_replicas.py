@@ -0,0 +1,153 @@
+import threading
+import time
+
+import pytest
+from requests.exceptions import ConnectionError
+
+from news_insight_app.http_client import ModelHttpClient, _endpoint_key
+from news_insight_app.replicas import ReplicaPool, parse_replicas
+from conftest import DummyResponse
+
+A = 'http://gpu-a:8000/v1/completions'
+B = 'http://gpu-b:8000/v1/completions'
+
+
+class FakeSession:
+    def __init__(self, name, delay=0.0, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def post(self, url, json=None, timeout=None, stream=False, headers=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.name} refused")
+        response = DummyResponse({'choices': [{'text': self.name}]})
+        response.close = lambda: None
+        return response
+
+
+def _client(monkeypatch, sessions, **kwargs):
+    client = ModelHttpClient(health_check_seconds=0, **kwargs)
+    monkeypatch.setattr(client, '_session_for', lambda url: sessions[_endpoint_key(url)])
+    return client
+
+
+def test_parse_replicas_ignores_blanks():
+    assert parse_replicas(f" {A}, ,{B} ") == [A, B]
+
+
+def test_least_outstanding_prefers_idle_and_healthy_replicas():
+    pool = ReplicaPool([A, B], policy='least_outstanding')
+    first, second = pool.replicas
+    pool.acquire(first)
+    assert pool.ranked()[0] is second
+
+    pool.probe(lambda url: 'gpu-a' in url)
+    assert pool.ranked()[0] is first
+    assert pool.ranked(lambda replica: replica is first)[0] is second
+
+
+def test_latency_policy_weighs_in_flight_requests_by_latency():
+    pool = ReplicaPool([A, B], policy='latency')
+    fast, slow = pool.replicas
+    for replica, seconds in ((fast, 0.1), (slow, 0.5)):
+        pool.acquire(replica)
+        pool.release(replica, seconds)
+    assert pool.ranked()[0] is fast
+
+    for _ in range(5):
+        pool.acquire(fast)  # 6 x 0.1 s now beats 1 x 0.5 s
+    assert pool.ranked()[0] is slow
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        ReplicaPool([A], policy='random')
+
+
+def test_client_fails_over_to_next_replica(monkeypatch):
+    sessions = {'http://gpu-a:8000': FakeSession('a', fail=True), 'http://gpu-b:8000': FakeSession('b')}
+    client = _client(monkeypatch, sessions, failure_threshold=1)
+
+    answers = [client.post(f'{A},{B}', json={}, timeout=5).json()['choices'][0]['text'] for _ in range(3)]
+
+    assert answers == ['b', 'b', 'b']
+    # Replica a's circuit opened after one failure, so it was skipped afterwards
+    assert sessions['http://gpu-a:8000'].calls == 1
+    [stats] = client.replica_stats()
+    assert stats['replicas'][A]['failures'] == 1
+    assert stats['replicas'][B]['outstanding'] == 0
+
+
+def _hedging_client(monkeypatch, sessions):
+    client = _client(monkeypatch, sessions, hedge=True)
+    pool = client._pool_for(f'{A},{B}')
+    monkeypatch.setattr(pool, 'ranked', lambda unavailable: list(pool.replicas))
+    _, latencies = client._endpoint_state('http://gpu-a:8000')
+    for _ in range(latencies.min_samples):
+        latencies.observe(0.05)
+    return client, pool
+
+
+def test_hedge_answers_when_the_slow_primary_fails(monkeypatch):
+    sessions = {'http://gpu-a:8000': FakeSession('a', delay=0.3, fail=True), 'http://gpu-b:8000': FakeSession('b')}
+    client, pool = _hedging_client(monkeypatch, sessions)
+
+    response = client.post(f'{A},{B}', json={}, timeout=5)
+
+    assert response.json()['choices'][0]['text'] == 'b'
+    assert pool.hedges_sent == 1 and pool.hedges_won == 1
+    # The primary did not fail over into the hedge's replica
+    assert sessions['http://gpu-b:8000'].calls == 1
+
+
+def test_fast_primary_runs_inline_without_a_hedge(monkeypatch):
+    threads = []
+    session = FakeSession('a')
+    original = session.post
+
+    def post(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return original(*args, **kwargs)
+
+    session.post = post
+    sessions = {'http://gpu-a:8000': session, 'http://gpu-b:8000': FakeSession('b')}
+    client, pool = _hedging_client(monkeypatch, sessions)
+
+    assert client.post(f'{A},{B}', json={}, timeout=5).json()['choices'][0]['text'] == 'a'
+    time.sleep(0.1)  # past the hedge deadline
+
+    assert threads == [threading.current_thread()]
+    assert pool.hedges_sent == 0
+    assert sessions['http://gpu-b:8000'].calls == 0
+
+
+def test_close_stops_health_probers(monkeypatch):
+    probes = []
+    client = ModelHttpClient(health_check_seconds=0.01)
+    monkeypatch.setattr(client, '_health_check', lambda url: probes.append(url) or True)
+    pool = client._pool_for(f'{A},{B}')
+    time.sleep(0.05)
+
+    client.close()
+    pool._prober.join(1)
+    assert not pool._prober.is_alive()
+    count = len(probes)
+    time.sleep(0.05)
+    assert len(probes) == count
+
+
+def test_stream_counts_as_outstanding_until_closed(monkeypatch):
+    sessions = {'http://gpu-a:8000': FakeSession('a'), 'http://gpu-b:8000': FakeSession('b')}
+    client = _client(monkeypatch, sessions)
+
+    response = client.post_stream(f'{A},{B}', json={}, timeout=5)
+    pool = client._pool_for(f'{A},{B}')
+    assert sum(replica.outstanding for replica in pool.replicas) == 1
+
+    response.close()
+    response.close()
+    assert sum(replica.outstanding for replica in pool.replicas) == 0
@@ -0,0 +1,82 @@
+import pytest
+
+from news_insight_app import result_cache
+from news_insight_app.result_cache import (
+    LRUCache,
+    ResultCache,
+    cache_bypass,
+    cache_bypassed,
+    make_cache_key,
+)
+
+
+def test_make_cache_key_is_stable_and_order_sensitive():
+    assert make_cache_key("a", {"x": 1, "y": 2}) == make_cache_key("a", {"y": 2, "x": 1})
+    assert make_cache_key("a", "b") != make_cache_key("b", "a")
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_cache_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(result_cache.time, "monotonic", lambda: now[0])
+    cache = LRUCache(max_entries=4, ttl_seconds=10)
+    cache.set("a", 1)
+    now[0] += 11
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_lru_cache_counts_hits_and_misses():
+    cache = LRUCache(max_entries=4, ttl_seconds=60)
+    cache.get("missing")
+    cache.set("a", 1)
+    cache.get("a")
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == pytest.approx(0.5)
+
+
+def test_result_cache_disk_tier_survives_restart(tmp_path):
+    db_path = str(tmp_path / "analysis.db")
+    ResultCache(db_path=db_path).set("key", {"analysis": "cached text"})
+
+    restarted = ResultCache(db_path=db_path)
+    assert restarted.get("key") == {"analysis": "cached text"}
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_result_cache_disk_tier_deletes_expired_rows(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "time", lambda: now[0])
+    cache = ResultCache(ttl_seconds=10, db_path=str(tmp_path / "analysis.db"))
+    cache.set("old", {"analysis": "stale"})
+    cache.set("read", {"analysis": "stale"})
+    now[0] += 11
+    cache._memory.clear()
+
+    assert cache.get("read") is None
+    cache.set("new", {"analysis": "fresh"})
+
+    keys = [row[0] for row in cache._db.execute("SELECT key FROM analysis_cache")]
+    assert keys == ["new"]
+
+
+def test_cache_bypass_is_scoped():
+    assert not cache_bypassed()
+    with cache_bypass():
+        assert cache_bypassed()
+    assert not cache_bypassed()
@@ -1,7 +1,14 @@
+import threading
+
 import pytest
 
-import news_insight_app.sentiment_service as sentiment_service_module
-from news_insight_app.sentiment_service import SentimentService, PHI_MODEL_NAME, _extract_first_json
+from news_insight_app.http_client import get_http_client
+from news_insight_app.sentiment_service import (
+    SENTIMENT_SCHEMA,
+    SentimentService,
+    PHI_MODEL_NAME,
+    _extract_first_json,
+)
 from conftest import DummyResponse
 
 
@@ -12,7 +19,7 @@ def test_sentiment_service_positive_label(monkeypatch):
             "usage": {"total_tokens": 15},
         })
 
-    monkeypatch.setattr(sentiment_service_module.requests, "post", fake_post)
+    monkeypatch.setattr(get_http_client(), "post", fake_post)
     service = SentimentService()
 
     result = service.analyze("I love this product.")
@@ -34,7 +41,7 @@ def test_sentiment_service_negative_label(monkeypatch):
             "usage": {"total_tokens": 15},
         })
 
-    monkeypatch.setattr(sentiment_service_module.requests, "post", fake_post)
+    monkeypatch.setattr(get_http_client(), "post", fake_post)
     service = SentimentService()
 
     result = service.analyze("I hate this product.")
@@ -55,7 +62,7 @@ def test_sentiment_service_empty_text_short_circuits(monkeypatch):
         called.append(True)
         return DummyResponse({"choices": [], "usage": {}})
 
-    monkeypatch.setattr(sentiment_service_module.requests, "post", fake_post)
+    monkeypatch.setattr(get_http_client(), "post", fake_post)
     service = SentimentService()
 
     result = service.analyze("")
@@ -71,6 +78,7 @@ def test_sentiment_service_empty_text_short_circuits(monkeypatch):
         "raw": None,
         "token_count": 0,
         "latency_ms": 0,
+        "cached": False,
     }
     assert called == []
 
@@ -121,6 +129,38 @@ def test_extract_first_json_no_json():
     assert _extract_first_json("") is None
 
 
+def test_extract_first_json_skips_stray_braces():
+    """Unclosed or non-JSON braces before the answer don't hide it."""
+    assert _extract_first_json('Use { with care: {"sentiment": "negative"}') == {"sentiment": "negative"}
+    assert _extract_first_json('{not json} then {"sentiment": "positive"}') == {"sentiment": "positive"}
+    assert _extract_first_json('{bad {"sentiment": "neutral"} tail}') == {"sentiment": "neutral"}
+
+
+def test_extract_first_json_ignores_braces_in_strings():
+    """Braces and escaped quotes inside string values don't end the object."""
+    text = 'He said "hi" {"evidence": ["a } brace", "an \\"escaped\\" quote"], "sentiment": "positive"'
+    assert _extract_first_json(text + "}")["sentiment"] == "positive"
+    assert _extract_first_json(text) is None
+
+
+def test_extract_first_json_adversarial_inputs_return_none():
+    """Malformed shapes that used to take quadratic time simply yield None."""
+    assert _extract_first_json("{" * 50_000) is None
+    assert _extract_first_json("{x" * 20_000 + "}" * 20_000) is None
+    assert _extract_first_json("{x} " * 20_000) is None
+    # Deeper than the recursion limit: the decoder raises RecursionError
+    assert _extract_first_json('{"sentiment":' * 1500) is None
+    assert _extract_first_json('{"a":' * 1500 + '1' + '}' * 1500) is None
+
+
+def test_sentiment_service_survives_deeply_nested_answer(monkeypatch):
+    def fake_post(url, json, timeout):
+        return DummyResponse({"choices": [{"text": '{"sentiment":' * 1500}], "usage": {}})
+
+    monkeypatch.setattr(get_http_client(), "post", fake_post)
+    assert SentimentService().analyze("Some article text.")["sentiment"] == "Neutral"
+
+
 def test_sentiment_service_falls_back_to_keyword_when_no_json(monkeypatch):
     """When Phi returns plain text instead of JSON the keyword fallback fires."""
     def fake_post(url, json, timeout):
@@ -129,7 +169,7 @@ def test_sentiment_service_falls_back_to_keyword_when_no_json(monkeypatch):
             "usage": {"total_tokens": 10},
         })
 
-    monkeypatch.setattr(sentiment_service_module.requests, "post", fake_post)
+    monkeypatch.setattr(get_http_client(), "post", fake_post)
     result = SentimentService().analyze("Some article text.")
     assert result["sentiment"] == "Negative"
 
@@ -142,6 +182,157 @@ def test_sentiment_service_ignores_second_json_object(monkeypatch):
             "usage": {"total_tokens": 20},
         })
 
-    monkeypatch.setattr(sentiment_service_module.requests, "post", fake_post)
+    monkeypatch.setattr(get_http_client(), "post", fake_post)
     result = SentimentService().analyze("Some article text.")
     assert result["sentiment"] == "Positive"
+
+
+def test_sentiment_service_memoizes_chunks(monkeypatch):
+    """Re-classifying the same chunk is served from the memo with the original latency."""
+    calls = []
+
+    def fake_post(url, json, timeout):
+        calls.append(json)
+        return DummyResponse({
+            "choices": [{"text": '{"sentiment": "positive"}'}],
+            "usage": {"total_tokens": 5},
+        })
+
+    monkeypatch.setattr(get_http_client(), "post", fake_post)
+    service = SentimentService()
+
+    first = service.analyze("Markets rallied today.")
+    second = service.analyze("  Markets   rallied\ntoday.  ")
+
+    assert len(calls) == 1
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["latency_ms"] == first["latency_ms"]
+    assert second["sentiment"] == "Positive"
+    assert service.cache_stats()["hits"] == 1
+
+
+def test_sentiment_service_does_not_memoize_failures(monkeypatch):
+    calls = []
+
+    def failing_post(url, json, timeout):
+        calls.append(json)
+        raise RuntimeError("phi down")
+
+    monkeypatch.setattr(get_http_client(), "post", failing_post)
+    service = SentimentService()
+    service.analyze("Some article text.")
+    service.analyze("Some article text.")
+
+    assert len(calls) == 2
+
+
+def test_analyze_many_batches_prompts_and_preserves_order(monkeypatch):
+    batches = []
+
+    def fake_post(url, json, timeout):
+        prompts = json["prompt"]
+        batches.append(prompts)
+        # Answer out of order to exercise index mapping
+        choices = []
+        for i in reversed(range(len(prompts))):
+            label = "negative" if "bad" in prompts[i] else "positive"
+            choices.append({"index": i, "text": '{"sentiment": "%s"}' % label})
+        return DummyResponse({"choices": choices})
+
+    monkeypatch.setattr(get_http_client(), "post", fake_post)
+    service = SentimentService(max_batch_size=2)
+
+    results = service.analyze_many(["good one", "bad one", "", "good two", "good one"])
+
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert [r["sentiment"] for r in results] == [
+        "Positive", "Negative", "Neutral", "Positive", "Positive",
+    ]
+    assert service.analyze("bad one")["cached"] is True
+
+
+def test_analyze_many_failed_batch_falls_back_to_neutral(monkeypatch):
+    def failing_post(url, json, timeout):
+        raise RuntimeError("phi down")
+
+    monkeypatch.setattr(get_http_client(), "post", failing_post)
+    service = SentimentService()
+
+    results = service.analyze_many(["first", "second"])
+
+    assert [r["sentiment"] for r in results] == ["Neutral", "Neutral"]
+    assert service.cache_stats()["entries"] == 0
+
+
+def test_analyze_many_sends_batches_concurrently(monkeypatch):
+    """Multiple Phi batches are dispatched in parallel rather than one after another."""
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fake_post(url, json, timeout):
+        barrier.wait()
+        return DummyResponse({
+            "choices": [{"index": i, "text": '{"sentiment": "neutral"}'} for i in range(len(json["prompt"]))],
+        })
+
+    monkeypatch.setattr(get_http_client(), "post", fake_post)
+    results = SentimentService(max_batch_size=1).analyze_many(["one", "two"])
+    assert len(results) == 2
+
+
+def _post_text(monkeypatch, text, payloads=None):
+    def fake_post(url, json, timeout):
+        if payloads is not None:
+            payloads.append(json)
+        return DummyResponse({"choices": [{"text": text}], "usage": {}})
+
+    monkeypatch.setattr(get_http_client(), "post", fake_post)
+
+
+def test_truncated_json_uses_its_sentiment_field(monkeypatch):
+    """A cut-off JSON answer is labelled by its sentiment field, not by words in its evidence."""
+    _post_text(monkeypatch, '{"sentiment": "positive", "evidence": ["not as negative as fea')
+    assert SentimentService().analyze("Some article text.")["sentiment"] == "Positive"
+
+
+def test_broken_json_without_sentiment_field_stays_neutral(monkeypatch):
+    """Keywords inside malformed JSON never decide the label."""
+    _post_text(monkeypatch, '{"tone": "calm", "evidence": ["negative growth"')
+    assert SentimentService().analyze("Some article text.")["sentiment"] == "Neutral"
+
+
+def test_guided_json_mode_sends_schema_and_stop(monkeypatch):
+    payloads = []
+    _post_text(monkeypatch, 'The outlook is negative.', payloads)
+    service = SentimentService(output_mode="guided_json")
+
+    result = service.analyze("Some article text.")
+
+    assert payloads[0]["guided_json"] == SENTIMENT_SCHEMA
+    assert payloads[0]["stop"] == ["\n\n"]
+    # A constrained answer that is not JSON is not searched for keywords
+    assert result["sentiment"] == "Neutral"
+
+
+def test_response_format_mode_sends_json_schema(monkeypatch):
+    payloads = []
+    _post_text(monkeypatch, '{"sentiment": "negative", "tone": "urgent", "evidence": []}', payloads)
+
+    result = SentimentService(output_mode="response_format").analyze("Some article text.")
+
+    response_format = payloads[0]["response_format"]
+    assert response_format["type"] == "json_schema"
+    assert response_format["json_schema"]["schema"] == SENTIMENT_SCHEMA
+    assert result["sentiment"] == "Negative"
+
+
+def test_text_mode_sends_no_constraints(monkeypatch):
+    payloads = []
+    _post_text(monkeypatch, '{"sentiment": "neutral"}', payloads)
+    SentimentService().analyze("Some article text.")
+    assert "guided_json" not in payloads[0] and "response_format" not in payloads[0]
+
+
+def test_unknown_output_mode_is_rejected():
+    with pytest.raises(ValueError):
+        SentimentService(output_mode="grammar")
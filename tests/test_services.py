@@ -2,6 +2,11 @@ import pytest
 
 import news_insight_app.services as services
 from conftest import DummyTokenizerProvider
+from news_insight_app.tokenizer_utils import (
+    create_fallback_tokenizer,
+    encode_with_offsets,
+    whitespace_offsets,
+)
 
 
 class DummySentimentService:
@@ -89,3 +94,128 @@ def test_chunk_text_uses_tokenizer_provider(monkeypatch):
     assert len(provider.get_tokenizer_calls) == 1
     assert provider.get_tokenizer_calls[0] == "dummy"
 
+
+
+def test_analyze_sentiment_classifies_every_chunk(monkeypatch):
+    dummy = DummySentimentService()
+    monkeypatch.setattr(services, "_get_sentiment_service", lambda: dummy)
+    monkeypatch.setattr(
+        services, "_chunk_text", lambda text, max_tokens: ["First part.", "Second part.", "Third."]
+    )
+
+    result = services.analyze_sentiment("First part. Second part. Third.")
+
+    assert sorted(dummy.calls) == ["First part.", "Second part.", "Third."]
+    assert [chunk["index"] for chunk in result["chunks"]] == [0, 1, 2]
+    assert result["token_count"] == 5
+
+
+def test_reduce_chunk_sentiments_weights_by_tokens():
+    def chunk(sentiment, polarity, tokens, evidence, tone):
+        return {
+            "sentiment": sentiment,
+            "polarity": polarity,
+            "model": "dummy",
+            "raw": {"sentiment": sentiment.lower(), "tone": tone, "evidence": evidence},
+            "token_count": tokens,
+            "latency_ms": tokens,
+        }
+
+    result = services._reduce_chunk_sentiments([
+        chunk("Positive", 1.0, 10, ["gain"], "calm"),
+        chunk("Negative", -1.0, 30, ["loss", "gain"], "urgent"),
+    ])
+
+    assert result["sentiment"] == "Negative"
+    assert result["label"] == "NEGATIVE"
+    assert result["polarity"] == pytest.approx(-0.5)
+    assert result["confidence"] == pytest.approx(0.75)
+    assert result["raw"]["evidence"] == ["gain", "loss"]
+    assert result["raw"]["tone"] == "urgent"
+    assert result["latency_ms"] == 30
+    assert len(result["chunks"]) == 2
+
+
+def test_analyze_sentiments_uses_one_batched_call(monkeypatch):
+    class BatchingService(DummySentimentService):
+        def __init__(self):
+            super().__init__()
+            self.batches = []
+
+        def analyze_many(self, texts):
+            self.batches.append(list(texts))
+            return [self.analyze(text) for text in texts]
+
+    dummy = BatchingService()
+    monkeypatch.setattr(services, "_get_sentiment_service", lambda: dummy)
+
+    results = services.analyze_sentiments(["First story.", "", "Second story."])
+
+    assert dummy.batches == [["First story.", "Second story."]]
+    assert len(results) == 3
+    assert results[1]["token_count"] == 0
+
+
+@pytest.fixture(scope="module")
+def byte_level_tokenizer():
+    """Train a small GPT-2 style byte-level BPE tokenizer on the mock articles."""
+    transformers = pytest.importorskip("transformers")
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+
+    backend = Tokenizer(models.BPE())
+    backend.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    backend.decoder = decoders.ByteLevel()
+    backend.train_from_iterator(
+        [article["content"] for article in services.MOCK_NEWS],
+        trainers.BpeTrainer(vocab_size=300, initial_alphabet=pre_tokenizers.ByteLevel.alphabet()),
+    )
+    return transformers.PreTrainedTokenizerFast(tokenizer_object=backend)
+
+
+@pytest.mark.parametrize("text", [
+    services.MOCK_NEWS[0]["content"],
+    services.MOCK_NEWS[1]["content"],
+    "Growth hit 3.5 percent. Stocks rose .Next sentence follows . Then end",
+    " ".join(["word"] * 40) + ". Short one. " + " ".join(["tail"] * 25),
+], ids=["mock-1", "mock-2", "odd-periods", "long-sentences"])
+@pytest.mark.parametrize("max_tokens", [10, 50, 200, 510])
+def test_offset_chunker_matches_sentence_chunker(byte_level_tokenizer, text, max_tokens):
+    # Byte-level decoding can split a multibyte character across windows
+    text = text.encode("ascii", "ignore").decode("ascii")
+    max_chunk_tokens = services._get_max_chunk_tokens(byte_level_tokenizer, max_tokens)
+    offsets = encode_with_offsets(byte_level_tokenizer, text)
+    assert offsets is not None
+
+    by_offsets = services._chunk_text_by_offsets(text, offsets, max_chunk_tokens)
+    by_sentence = services._chunk_text_by_sentence(text, byte_level_tokenizer, max_chunk_tokens)
+
+    # Window text is sliced with whitespace collapsed; decoding keeps newlines
+    assert [" ".join(chunk.split()) for chunk in by_offsets] == \
+        [" ".join(chunk.split()) for chunk in by_sentence]
+
+
+def test_chunk_text_encodes_document_once(monkeypatch):
+    calls = []
+    tokenizer = create_fallback_tokenizer()
+
+    class CountingTokenizer:
+        model_max_length = tokenizer.model_max_length
+        num_special_tokens_to_add = staticmethod(tokenizer.num_special_tokens_to_add)
+
+        def encode_with_offsets(self, text):
+            calls.append(text)
+            return text.split(), whitespace_offsets(text)
+
+        def encode(self, text, add_special_tokens=False):
+            raise AssertionError("per-sentence encode should not be used")
+
+    class Provider:
+        def get_tokenizer(self, model_name):
+            return CountingTokenizer()
+
+    monkeypatch.setattr(services, "get_tokenizer_provider", lambda: Provider())
+    text = ". ".join(["Sentence number"] * 50) + "."
+    chunks = services._chunk_text(text, max_tokens=10)
+
+    assert len(calls) == 1
+    assert len(chunks) > 1
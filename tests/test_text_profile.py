@@ -0,0 +1,41 @@
+import pytest
+
+from news_insight_app.services import MOCK_NEWS
+from news_insight_app.text_profile import ArticleTextProfile, get_text_profile
+
+
+def _legacy_keywords(text, num_keywords=5):
+    words = text.lower().split()
+    stop_words = {'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'a', 'an', 'is', 'are', 'was', 'were'}
+    filtered = [w.strip('.,!?";()[]{}') for w in words if w not in stop_words and len(w) > 3]
+    freq = {}
+    for word in filtered:
+        freq[word] = freq.get(word, 0) + 1
+    return [w for w, _ in sorted(freq.items(), key=lambda x: x[1], reverse=True)[:num_keywords]]
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "One. Two. Three.",
+    "  Leading space.  Trailing text without period",
+    "Repeated words words words. Other \"quoted\" (words)!",
+] + [article["content"] for article in MOCK_NEWS])
+def test_profile_matches_legacy_helpers(text):
+    profile = ArticleTextProfile.from_text(text)
+    sentences = [s.strip() for s in text.split('.') if s.strip()]
+
+    assert list(profile.sentences) == sentences
+    assert profile.word_count == len(text.split())
+    assert profile.keywords() == _legacy_keywords(text)
+    assert [text[start:end] for start, end in profile.sentence_spans] == sentences
+
+
+def test_profile_summary_keeps_ellipsis_format():
+    profile = ArticleTextProfile.from_text("One. Two. Three.")
+    assert profile.summary(2) == "One. Two. .."
+    assert profile.summary(3) == "One. Two. Three."
+
+
+def test_get_text_profile_is_memoized():
+    text = "Memoized article. Second sentence."
+    assert get_text_profile(text) is get_text_profile(text)
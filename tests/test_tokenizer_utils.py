@@ -0,0 +1,170 @@
+import threading
+
+import pytest
+
+from news_insight_app import tokenizer_utils
+from news_insight_app.tokenizer_utils import (
+    TokenCache,
+    TokenizerProvider,
+    get_tokenizer_provider,
+    load_tokenizer,
+    set_tokenizer_provider,
+)
+
+
+@pytest.fixture
+def fresh_provider():
+    set_tokenizer_provider(None)
+    yield
+    set_tokenizer_provider(None)
+
+
+def _save_tiny_tokenizer(path):
+    """Train a throwaway word-level tokenizer and save it like save_pretrained would."""
+    transformers = pytest.importorskip("transformers")
+    from tokenizers import Tokenizer, models, pre_tokenizers, trainers
+
+    backend = Tokenizer(models.WordLevel(unk_token="[UNK]"))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    backend.train_from_iterator(
+        ["markets rallied today", "the senate passed a bill"],
+        trainers.WordLevelTrainer(special_tokens=["[UNK]"]),
+    )
+    tokenizer = transformers.PreTrainedTokenizerFast(tokenizer_object=backend, unk_token="[UNK]")
+    tokenizer.save_pretrained(str(path))
+
+
+def test_missing_cache_dir_uses_fallback():
+    provider = TokenizerProvider(cache_dir="")
+
+    tokenizer = provider.get_tokenizer("qwen2-7b")
+
+    assert tokenizer.encode("two words") == ["two", "words"]
+    assert provider.describe() == {"qwen2-7b": "fallback"}
+
+
+def test_loads_saved_tokenizer_from_cache_dir(tmp_path):
+    _save_tiny_tokenizer(tmp_path / "mistralai--Mistral-7B-Instruct-v0.2")
+    provider = TokenizerProvider(cache_dir=str(tmp_path))
+
+    tokenizer = provider.get_tokenizer("mistralai/Mistral-7B-Instruct-v0.2")
+
+    assert getattr(tokenizer, "is_fast", False)
+    assert provider.count_tokens("markets rallied today", "mistralai/Mistral-7B-Instruct-v0.2") == 3
+    assert provider.describe()["mistralai/Mistral-7B-Instruct-v0.2"] != "fallback"
+
+
+def test_load_tokenizer_returns_none_when_files_missing(tmp_path):
+    assert load_tokenizer("phi3.5:latest", str(tmp_path)) is None
+
+
+def test_tokenizer_loaded_once_under_concurrency(monkeypatch):
+    loads = []
+
+    def counting_load(model_name, cache_dir):
+        loads.append(model_name)
+        return None
+
+    monkeypatch.setattr(tokenizer_utils, "load_tokenizer", counting_load)
+    provider = TokenizerProvider(cache_dir="")
+    seen = []
+    threads = [
+        threading.Thread(target=lambda: seen.append(provider.get_tokenizer("m")))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loads == ["m"]
+    assert all(tokenizer is seen[0] for tokenizer in seen)
+
+
+def test_get_tokenizer_provider_reuses_instance(fresh_provider):
+    first = get_tokenizer_provider()
+
+    assert get_tokenizer_provider() is first
+
+
+def test_encode_batch_keeps_order_and_empty_texts(tmp_path):
+    _save_tiny_tokenizer(tmp_path / "tiny")
+    provider = TokenizerProvider(cache_dir=str(tmp_path))
+
+    encoded = provider.encode_batch(["markets rallied", "", "the bill"], "tiny")
+
+    assert [len(token_ids) for token_ids in encoded] == [2, 0, 2]
+    assert list(encoded[0]) == provider.get_tokenizer("tiny").encode("markets rallied", add_special_tokens=False)
+
+
+def test_count_tokens_batch_with_fallback():
+    provider = TokenizerProvider(cache_dir="")
+
+    assert provider.count_tokens_batch(["a b c", "", "d"], "any") == [3, 0, 1]
+
+
+class CountingTokenizer:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text, add_special_tokens=False):
+        self.calls += 1
+        return text.split()
+
+
+def test_count_tokens_is_memoized_per_model():
+    provider = TokenizerProvider(cache_dir="")
+    tokenizer = CountingTokenizer()
+    provider._tokenizers["m"] = tokenizer
+
+    assert provider.count_tokens("one two three", "m") == 3
+    assert provider.count_tokens("one two three", "m") == 3
+    assert provider.encode("one two three", "m") == ("one", "two", "three")
+
+    assert tokenizer.calls == 1
+    stats = provider.cache_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["tokens"] == 3
+
+
+def test_encode_batch_only_encodes_cache_misses():
+    provider = TokenizerProvider(cache_dir="")
+    tokenizer = CountingTokenizer()
+    provider._tokenizers["m"] = tokenizer
+    provider.encode("seen before", "m")
+
+    encoded = provider.encode_batch(["seen before", "new text here", "new text here"], "m")
+
+    assert [len(token_ids) for token_ids in encoded] == [2, 3, 3]
+    assert tokenizer.calls == 2
+
+
+def test_token_cache_evicts_by_stored_tokens():
+    cache = TokenCache(max_tokens=5)
+    cache.set(("m", b"a"), (1, 2, 3))
+    cache.set(("m", b"b"), (4, 5))
+    cache.get(("m", b"a"))
+    cache.set(("m", b"c"), (6, 7))
+
+    assert cache.get(("m", b"b")) is None
+    assert cache.get(("m", b"a")) == (1, 2, 3)
+    assert cache.stats()["tokens"] == 5
+    assert cache.stats()["evictions"] == 1
+
+
+def test_token_cache_skips_entries_over_budget():
+    cache = TokenCache(max_tokens=2)
+    cache.set(("m", b"a"), (1, 2, 3))
+
+    assert cache.stats()["entries"] == 0
+
+
+def test_create_app_warms_tokenizers(fresh_provider):
+    from news_insight_app import create_app
+
+    create_app()
+
+    assert set(get_tokenizer_provider().describe()) == {
+        "qwen2-7b", "mistralai/Mistral-7B-Instruct-v0.2", "phi3.5:latest",
+    }
@@ -0,0 +1,149 @@
+import json
+
+import pytest
+
+from news_insight_app.concurrency import run_parallel
+from news_insight_app.http_client import get_http_client
+from news_insight_app.tracing import (
+    TraceExporter,
+    current_trace_id,
+    get_trace_exporter,
+    set_trace_exporter,
+    span,
+    trace_headers,
+)
+from conftest import DummyResponse, DummyStreamResponse
+
+
+@pytest.fixture(autouse=True)
+def fresh_exporter():
+    set_trace_exporter(TraceExporter(buffer_size=50, path=""))
+    yield
+    set_trace_exporter(None)
+
+
+def test_nested_spans_share_one_trace():
+    with span("root") as root:
+        with span("child") as child:
+            assert child.parent_id == root.span_id
+            assert current_trace_id() == root.trace.trace_id
+
+    [record] = get_trace_exporter().recent()
+    assert record["name"] == "root"
+    assert [s["name"] for s in record["spans"]] == ["root", "child"]
+    assert record["spans"][1]["parent_id"] == record["spans"][0]["span_id"]
+    assert current_trace_id() is None
+
+
+def test_span_records_errors():
+    with pytest.raises(ValueError):
+        with span("root"):
+            raise ValueError("boom")
+
+    [record] = get_trace_exporter().recent()
+    assert record["error"] == "ValueError: boom"
+
+
+def test_spans_follow_run_parallel_into_pool():
+    with span("root") as root:
+        trace_ids = run_parallel([current_trace_id, current_trace_id])
+
+    assert trace_ids == [root.trace.trace_id] * 2
+
+
+def test_traceparent_continues_remote_trace():
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    with span("root", traceparent=f"00-{trace_id}-00f067aa0ba902b7-01") as root:
+        headers = trace_headers()
+
+    assert root.trace.trace_id == trace_id
+    assert root.trace.remote_parent_id == "00f067aa0ba902b7"
+    assert headers["traceparent"] == f"00-{trace_id}-{root.span_id}-01"
+    assert trace_headers() == {}
+
+
+def test_exporter_keeps_slowest_and_writes_jsonl(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = TraceExporter(buffer_size=2, path=str(path))
+    for name, duration in (("a", 5.0), ("b", 50.0), ("c", 1.0)):
+        exporter.export({"trace_id": name, "name": name, "duration_ms": duration})
+
+    assert [record["name"] for record in exporter.slowest(5)] == ["b", "c"]
+    lines = path.read_text().splitlines()
+    assert [json.loads(line)["name"] for line in lines] == ["a", "b", "c"]
+
+
+class _HeaderRecordingSession:
+    def __init__(self):
+        self.headers = []
+
+    def post(self, url, json=None, timeout=None, stream=False, headers=None):
+        self.headers.append(headers)
+        return DummyResponse({'choices': [{'text': 'ok'}], 'usage': {}})
+
+
+def test_model_calls_carry_trace_headers(monkeypatch):
+    session = _HeaderRecordingSession()
+    monkeypatch.setattr(get_http_client(), '_session_for', lambda url: session)
+
+    with span("root") as root:
+        get_http_client().post('http://stub:8000/v1/completions', json={}, timeout=5)
+
+    [headers] = session.headers
+    [record] = get_trace_exporter().recent()
+    http_span = record['spans'][1]
+    assert http_span['name'] == 'model.http'
+    assert http_span['attributes']['status'] == 200
+    assert headers['X-Trace-Id'] == root.trace.trace_id
+    assert headers['traceparent'] == f"00-{root.trace.trace_id}-{http_span['span_id']}-01"
+
+
+def test_request_trace_is_exposed_by_id_and_in_slowest(client, monkeypatch):
+    session = _HeaderRecordingSession()
+    monkeypatch.setattr(get_http_client(), '_session_for', lambda url: session)
+
+    response = client.get('/api/news/1/analysis?refresh=1')
+    trace_id = response.headers['X-Trace-Id']
+
+    record = client.get(f'/api/traces/{trace_id}').get_json()
+    names = [s['name'] for s in record['spans']]
+    assert record['name'] == 'GET /api/news/<int:article_id>/analysis'
+    assert record['attributes']['status'] == 200
+    assert 'model.http' in names
+    assert all(headers['X-Trace-Id'] == trace_id for headers in session.headers)
+
+    slowest = client.get('/api/traces/slowest?limit=1').get_json()
+    assert len(slowest) == 1
+    assert client.get('/api/traces/unknown').status_code == 404
+
+
+def test_incoming_traceparent_is_continued(client):
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    response = client.get('/api/news', headers={'traceparent': f"00-{trace_id}-00f067aa0ba902b7-01"})
+
+    assert response.headers['X-Trace-Id'] == trace_id
+
+
+class _StreamingSession:
+    def post(self, url, json=None, timeout=None, stream=False, headers=None):
+        response = DummyStreamResponse([{'choices': [{'text': 'ok'}], 'usage': {}}])
+        response.status_code = 200
+        return response
+
+
+def test_streamed_request_trace_contains_its_model_calls(client, monkeypatch):
+    monkeypatch.setattr(get_http_client(), '_session_for', lambda url: _StreamingSession())
+
+    response = client.post('/api/compare/stream?refresh=1', json={
+        'primary': {'content': 'left story'},
+        'reference': {'content': 'right story'},
+    })
+    response.get_data()
+    trace_id = response.headers['X-Trace-Id']
+
+    record = client.get(f'/api/traces/{trace_id}').get_json()
+    names = [s['name'] for s in record['spans']]
+    assert record['name'] == 'POST /api/compare/stream'
+    assert names.count('model.http') == 3
+    # No model call started a trace of its own
+    assert [r['name'] for r in get_trace_exporter().recent()].count('model.http') == 0